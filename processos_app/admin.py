@@ -0,0 +1,12 @@
+# processos_app/admin.py
+from django.contrib import admin
+
+from .models import RegraMonitoramento
+
+
+@admin.register(RegraMonitoramento)
+class RegraMonitoramentoAdmin(admin.ModelAdmin):
+    list_display = ('genero', 'especie', 'prazo_monitoramento', 'conclui_ciclos_anteriores', 'ativa')
+    list_editable = ('prazo_monitoramento', 'conclui_ciclos_anteriores', 'ativa')
+    list_filter = ('genero', 'prazo_monitoramento', 'ativa')
+    search_fields = ('especie',)
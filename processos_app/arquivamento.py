@@ -0,0 +1,153 @@
+# processos_app/arquivamento.py
+import gzip
+import json
+import uuid
+from datetime import date, timedelta
+from itertools import groupby
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.db import models, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import AlteracaoProcesso, MonitoramentoRecord, LoteArquivoHistorico, IndiceArquivoHistorico
+
+TAMANHO_LOTE_ARQUIVAMENTO = 5000
+
+
+def _serializar_alteracao(alteracao):
+    return {
+        'id': alteracao.id,
+        'processo_id': alteracao.processo_id,
+        'alterado_em': alteracao.alterado_em.isoformat(),
+        'alterado_por_id': alteracao.alterado_por_id,
+        'alterado_por': alteracao.alterado_por.username if alteracao.alterado_por else None,
+        'diferencas': alteracao.diferencas,
+    }
+
+
+def _serializar_monitoramento(record):
+    return {
+        'id': record.id,
+        'processo_id': record.processo_id,
+        'data_registro': record.data_registro.isoformat(),
+        'registrado_por_id': record.registrado_por_id,
+        'registrado_por': record.registrado_por.username if record.registrado_por else None,
+        'observacao': record.observacao,
+    }
+
+
+def _usuario(id_usuario, nome):
+    # O nome gravado no arquivo evita consultar (ou depender de) auth_user
+    if id_usuario is None and nome is None:
+        return None
+    return User(id=id_usuario, username=nome or 'N/A')
+
+
+def _restaurar_alteracao(dados):
+    alteracao = AlteracaoProcesso(
+        id=dados['id'], processo_id=dados['processo_id'],
+        alterado_em=parse_datetime(dados['alterado_em']), diferencas=dados['diferencas'])
+    alteracao.alterado_por = _usuario(dados['alterado_por_id'], dados['alterado_por'])
+    return alteracao
+
+
+def _restaurar_monitoramento(dados):
+    record = MonitoramentoRecord(
+        id=dados['id'], processo_id=dados['processo_id'],
+        data_registro=parse_date(dados['data_registro']), observacao=dados['observacao'])
+    record.registrado_por = _usuario(dados['registrado_por_id'], dados['registrado_por'])
+    return record
+
+
+# tipo -> (modelo, campo de data, usuário para select_related, serializar, restaurar)
+TIPOS_ARQUIVAMENTO = {
+    'ALTERACOES': (AlteracaoProcesso, 'alterado_em', 'alterado_por',
+                   _serializar_alteracao, _restaurar_alteracao),
+    'MONITORAMENTO': (MonitoramentoRecord, 'data_registro', 'registrado_por',
+                      _serializar_monitoramento, _restaurar_monitoramento),
+}
+
+
+def _mes(valor):
+    if hasattr(valor, 'hour'):
+        valor = timezone.localtime(valor)
+    return date(valor.year, valor.month, 1)
+
+
+def _arquivar_lote(tipo, limite, tamanho_lote):
+    modelo, campo_data, campo_usuario, serializar, _ = TIPOS_ARQUIVAMENTO[tipo]
+    salvos = []
+    try:
+        with transaction.atomic():
+            registros = list(modelo.objects.filter(**{f'{campo_data}__lt': limite})
+                             .select_related(campo_usuario).order_by(campo_data, 'id')[:tamanho_lote])
+            for mes, grupo in groupby(registros, key=lambda registro: _mes(getattr(registro, campo_data))):
+                grupo = list(grupo)
+                conteudo = b''.join(
+                    json.dumps(serializar(registro), ensure_ascii=False).encode('utf-8') + b'\n'
+                    for registro in grupo)
+                lote = LoteArquivoHistorico(tipo=tipo, mes=mes, linhas=len(grupo))
+                lote.arquivo.save(f'{tipo.lower()}/{mes:%Y-%m}/{uuid.uuid4().hex}.jsonl.gz',
+                                  ContentFile(gzip.compress(conteudo)), save=False)
+                salvos.append(lote.arquivo)
+                lote.save()
+                IndiceArquivoHistorico.objects.bulk_create([
+                    IndiceArquivoHistorico(lote=lote, processo_id=processo_id)
+                    for processo_id in {registro.processo_id for registro in grupo}
+                ])
+            modelo.objects.filter(id__in=[registro.id for registro in registros]).delete()
+    except Exception:
+        # Os arquivos já gravados não pertencem a nenhum lote confirmado
+        for arquivo in salvos:
+            arquivo.delete(save=False)
+        raise
+    return len(registros)
+
+
+def arquivar_historico(tipo, limite, tamanho_lote=TAMANHO_LOTE_ARQUIVAMENTO, ao_arquivar=None):
+    """
+    Move os registros de 'tipo' ('ALTERACOES' ou 'MONITORAMENTO') anteriores a
+    'limite' para arquivos JSON Lines compactados com gzip, um por mês em cada
+    lote. Cada lote grava os arquivos, o catálogo e remove as linhas da tabela
+    na mesma transação. Retorna a quantidade de registros arquivados.
+    """
+    modelo, campo_data = TIPOS_ARQUIVAMENTO[tipo][:2]
+    if not isinstance(modelo._meta.get_field(campo_data), models.DateTimeField):
+        limite = timezone.localdate(limite)
+
+    total = 0
+    while True:
+        arquivados = _arquivar_lote(tipo, limite, tamanho_lote)
+        if not arquivados:
+            return total
+        total += arquivados
+        if ao_arquivar:
+            ao_arquivar(total)
+
+
+def limite_arquivamento(dias):
+    return timezone.now() - timedelta(days=dias)
+
+
+def tem_historico_arquivado(processo_id):
+    return IndiceArquivoHistorico.objects.filter(processo_id=processo_id).exists()
+
+
+def ler_historico_arquivado(tipo, processo_id):
+    """
+    Devolve os registros arquivados de 'tipo' do processo como instâncias (não
+    salvas) do modelo de origem, com o usuário já preenchido. Só os arquivos
+    em que o índice aponta o processo são abertos.
+    """
+    restaurar = TIPOS_ARQUIVAMENTO[tipo][4]
+    lotes = LoteArquivoHistorico.objects.filter(tipo=tipo, indice__processo_id=processo_id).order_by('mes', 'id')
+    registros = []
+    for lote in lotes:
+        with lote.arquivo.open('rb') as arquivo, gzip.open(arquivo, 'rt', encoding='utf-8') as linhas:
+            for linha in linhas:
+                dados = json.loads(linha)
+                if dados['processo_id'] == processo_id:
+                    registros.append(restaurar(dados))
+    return registros
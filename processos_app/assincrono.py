@@ -0,0 +1,111 @@
+# processos_app/assincrono.py
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import close_old_connections, connections
+
+# Threads das views de leitura sob ASGI. O sync_to_async padrão (usado também
+# pelo ORM assíncrono do Django) executa todo código síncrono numa única thread
+# por processo, a mesma das demais views: uma requisição lenta enfileiraria
+# todas as leituras. Estas threads têm cada uma a sua conexão com o banco.
+_executor_leitura = ThreadPoolExecutor(
+    max_workers=settings.ASGI_THREADS_LEITURA, thread_name_prefix='leitura')
+
+_FIM = object()
+
+
+def _executar_leitura(funcao, *args, **kwargs):
+    try:
+        return funcao(*args, **kwargs)
+    finally:
+        # Mesma regra do fim de uma requisição: fecha a conexão conforme o
+        # CONN_MAX_AGE ou se ela ficou inutilizável
+        close_old_connections()
+
+
+async def em_thread_de_leitura(funcao, *args, **kwargs):
+    """
+    Executa 'funcao' (síncrona, somente leitura) numa das threads de leitura
+    e devolve o resultado sem bloquear o event loop.
+    """
+    return await sync_to_async(_executar_leitura, thread_sensitive=False,
+                               executor=_executor_leitura)(funcao, *args, **kwargs)
+
+
+def leitura_assincrona(view):
+    """
+    Decorator de views somente leitura. Sob ASGI (settings.SERVIDOR_ASGI),
+    devolve uma view assíncrona que executa 'view' inteira (sessão, permissões,
+    consultas e template) numa thread de leitura, sem ocupar o event loop nem a
+    thread das views síncronas. Sob WSGI devolve a própria view.
+    """
+    if not settings.SERVIDOR_ASGI:
+        return view
+
+    @wraps(view)
+    async def view_assincrona(request, *args, **kwargs):
+        return await em_thread_de_leitura(view, request, *args, **kwargs)
+
+    return view_assincrona
+
+
+def em_asgi(request):
+    return isinstance(request, ASGIRequest)
+
+
+async def iterar_em_thread(iteravel, tamanho_fila=4):
+    """
+    Consome o iterador síncrono 'iteravel' numa thread própria e entrega os
+    itens de forma assíncrona, para StreamingHttpResponse sob ASGI (que, com um
+    iterador síncrono, montaria a resposta inteira na memória antes de enviá-la).
+    A thread é a mesma do início ao fim, como exige o cursor de
+    queryset.iterator(), e espera o cliente quando a fila enche.
+    """
+    loop = asyncio.get_running_loop()
+    fila = asyncio.Queue(tamanho_fila)
+    parar = threading.Event()
+
+    def entregar(item):
+        futuro = asyncio.run_coroutine_threadsafe(fila.put(item), loop)
+        while not parar.is_set():
+            try:
+                futuro.result(timeout=1)
+                return True
+            except TimeoutError:
+                continue
+        futuro.cancel()
+        return False
+
+    def produzir():
+        try:
+            for item in iteravel:
+                if not entregar(item):
+                    break
+            else:
+                entregar(_FIM)
+        except Exception as e:
+            entregar(e)
+        finally:
+            close = getattr(iteravel, 'close', None)
+            if close:
+                close()
+            connections.close_all()
+
+    thread = threading.Thread(target=produzir, name='streaming', daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = await fila.get()
+            if item is _FIM:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # Cliente desconectado ou fim normal: libera a thread
+        parar.set()
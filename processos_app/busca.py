@@ -0,0 +1,202 @@
+# processos_app/busca.py
+import re
+import unicodedata
+
+from django.db import connections
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Collate
+from django.db.models.expressions import RawSQL
+
+
+# Campos do Processo que compõem o documento de busca
+CAMPOS_BUSCA = [
+    'numero_processo', 'secretaria', 'destino', 'genero', 'especie', 'objeto',
+    'contratada', 'tecnico', 'observacao', 'valor', 'periodo',
+]
+
+TABELA_FTS = 'processos_busca'
+INDICE_GIN = 'processos_documento_busca_gin'
+
+# Colunas normalizadas com índice para o autocompletar por prefixo
+INDICES_PREFIXO = {
+    'numero_normalizado': 'processos_numero_prefixo_idx',
+    'contratada_normalizada': 'processos_contratada_pref_idx',
+}
+
+_fts_instalado = set()
+_PALAVRA = re.compile(r'\w+')
+
+
+def normalizar_texto(texto):
+    """
+    Remove acentos, converte para minúsculas e troca pontuação por espaços,
+    para que "Subvenção" e "subvencao" (ou "123/2025" e "123.2025") coincidam.
+    """
+    if not texto:
+        return ''
+    texto = str(texto)
+    if not texto.isascii():
+        texto = unicodedata.normalize('NFKD', texto)
+        texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(_PALAVRA.findall(texto.lower()))
+
+
+def normalizar_numero_processo(numero):
+    """
+    Forma usada para comparar números de processo, indiferente à pontuação
+    digitada: "123/2025", "123.2025" e "123-2025" viram "123 2025".
+    """
+    return normalizar_texto(numero)
+
+
+def montar_documento_busca(processo):
+    partes = (normalizar_texto(getattr(processo, campo)) for campo in CAMPOS_BUSCA)
+    return ' '.join(parte for parte in partes if parte)
+
+
+def instalar_indice_busca(connection, schema_editor=None):
+    """
+    Cria (de forma idempotente) a estrutura de busca textual do banco:
+    índice GIN sobre to_tsvector no Postgres ou tabela FTS5 com gatilhos
+    de sincronização no SQLite. Nada é feito se a coluna documento_busca ainda
+    não existir (migrate para uma versão anterior).
+    """
+    with connection.cursor() as cursor:
+        colunas = {coluna.name for coluna in connection.introspection.get_table_description(cursor, 'processos')}
+    if 'documento_busca' not in colunas:
+        return
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.indexes import GinIndex
+        from django.contrib.postgres.search import SearchVector
+        from .models import Processo
+
+        with connection.cursor() as cursor:
+            existentes = connection.introspection.get_constraints(cursor, 'processos')
+        if INDICE_GIN not in existentes:
+            # Criado pelo schema editor para que a expressão indexada seja
+            # idêntica à gerada por SearchVector nas consultas.
+            indice = GinIndex(
+                SearchVector('documento_busca', config='simple'), name=INDICE_GIN)
+            if schema_editor is not None:
+                schema_editor.add_index(Processo, indice)
+            else:
+                with connection.schema_editor() as editor:
+                    editor.add_index(Processo, indice)
+    elif connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s",
+                [f'{TABELA_FTS}_a%'])
+            if cursor.fetchone()[0] == 3:
+                return
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA_FTS} USING fts5("
+                f"documento_busca, content='processos', content_rowid='id', "
+                f"tokenize='unicode61 remove_diacritics 2')")
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {TABELA_FTS}_ai AFTER INSERT ON processos BEGIN "
+                f"INSERT INTO {TABELA_FTS}(rowid, documento_busca) VALUES (new.id, new.documento_busca); END")
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {TABELA_FTS}_ad AFTER DELETE ON processos BEGIN "
+                f"INSERT INTO {TABELA_FTS}({TABELA_FTS}, rowid, documento_busca) "
+                f"VALUES ('delete', old.id, old.documento_busca); END")
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {TABELA_FTS}_au AFTER UPDATE OF documento_busca ON processos BEGIN "
+                f"INSERT INTO {TABELA_FTS}({TABELA_FTS}, rowid, documento_busca) "
+                f"VALUES ('delete', old.id, old.documento_busca); "
+                f"INSERT INTO {TABELA_FTS}(rowid, documento_busca) VALUES (new.id, new.documento_busca); END")
+            # Os gatilhos podem ter sido perdidos numa recriação da tabela pelo
+            # migrate do SQLite, então o índice é reconstruído a partir do conteúdo.
+            cursor.execute(f"INSERT INTO {TABELA_FTS}({TABELA_FTS}) VALUES ('rebuild')")
+
+
+def _expressao_prefixo(vendor, coluna):
+    # No Postgres a collation "C" ordena pelos bytes, como o BINARY do SQLite:
+    # assim o índice atende tanto a faixa do prefixo quanto o GROUP BY/ORDER BY
+    if vendor == 'postgresql':
+        return Collate(coluna, 'C')
+    return F(coluna)
+
+
+def instalar_indices_prefixo(connection):
+    """
+    Cria (de forma idempotente) os índices de INDICES_PREFIXO, por expressão
+    com collation "C" no Postgres e simples no SQLite. Colunas ainda não
+    criadas (migrate para uma versão anterior) são ignoradas.
+    """
+    with connection.cursor() as cursor:
+        colunas = {coluna.name for coluna in connection.introspection.get_table_description(cursor, 'processos')}
+        for coluna, nome in INDICES_PREFIXO.items():
+            if coluna not in colunas:
+                continue
+            expressao = f'("{coluna}" COLLATE "C")' if connection.vendor == 'postgresql' else f'"{coluna}"'
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS {nome} ON processos ({expressao})')
+
+
+def remover_indices_prefixo(connection):
+    with connection.cursor() as cursor:
+        for nome in INDICES_PREFIXO.values():
+            cursor.execute(f'DROP INDEX IF EXISTS {nome}')
+
+
+def filtrar_prefixo(queryset, coluna, prefixo):
+    """
+    Filtra os processos cuja coluna normalizada começa com 'prefixo' (já
+    normalizado) e anota essa coluna como 'chave_prefixo', na ordem do índice
+    de prefixo. Usa a faixa [prefixo, sucessor) em vez de LIKE, que no SQLite
+    ignora maiúsculas e não aproveita o índice.
+    """
+    expressao = _expressao_prefixo(connections[queryset.db].vendor, coluna)
+    sucessor = prefixo[:-1] + chr(ord(prefixo[-1]) + 1)
+    return queryset.annotate(chave_prefixo=expressao).filter(
+        chave_prefixo__gte=prefixo, chave_prefixo__lt=sucessor)
+
+
+def _fts5_disponivel(connection):
+    if connection.alias in _fts_instalado:
+        return True
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [TABELA_FTS])
+        if cursor.fetchone():
+            _fts_instalado.add(connection.alias)
+            return True
+    return False
+
+
+def aplicar_busca(queryset, termo):
+    """
+    Filtra o queryset de Processo pelo termo de pesquisa usando o documento de
+    busca pré-calculado e anota 'relevancia' (maior é melhor) para ordenação.
+    """
+    termos = normalizar_texto(termo).split()
+    if not termos:
+        return queryset.annotate(relevancia=Value(0.0, output_field=FloatField()))
+
+    connection = connections[queryset.db]
+
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+        vetor = SearchVector('documento_busca', config='simple')
+        consulta = SearchQuery(
+            ' & '.join(f'{t}:*' for t in termos), config='simple', search_type='raw')
+        return queryset.annotate(
+            vetor_busca=vetor,
+            relevancia=SearchRank(vetor, consulta),
+        ).filter(vetor_busca=consulta)
+
+    if connection.vendor == 'sqlite' and _fts5_disponivel(connection):
+        consulta = ' '.join(f'"{t}"*' for t in termos)
+        return queryset.filter(
+            id__in=RawSQL(
+                f"SELECT rowid FROM {TABELA_FTS} WHERE {TABELA_FTS} MATCH %s", [consulta])
+        ).annotate(
+            relevancia=RawSQL(
+                f"SELECT -rank FROM {TABELA_FTS} WHERE {TABELA_FTS} MATCH %s "
+                f"AND rowid = processos.id", [consulta], output_field=FloatField())
+        )
+
+    for t in termos:
+        queryset = queryset.filter(documento_busca__contains=t)
+    return queryset.annotate(relevancia=Value(0.0, output_field=FloatField()))
@@ -0,0 +1,243 @@
+# processos_app/exportacao.py
+import csv
+import json
+import tempfile
+import zlib
+from datetime import timedelta
+
+import openpyxl
+from django.conf import settings
+from django.core.files import File
+from django.utils import timezone
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
+from openpyxl.utils import get_column_letter
+
+from .models import ExportacaoJob
+
+
+# (Cabeçalho, campo do Processo, quebra de linha na célula)
+COLUNAS_EXPORTACAO = [
+    ("N° Processo", 'numero_processo', False),
+    ("Volume", 'volume', False),
+    ("Secretaria", 'secretaria', False),
+    ("Data Entrada", 'data_entrada', False),
+    ("Hora Entrada", 'hora_entrada', False),
+    ("Data Saída", 'data_saida', False),
+    ("Hora Saída", 'hora_saida', False),
+    ("Destino", 'destino', False),
+    ("Gênero", 'genero', False),
+    ("Espécie", 'especie', False),
+    ("Objeto", 'objeto', True),
+    ("Contratada", 'contratada', False),
+    ("Recorrente", 'recorrente', False),
+    ("Prioridade", 'prioridade', False),
+    ("Técnico", 'tecnico', True),
+    ("N° Despacho", 'numero_despacho', True),
+    ("Observação", 'observacao', True),
+    ("Valor", 'valor', True),
+]
+
+# Tamanho do lote lido do banco e da amostra usada para a largura das colunas
+TAMANHO_LOTE = 2000
+TAMANHO_AMOSTRA_LARGURA = 500
+LARGURA_MAXIMA = 100
+# Tamanho aproximado (bytes) de cada bloco enviado nas exportações em streaming
+TAMANHO_BLOCO_STREAMING = 64 * 1024
+
+
+def formatar_valor_exportacao(valor):
+    if valor is None:
+        return ''
+    if hasattr(valor, 'hour'):
+        return valor.strftime('%H:%M')
+    if hasattr(valor, 'year'):
+        return valor.strftime('%Y-%m-%d')
+    return valor
+
+
+def linhas_exportacao(queryset):
+    """
+    Percorre o queryset no banco em lotes, devolvendo cada linha já formatada
+    na ordem de COLUNAS_EXPORTACAO, sem instanciar objetos Processo.
+    """
+    campos = [campo for _, campo, _ in COLUNAS_EXPORTACAO]
+    for valores in queryset.values_list(*campos).iterator(chunk_size=TAMANHO_LOTE):
+        yield [formatar_valor_exportacao(valor) for valor in valores]
+
+
+class _Eco:
+    # Objeto file-like cujo write devolve o texto, para usar csv.writer sem buffer
+    def write(self, valor):
+        return valor
+
+
+def _valor_json(valor):
+    if valor is None:
+        return None
+    return formatar_valor_exportacao(valor)
+
+
+def _linhas_csv(queryset):
+    escritor = csv.writer(_Eco())
+    # BOM para o Excel reconhecer o arquivo como UTF-8
+    yield '\ufeff' + escritor.writerow([cabecalho for cabecalho, _, _ in COLUNAS_EXPORTACAO])
+    for linha in linhas_exportacao(queryset):
+        yield escritor.writerow(linha)
+
+
+def _linhas_jsonl(queryset):
+    campos = [campo for _, campo, _ in COLUNAS_EXPORTACAO]
+    for valores in queryset.values_list(*campos).iterator(chunk_size=TAMANHO_LOTE):
+        registro = {campo: _valor_json(valor) for campo, valor in zip(campos, valores)}
+        yield json.dumps(registro, ensure_ascii=False) + '\n'
+
+
+FORMATOS_STREAMING = {
+    'csv': (_linhas_csv, 'text/csv; charset=utf-8'),
+    'jsonl': (_linhas_jsonl, 'application/x-ndjson; charset=utf-8'),
+}
+
+
+def blocos_exportacao(queryset, formato, compactar=False):
+    """
+    Gera o conteúdo da exportação em 'formato' ('csv' ou 'jsonl') em blocos de
+    bytes, lendo o banco em lotes. Com 'compactar', os blocos formam um único
+    fluxo gzip. A primeira linha é enviada assim que produzida para o download
+    começar imediatamente.
+    """
+    gerar_linhas = FORMATOS_STREAMING[formato][0]
+    compressor = zlib.compressobj(wbits=31) if compactar else None
+
+    def saida(dados):
+        return compressor.compress(dados) if compressor else dados
+
+    pendentes = []
+    tamanho = 0
+    primeira = True
+    for linha in gerar_linhas(queryset):
+        dados = linha.encode('utf-8')
+        if primeira:
+            primeira = False
+            bloco = saida(dados)
+            if compressor:
+                bloco += compressor.flush(zlib.Z_SYNC_FLUSH)
+            yield bloco
+            continue
+        pendentes.append(dados)
+        tamanho += len(dados)
+        if tamanho >= TAMANHO_BLOCO_STREAMING:
+            bloco = saida(b''.join(pendentes))
+            pendentes, tamanho = [], 0
+            if bloco:
+                yield bloco
+
+    bloco = saida(b''.join(pendentes))
+    if compressor:
+        bloco += compressor.flush()
+    if bloco:
+        yield bloco
+
+
+def _larguras_colunas(queryset):
+    larguras = [len(cabecalho) for cabecalho, _, _ in COLUNAS_EXPORTACAO]
+    for linha in linhas_exportacao(queryset[:TAMANHO_AMOSTRA_LARGURA]):
+        for indice, valor in enumerate(linha):
+            larguras[indice] = max(larguras[indice], len(str(valor)))
+    return [min(largura + 2, LARGURA_MAXIMA) for largura in larguras]
+
+
+def gerar_planilha_finalizados(queryset, destino, ao_progredir=None):
+    """
+    Grava a planilha de processos finalizados em 'destino' (arquivo ou objeto
+    file-like) usando o modo write-only do openpyxl. As linhas são escritas à
+    medida que são lidas do banco, então a memória usada não cresce com o total.
+    Se informado, 'ao_progredir' é chamado com o total de linhas já escritas
+    a cada lote. Retorna a quantidade de linhas exportadas.
+    """
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("Processos Finalizados")
+
+    for indice, largura in enumerate(_larguras_colunas(queryset), 1):
+        sheet.column_dimensions[get_column_letter(indice)].width = largura
+
+    thin_border = Border(left=Side(style='thin'),
+                         right=Side(style='thin'),
+                         top=Side(style='thin'),
+                         bottom=Side(style='thin'))
+
+    cabecalho = []
+    for titulo, _, _ in COLUNAS_EXPORTACAO:
+        cell = WriteOnlyCell(sheet, value=titulo)
+        cell.font = Font(bold=True, color="FFFFFF")
+        cell.fill = PatternFill(start_color="4CAF50", end_color="4CAF50", fill_type="solid")
+        cell.alignment = Alignment(horizontal='center', vertical='center')
+        cell.border = thin_border
+        cabecalho.append(cell)
+    sheet.append(cabecalho)
+
+    # Uma célula pré-estilizada por coluna, reutilizada em todas as linhas:
+    # o modo write-only serializa a linha no momento do append.
+    celulas = []
+    for _, _, quebra_linha in COLUNAS_EXPORTACAO:
+        cell = WriteOnlyCell(sheet)
+        cell.border = thin_border
+        if quebra_linha:
+            cell.alignment = Alignment(wrapText=True, vertical='top')
+        celulas.append(cell)
+
+    total = 0
+    for linha in linhas_exportacao(queryset):
+        for cell, valor in zip(celulas, linha):
+            cell.value = valor
+        sheet.append(celulas)
+        total += 1
+        if ao_progredir and total % TAMANHO_LOTE == 0:
+            ao_progredir(total)
+
+    workbook.save(destino)
+    return total
+
+
+def inicio_limite_exportacao():
+    """
+    Instante antes do qual um job ainda em PROCESSANDO é tido como abandonado:
+    o worker que o reservou foi encerrado (falta de memória, reinício,
+    deploy) e nunca vai concluí-lo.
+    """
+    return timezone.now() - timedelta(minutes=settings.EXPORTACAO_TIMEOUT_MINUTOS)
+
+
+def encerrar_exportacoes_abandonadas():
+    """
+    Marca como ERRO os jobs abandonados em PROCESSANDO. Não voltam para a fila:
+    um job que derrubou o worker o derrubaria de novo. Um novo pedido com os
+    mesmos filtros cria outro job. Retorna a quantidade de jobs marcados.
+    """
+    return ExportacaoJob.objects.filter(status='PROCESSANDO', iniciado_em__lt=inicio_limite_exportacao()).update(
+        status='ERRO', concluido_em=timezone.now(),
+        mensagem="A exportação foi interrompida. Solicite-a novamente.")
+
+
+def processar_exportacao(job, queryset):
+    """
+    Gera o arquivo de um ExportacaoJob já marcado como PROCESSANDO, registrando
+    o progresso no próprio job para a página que acompanha a exportação.
+    """
+    modelo = type(job)
+    modelo.objects.filter(pk=job.pk).update(total=queryset.count())
+
+    def ao_progredir(linhas):
+        modelo.objects.filter(pk=job.pk).update(progresso=linhas)
+
+    with tempfile.TemporaryFile(suffix='.xlsx') as arquivo:
+        total = gerar_planilha_finalizados(queryset, arquivo, ao_progredir)
+        arquivo.seek(0)
+        job.arquivo.save(f'{job.pk}.xlsx', File(arquivo), save=False)
+
+    job.status = 'CONCLUIDO'
+    job.progresso = total
+    job.total = total
+    job.concluido_em = timezone.now()
+    job.save(update_fields=['arquivo', 'status', 'progresso', 'total', 'concluido_em'])
+    return job
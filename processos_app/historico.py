@@ -0,0 +1,115 @@
+# processos_app/historico.py
+from datetime import datetime, time
+
+from django.db.models import Q
+from django.utils import dateformat, timezone
+
+from .arquivamento import ler_historico_arquivado
+from .models import AlteracaoProcesso, MonitoramentoRecord
+from .pagination import codificar_cursor, decodificar_cursor, POR_PAGINA_PADRAO
+
+# Desempate entre itens do mesmo instante: na ordem decrescente da linha do
+# tempo, os registros de monitoramento vêm antes das alterações de campos.
+ALTERACAO = 0
+MONITORAMENTO = 1
+
+CAMPOS_CURSOR = ['alterado_em', 'tipo', 'id']
+
+
+def _instante_monitoramento(data_registro):
+    # MonitoramentoRecord guarda só a data: o registro entra na linha do tempo
+    # no fim daquele dia
+    return timezone.make_aware(datetime.combine(data_registro, time.max))
+
+
+def _filtrar_apos(alteracoes, registros, cursor):
+    instante, tipo, id_cursor = cursor
+    # Alterações com chave (alterado_em, ALTERACAO, id) menor que a do cursor
+    if tipo > ALTERACAO:
+        alteracoes = alteracoes.filter(alterado_em__lte=instante)
+    else:
+        alteracoes = alteracoes.filter(Q(alterado_em__lt=instante) | Q(alterado_em=instante, id__lt=id_cursor))
+
+    # Registros de monitoramento: o instante de um dia é sempre o seu último
+    # microssegundo, então só há empate quando o cursor é um registro
+    dia = timezone.localdate(instante)
+    if tipo == MONITORAMENTO and instante == _instante_monitoramento(dia):
+        registros = registros.filter(Q(data_registro__lt=dia) | Q(data_registro=dia, id__lt=id_cursor))
+    else:
+        registros = registros.filter(data_registro__lt=dia)
+    return alteracoes, registros
+
+
+def _itens_alteracao(alteracao):
+    # Uma linha por campo alterado, como na tabela de histórico por campo
+    data = dateformat.format(timezone.localtime(alteracao.alterado_em), 'd/m/Y H:i:s')
+    usuario = alteracao.alterado_por.username if alteracao.alterado_por else 'N/A'
+    return [{
+        'tipo': 'alteracao',
+        'data': data,
+        'campo': campo,
+        'valor_antigo': valor_antigo or '',
+        'valor_novo': valor_novo or '',
+        'usuario': usuario,
+    } for campo, valor_antigo, valor_novo in alteracao.campos_alterados()]
+
+
+def _item_monitoramento(record):
+    return {
+        'tipo': 'monitoramento',
+        'data': record.data_registro.strftime('%d/%m/%Y'),
+        'campo': 'Monitoramento',
+        'valor_antigo': '',
+        'valor_novo': record.observacao or '',
+        'usuario': record.registrado_por.username if record.registrado_por else 'N/A',
+    }
+
+
+def _entradas_arquivadas(processo, cursor, por_pagina):
+    entradas = [((alteracao.alterado_em, ALTERACAO, alteracao.id), alteracao)
+                for alteracao in ler_historico_arquivado('ALTERACOES', processo.id)]
+    entradas += [((_instante_monitoramento(record.data_registro), MONITORAMENTO, record.id), record)
+                 for record in ler_historico_arquivado('MONITORAMENTO', processo.id)]
+    if cursor is not None:
+        entradas = [entrada for entrada in entradas if entrada[0] < cursor]
+    entradas.sort(key=lambda entrada: entrada[0], reverse=True)
+    return entradas[:por_pagina + 1]
+
+
+def linha_do_tempo(processo, apos=None, por_pagina=POR_PAGINA_PADRAO, incluir_arquivo=False):
+    """
+    Devolve uma página da linha do tempo do processo (alterações e registros de
+    monitoramento intercalados, do mais recente ao mais antigo) como (itens,
+    proximo_cursor). A página tem até por_pagina alterações/registros; cada
+    alteração vira um item por campo. Cada fonte é lida por chave, com no
+    máximo por_pagina + 1 linhas e os usuários no mesmo SELECT. Com
+    'incluir_arquivo', os registros já movidos para o arquivo de histórico
+    (ver arquivamento.py) entram na mesma ordenação.
+    """
+    alteracoes = AlteracaoProcesso.objects.filter(processo=processo).select_related('alterado_por')
+    registros = MonitoramentoRecord.objects.filter(processo=processo).select_related('registrado_por')
+
+    cursor = decodificar_cursor(apos, AlteracaoProcesso, CAMPOS_CURSOR)
+    if cursor is not None and cursor[1] in (ALTERACAO, MONITORAMENTO) and isinstance(cursor[2], int):
+        alteracoes, registros = _filtrar_apos(alteracoes, registros, cursor)
+        cursor = tuple(cursor)
+    else:
+        cursor = None
+
+    entradas = [((record.alterado_em, ALTERACAO, record.id), record)
+                for record in alteracoes.order_by('-alterado_em', '-id')[:por_pagina + 1]]
+    entradas += [((_instante_monitoramento(record.data_registro), MONITORAMENTO, record.id), record)
+                 for record in registros.order_by('-data_registro', '-id')[:por_pagina + 1]]
+    if incluir_arquivo:
+        entradas += _entradas_arquivadas(processo, cursor, por_pagina)
+    entradas.sort(key=lambda entrada: entrada[0], reverse=True)
+
+    pagina = entradas[:por_pagina]
+    proximo_cursor = codificar_cursor(pagina[-1][0]) if len(entradas) > por_pagina else None
+    itens = []
+    for chave, record in pagina:
+        if chave[1] == ALTERACAO:
+            itens.extend(_itens_alteracao(record))
+        else:
+            itens.append(_item_monitoramento(record))
+    return itens, proximo_cursor
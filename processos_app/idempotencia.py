@@ -0,0 +1,101 @@
+# processos_app/idempotencia.py
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import JsonResponse
+from django.utils import timezone
+
+from .models import ChaveIdempotencia
+
+TAMANHO_MAXIMO_CHAVE = 64
+
+
+def _limite_validade():
+    return timezone.now() - timedelta(hours=settings.IDEMPOTENCIA_VALIDADE_HORAS)
+
+
+def limpar_chaves_expiradas():
+    """
+    Remove as chaves de idempotência mais antigas que
+    IDEMPOTENCIA_VALIDADE_HORAS. Retorna a quantidade removida.
+    """
+    removidas, _ = ChaveIdempotencia.objects.filter(criado_em__lt=_limite_validade()).delete()
+    return removidas
+
+
+def _reservar_chave(request, endpoint, chave, hash_requisicao):
+    """
+    Grava a chave ainda sem resposta. Se ela já existir (e estiver válida),
+    devolve (None, registro_existente).
+    """
+    filtros = {'usuario': request.user, 'endpoint': endpoint, 'chave': chave}
+    try:
+        with transaction.atomic():
+            return ChaveIdempotencia.objects.create(hash_requisicao=hash_requisicao, **filtros), None
+    except IntegrityError:
+        pass
+
+    existente = ChaveIdempotencia.objects.select_for_update().filter(**filtros).first()
+    if existente is not None and existente.criado_em >= _limite_validade():
+        return None, existente
+    # Chave expirada (ainda não removida pela limpeza): vale como nova
+    ChaveIdempotencia.objects.filter(**filtros).delete()
+    return ChaveIdempotencia.objects.create(hash_requisicao=hash_requisicao, **filtros), None
+
+
+def _repetir_resposta(existente, hash_requisicao):
+    if existente.hash_requisicao != hash_requisicao:
+        return JsonResponse({
+            "success": False,
+            "message": "Esta chave de idempotência já foi usada com outro conteúdo.",
+        }, status=422)
+    if existente.status_http is None:
+        return JsonResponse({
+            "success": False,
+            "message": "Esta requisição ainda está sendo processada.",
+        }, status=409)
+    response = JsonResponse(existente.resposta, status=existente.status_http, safe=False)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotente(view):
+    """
+    Torna uma view POST segura contra reenvios: quando a requisição traz o
+    cabeçalho Idempotency-Key, a chave e a resposta de sucesso são gravadas na
+    mesma transação que a view executa. Um reenvio com a mesma chave recebe a
+    resposta original, sem executar a view de novo. Respostas de erro não são
+    guardadas, para que a mesma chave possa ser tentada outra vez.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        chave = request.headers.get('Idempotency-Key', '').strip()
+        if request.method != 'POST' or not chave:
+            return view(request, *args, **kwargs)
+        if len(chave) > TAMANHO_MAXIMO_CHAVE:
+            return JsonResponse({
+                "success": False,
+                "message": f"Idempotency-Key deve ter no máximo {TAMANHO_MAXIMO_CHAVE} caracteres.",
+            }, status=400)
+
+        hash_requisicao = hashlib.sha256(request.body).hexdigest()
+        with transaction.atomic():
+            # Num reenvio simultâneo, o INSERT da mesma chave espera a transação
+            # da primeira requisição terminar e então encontra a resposta gravada
+            registro, existente = _reservar_chave(request, view.__name__, chave, hash_requisicao)
+            if existente is not None:
+                return _repetir_resposta(existente, hash_requisicao)
+
+            response = view(request, *args, **kwargs)
+            if 200 <= response.status_code < 300 and isinstance(response, JsonResponse):
+                registro.status_http = response.status_code
+                registro.resposta = json.loads(response.content)
+                registro.save(update_fields=['status_http', 'resposta'])
+            else:
+                registro.delete()
+        return response
+    return wrapper
@@ -0,0 +1,190 @@
+# processos_app/importacao.py
+from collections import Counter
+from functools import lru_cache
+from datetime import date, datetime, time
+
+from django.db import transaction
+
+from .exportacao import COLUNAS_EXPORTACAO
+from .models import Processo, FacetaProcesso, ContadorVersao, RegraMonitoramento
+from .monitoramento import definir_monitoramento
+from .planilhas import ErroLinha, chave, linha_vazia, mapear_colunas, texto_celula, valores_da_linha
+
+
+TAMANHO_LOTE_IMPORTACAO = 1000
+
+CAMPOS_IMPORTACAO = [
+    'numero_processo', 'volume', 'secretaria', 'data_entrada', 'hora_entrada',
+    'data_saida', 'hora_saida', 'destino', 'genero', 'especie', 'objeto',
+    'contratada', 'recorrente', 'prioridade', 'tecnico', 'data_analise',
+    'numero_despacho', 'observacao', 'valor', 'periodo', 'status_analise',
+]
+CAMPOS_OBRIGATORIOS = [
+    'numero_processo', 'volume', 'secretaria', 'data_entrada', 'hora_entrada',
+    'genero', 'especie', 'objeto',
+]
+
+FORMATOS_DATA = ['%Y-%m-%d', '%d/%m/%Y', '%d/%m/%y', '%d-%m-%Y']
+FORMATOS_HORA = ['%H:%M', '%H:%M:%S', '%Hh%M', '%Hh']
+
+
+# Cabeçalhos aceitos: o nome do campo ou o cabeçalho da planilha exportada
+# pela página de finalizados, sem diferenciar acentos e maiúsculas
+ALIASES_COLUNAS = {chave(campo): campo for campo in CAMPOS_IMPORTACAO}
+ALIASES_COLUNAS.update({chave(cabecalho): campo for cabecalho, campo, _ in COLUNAS_EXPORTACAO})
+ALIASES_COLUNAS.update({
+    chave(Processo._meta.get_field(campo).verbose_name): campo for campo in CAMPOS_IMPORTACAO})
+
+GENEROS = {chave(valor): codigo
+           for codigo, rotulo in RegraMonitoramento.GENERO_CHOICES for valor in (codigo, rotulo)}
+STATUS_ANALISE = {chave(valor): codigo
+                  for codigo, rotulo in Processo.STATUS_ANALISE_CHOICES for valor in (codigo, rotulo)}
+SIM_NAO = {'sim': 'SIM', 's': 'SIM', 'nao': 'NAO', 'n': 'NAO'}
+
+
+def mapear_cabecalho(cabecalho):
+    """
+    Associa cada coluna do cabeçalho a um campo do Processo. Levanta ValueError
+    se faltar alguma coluna obrigatória.
+    """
+    return mapear_colunas(cabecalho, ALIASES_COLUNAS, CAMPOS_OBRIGATORIOS)
+
+
+def converter_data(valor):
+    if valor in (None, ''):
+        return None
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    return _converter_texto_data(str(valor).strip())
+
+
+# Livros de protocolo repetem muito as mesmas datas e horas; o cache evita
+# refazer o strptime (lento) a cada linha
+@lru_cache(maxsize=8192)
+def _converter_texto_data(texto):
+    for formato in FORMATOS_DATA:
+        try:
+            return datetime.strptime(texto, formato).date()
+        except ValueError:
+            continue
+    raise ErroLinha(f"data inválida '{texto}'")
+
+
+def converter_hora(valor):
+    if valor in (None, ''):
+        return None
+    if isinstance(valor, datetime):
+        return valor.time().replace(microsecond=0)
+    if isinstance(valor, time):
+        return valor.replace(microsecond=0)
+    return _converter_texto_hora(str(valor).strip().lower())
+
+
+@lru_cache(maxsize=2048)
+def _converter_texto_hora(texto):
+    for formato in FORMATOS_HORA:
+        try:
+            return datetime.strptime(texto, formato).time()
+        except ValueError:
+            continue
+    raise ErroLinha(f"hora inválida '{texto}'")
+
+
+def montar_processo(valores):
+    """
+    Normaliza os valores de uma linha (já associados aos campos) e devolve o
+    Processo pronto para bulk_create, com prazo e monitoramento calculados
+    como em salvar_processo. Levanta ErroLinha com o motivo da rejeição.
+    """
+    dados = {campo: texto_celula(valores.get(campo)) for campo in CAMPOS_IMPORTACAO}
+    for campo in ('data_entrada', 'data_saida', 'data_analise'):
+        dados[campo] = converter_data(valores.get(campo))
+    for campo in ('hora_entrada', 'hora_saida'):
+        dados[campo] = converter_hora(valores.get(campo))
+
+    faltando = [campo for campo in CAMPOS_OBRIGATORIOS if not dados[campo]]
+    if faltando:
+        raise ErroLinha(f"campo(s) obrigatório(s) vazio(s): {', '.join(faltando)}")
+    if dados['hora_saida'] and not dados['data_saida']:
+        raise ErroLinha("hora de saída sem data de saída")
+
+    dados['genero'] = GENEROS.get(chave(dados['genero']), dados['genero'])
+    dados['prioridade'] = SIM_NAO.get(chave(dados['prioridade'] or 'nao'))
+    if dados['prioridade'] is None:
+        raise ErroLinha(f"prioridade inválida '{valores.get('prioridade')}'")
+    recorrente = SIM_NAO.get(chave(dados['recorrente'] or 'nao'))
+    dados['recorrente'] = 'SIM' if recorrente == 'SIM' else 'NÃO'
+    dados['status_analise'] = STATUS_ANALISE.get(
+        chave(dados['status_analise'] or ''), 'NAO_APLICAVEL')
+
+    for campo in CAMPOS_IMPORTACAO:
+        max_length = getattr(Processo._meta.get_field(campo), 'max_length', None)
+        if max_length and isinstance(dados[campo], str) and len(dados[campo]) > max_length:
+            raise ErroLinha(f"'{campo}' excede {max_length} caracteres")
+
+    data_base_monitoramento = dados['data_saida'] or dados['data_entrada']
+    prazo_monitoramento, status_monitoramento, proxima_data_monitoramento = \
+        definir_monitoramento(dados['genero'], dados['especie'], data_base_monitoramento)
+
+    processo = Processo(
+        **dados,
+        prazo_dias=2 if dados['prioridade'] == 'SIM' else 7,
+        prazo_monitoramento=prazo_monitoramento,
+        status_monitoramento=status_monitoramento,
+        proxima_data_monitoramento=proxima_data_monitoramento,
+    )
+    processo.preparar_campos_derivados()
+    return processo
+
+
+def _gravar_lote(lote):
+    with transaction.atomic():
+        Processo.objects.bulk_create(lote)
+        # bulk_create não dispara os sinais de facetas e de versão dos dados
+        for estado, quantidade in Counter(processo.estado_faceta() for processo in lote).items():
+            FacetaProcesso.objects.ajustar_estado(estado, quantidade)
+        ContadorVersao.objects.incrementar_ao_confirmar('processos')
+
+
+def importar_processos(linhas, simular=False, pode_importar_genero=None,
+                       tamanho_lote=TAMANHO_LOTE_IMPORTACAO):
+    """
+    Importa processos a partir de 'linhas' (a primeira é o cabeçalho), gravando
+    em lotes com bulk_create, cada lote na sua transação. Linhas inválidas são
+    ignoradas e relatadas. Com 'simular', apenas valida.
+    Retorna {'importados': n, 'erros': [(numero_da_linha, mensagem), ...]}.
+    """
+    linhas = iter(linhas)
+    try:
+        colunas = mapear_cabecalho(next(linhas))
+    except StopIteration:
+        raise ValueError("Arquivo vazio.")
+
+    importados = 0
+    erros = []
+    lote = []
+    for numero_linha, linha in enumerate(linhas, start=2):
+        if linha_vazia(linha):
+            continue
+        valores = valores_da_linha(linha, colunas)
+        try:
+            processo = montar_processo(valores)
+            if pode_importar_genero and not pode_importar_genero(processo.genero):
+                raise ErroLinha(f"sem permissão para o gênero '{processo.genero}'")
+        except ErroLinha as e:
+            erros.append((numero_linha, str(e)))
+            continue
+
+        importados += 1
+        if simular:
+            continue
+        lote.append(processo)
+        if len(lote) >= tamanho_lote:
+            _gravar_lote(lote)
+            lote = []
+
+    if lote:
+        _gravar_lote(lote)
+    return {'importados': importados, 'erros': erros}
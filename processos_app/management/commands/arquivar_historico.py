@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from processos_app.arquivamento import (TIPOS_ARQUIVAMENTO, TAMANHO_LOTE_ARQUIVAMENTO,
+                                        arquivar_historico, limite_arquivamento)
+
+
+class Command(BaseCommand):
+    help = ("Move as alterações de processos e os registros de monitoramento mais antigos que "
+            "HISTORICO_ARQUIVAMENTO_DIAS para arquivos JSON Lines compactados (gzip) em "
+            "MEDIA_ROOT/arquivo_historico, um por mês, removendo-os das tabelas.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias', type=int, default=None,
+            help="Arquiva registros com mais de N dias (padrão: HISTORICO_ARQUIVAMENTO_DIAS).")
+        parser.add_argument(
+            '--lote', type=int, default=TAMANHO_LOTE_ARQUIVAMENTO,
+            help=f"Registros lidos e removidos por transação (padrão: {TAMANHO_LOTE_ARQUIVAMENTO}).")
+        parser.add_argument(
+            '--tipo', choices=sorted(TIPOS_ARQUIVAMENTO), action='append',
+            help="Arquiva só este tipo de registro (pode ser repetido).")
+
+    def handle(self, *args, **options):
+        dias = options['dias'] if options['dias'] is not None else settings.HISTORICO_ARQUIVAMENTO_DIAS
+        if dias < 1:
+            raise CommandError("--dias deve ser maior que zero.")
+        if options['lote'] < 1:
+            raise CommandError("--lote deve ser maior que zero.")
+
+        limite = limite_arquivamento(dias)
+        for tipo in options['tipo'] or sorted(TIPOS_ARQUIVAMENTO):
+            total = arquivar_historico(
+                tipo, limite, options['lote'],
+                ao_arquivar=lambda total: self.stdout.write(f"  {tipo}: {total} registro(s) arquivado(s)..."))
+            self.stdout.write(self.style.SUCCESS(
+                f"{tipo}: {total} registro(s) anteriores a {limite:%d/%m/%Y} arquivado(s)."))
@@ -0,0 +1,248 @@
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date
+from http.client import HTTPConnection
+from importlib import import_module
+from urllib.parse import quote, urlencode
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.http.request import validate_host
+from django.urls import reverse
+
+from processos_app.models import Processo
+
+MODOS = {
+    'wsgi': ['protocolo_project.wsgi:application'],
+    'asgi': ['-k', 'uvicorn_worker.UvicornWorker', 'protocolo_project.asgi:application'],
+}
+AMOSTRA_PROCESSOS = 50
+
+
+class Command(BaseCommand):
+    help = ("Compara a latência das views de leitura (get_process_by_number, taxonomia, "
+            "itens do histórico e sugestões) sob o gunicorn síncrono (wsgi) e com workers "
+            "uvicorn (asgi), com clientes simultâneos e, opcionalmente, exportações CSV "
+            "longas ocupando o servidor ao mesmo tempo. Usa o banco configurado.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modos', default='wsgi,asgi',
+                            help="Modos comparados, separados por vírgula (padrão: wsgi,asgi).")
+        parser.add_argument('--workers', type=int, default=3,
+                            help="Workers do gunicorn em cada modo (padrão: 3, como em produção).")
+        parser.add_argument('--clientes', type=int, default=20,
+                            help="Clientes simultâneos fazendo leituras (padrão: 20).")
+        parser.add_argument('--duracao', type=float, default=15,
+                            help="Segundos de medição em cada modo (padrão: 15).")
+        parser.add_argument('--exportacoes', type=int, default=2,
+                            help="Clientes baixando a exportação CSV de todo o período durante a "
+                                 "medição, simulando relatórios lentos (padrão: 2).")
+        parser.add_argument('--porta', type=int, default=8811,
+                            help="Porta local usada pelos servidores de teste (padrão: 8811).")
+        parser.add_argument('--usuario',
+                            help="Usuário das requisições (padrão: o primeiro superusuário).")
+
+    def handle(self, *args, **options):
+        modos = [modo.strip() for modo in options['modos'].split(',') if modo.strip()]
+        invalidos = [modo for modo in modos if modo not in MODOS]
+        if invalidos:
+            raise CommandError(f"Modo(s) desconhecido(s): {', '.join(invalidos)}.")
+
+        usuario = self._usuario(options['usuario'])
+        rotas = self._rotas()
+        sessao = self._criar_sessao(usuario)
+        cabecalhos = {
+            'Host': self._host(),
+            'Cookie': f'{settings.SESSION_COOKIE_NAME}={sessao.session_key}',
+        }
+        resultados = {}
+        try:
+            for modo in modos:
+                self.stdout.write(f"\n== {modo}: {options['workers']} worker(s), {options['clientes']} "
+                                  f"cliente(s), {options['exportacoes']} exportação(ões) simultânea(s)")
+                with _servidor(modo, options['porta'], options['workers']):
+                    _carregar(options['porta'], cabecalhos, rotas, clientes=4, duracao=2)  # aquecimento
+                    resultados[modo] = _carregar(
+                        options['porta'], cabecalhos, rotas, options['clientes'],
+                        options['duracao'], options['exportacoes'])
+                self._relatorio(resultados[modo], options['duracao'])
+        finally:
+            sessao.delete()
+
+        if len(resultados) > 1:
+            self._comparacao(resultados)
+
+    def _usuario(self, username):
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f"Usuário '{username}' não encontrado.")
+        usuario = User.objects.filter(is_superuser=True, is_active=True).order_by('id').first()
+        if usuario is None:
+            raise CommandError("Nenhum superusuário ativo; informe --usuario.")
+        return usuario
+
+    def _rotas(self):
+        processos = list(Processo.objects.order_by('-id').values_list(
+            'id', 'numero_processo')[:AMOSTRA_PROCESSOS])
+        if not processos:
+            raise CommandError("Nenhum processo cadastrado para compor a amostra.")
+        hoje = date.today().isoformat()
+        return {
+            'get_process_by_number': [
+                reverse('get_process_by_number', args=[numero]) for _, numero in processos],
+            'taxonomia': [reverse('taxonomia_processos')],
+            'historico_itens': [
+                reverse('historico_processo_itens', args=[id]) for id, _ in processos],
+            'sugestoes': [
+                f"{reverse('sugerir_processos')}?q={quote(numero[:3])}" for _, numero in processos],
+            'exportacao_csv': [
+                f"{reverse('exportar_finalizados_csv')}?"
+                f"{urlencode({'data_inicial': '1900-01-01', 'data_final': hoje})}"],
+        }
+
+    def _criar_sessao(self, usuario):
+        # Sessão autenticada criada direto no banco, sem depender da senha
+        sessao = import_module(settings.SESSION_ENGINE).SessionStore()
+        sessao[SESSION_KEY] = str(usuario.pk)
+        sessao[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        sessao[HASH_SESSION_KEY] = usuario.get_session_auth_hash()
+        sessao.create()
+        return sessao
+
+    def _host(self):
+        candidatos = ['localhost'] + [host.lstrip('.') for host in settings.ALLOWED_HOSTS if host != '*']
+        for host in candidatos:
+            if validate_host(host, settings.ALLOWED_HOSTS):
+                return host
+        raise CommandError("Nenhum host de ALLOWED_HOSTS pode ser usado no teste.")
+
+    def _relatorio(self, medicoes, duracao):
+        self.stdout.write(f"{'rota':<24}{'req':>7}{'erros':>7}{'p50 ms':>9}{'p95 ms':>9}"
+                          f"{'p99 ms':>9}{'máx ms':>9}")
+        for rota, (latencias, erros) in medicoes.items():
+            if not latencias:
+                self.stdout.write(f"{rota:<24}{0:>7}{erros:>7}")
+                continue
+            p50, p95, p99 = _percentis(latencias)
+            self.stdout.write(f"{rota:<24}{len(latencias):>7}{erros:>7}{p50:>9.1f}{p95:>9.1f}"
+                              f"{p99:>9.1f}{max(latencias):>9.1f}")
+        leituras = sum(len(latencias) for rota, (latencias, _) in medicoes.items()
+                       if rota != 'exportacao_csv')
+        self.stdout.write(f"leituras por segundo: {leituras / duracao:.1f}")
+
+    def _comparacao(self, resultados):
+        self.stdout.write("\n== p95 das leituras (ms)")
+        modos = list(resultados)
+        self.stdout.write(f"{'rota':<24}" + ''.join(f"{modo:>10}" for modo in modos))
+        rotas = [rota for rota in resultados[modos[0]] if rota != 'exportacao_csv']
+        for rota in rotas:
+            valores = []
+            for modo in modos:
+                latencias = resultados[modo][rota][0]
+                valores.append(f"{_percentis(latencias)[1]:>10.1f}" if latencias else f"{'-':>10}")
+            self.stdout.write(f"{rota:<24}" + ''.join(valores))
+
+
+def _percentis(latencias):
+    if len(latencias) == 1:
+        return latencias * 3
+    cortes = statistics.quantiles(latencias, n=100, method='inclusive')
+    return cortes[49], cortes[94], cortes[98]
+
+
+@contextmanager
+def _servidor(modo, porta, workers):
+    ambiente = dict(os.environ, SERVIDOR_MODO=modo)
+    comando = [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{porta}',
+               '--workers', str(workers), '--timeout', '120', '--log-level', 'warning',
+               *MODOS[modo]]
+    processo = subprocess.Popen(comando, env=ambiente, cwd=settings.BASE_DIR)
+    try:
+        limite = time.monotonic() + 30
+        while True:
+            if processo.poll() is not None:
+                raise CommandError(f"O gunicorn ({modo}) terminou ao iniciar (código {processo.returncode}).")
+            try:
+                socket.create_connection(('127.0.0.1', porta), timeout=1).close()
+                break
+            except OSError:
+                if time.monotonic() > limite:
+                    raise CommandError(f"O gunicorn ({modo}) não respondeu em 30s.")
+                time.sleep(0.2)
+        yield
+    finally:
+        processo.terminate()
+        try:
+            processo.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            processo.kill()
+            processo.wait()
+
+
+def _carregar(porta, cabecalhos, rotas, clientes, duracao, exportacoes=0):
+    """
+    Executa 'clientes' threads alternando entre as rotas de leitura e
+    'exportacoes' threads baixando a exportação CSV até 'duracao' segundos.
+    Devolve {rota: ([latências em ms], erros)}.
+    """
+    fim = time.monotonic() + duracao
+    lock = threading.Lock()
+    medicoes = {rota: ([], 0) for rota in rotas}
+    # As rotas de leitura se alternam; cada uma percorre a sua amostra
+    de_leitura = {rota: caminhos for rota, caminhos in rotas.items() if rota != 'exportacao_csv'}
+    leituras = [(rota, caminhos[indice % len(caminhos)])
+                for indice in range(max(len(caminhos) for caminhos in de_leitura.values()))
+                for rota, caminhos in de_leitura.items()]
+
+    def registrar(rota, latencia, ok):
+        with lock:
+            latencias, erros = medicoes[rota]
+            if ok:
+                latencias.append(latencia)
+            else:
+                medicoes[rota] = (latencias, erros + 1)
+
+    def cliente(sequencia):
+        indice = 0
+        while time.monotonic() < fim:
+            rota, caminho = sequencia[indice % len(sequencia)]
+            indice += 1
+            # Uma conexão por requisição: o worker síncrono do gunicorn não
+            # mantém conexões abertas, e conexões persistentes presas a um
+            # worker uvicorn desequilibrariam a distribuição entre os workers
+            conexao = HTTPConnection('127.0.0.1', porta, timeout=120)
+            inicio = time.perf_counter()
+            try:
+                conexao.request('GET', caminho, headers=cabecalhos)
+                resposta = conexao.getresponse()
+                while resposta.read(64 * 1024):
+                    pass
+                ok = resposta.status < 400
+            except OSError:
+                ok = False
+            finally:
+                conexao.close()
+            registrar(rota, (time.perf_counter() - inicio) * 1000, ok)
+
+    threads = []
+    for numero in range(clientes):
+        # Cada cliente começa num ponto diferente da amostra
+        deslocamento = numero * 7 % len(leituras)
+        threads.append(threading.Thread(target=cliente, args=(leituras[deslocamento:] + leituras[:deslocamento],)))
+    exportacao = [('exportacao_csv', rotas['exportacao_csv'][0])]
+    threads += [threading.Thread(target=cliente, args=(exportacao,)) for _ in range(exportacoes)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return medicoes
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from processos_app.importacao import importar_processos, TAMANHO_LOTE_IMPORTACAO
+from processos_app.planilhas import ler_linhas
+
+
+class Command(BaseCommand):
+    help = ("Importa processos de uma planilha XLSX ou CSV (livros de protocolo antigos), "
+            "aplicando as mesmas regras de prazo e monitoramento do cadastro.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help="Caminho do arquivo .xlsx ou .csv.")
+        parser.add_argument(
+            '--simular', action='store_true',
+            help="Apenas valida as linhas e relata os erros, sem gravar nada.")
+        parser.add_argument(
+            '--lote', type=int, default=TAMANHO_LOTE_IMPORTACAO,
+            help=f"Linhas gravadas por transação (padrão: {TAMANHO_LOTE_IMPORTACAO}).")
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+        try:
+            with open(options['arquivo'], 'rb') as arquivo:
+                resultado = importar_processos(
+                    ler_linhas(arquivo, options['arquivo']),
+                    simular=options['simular'], tamanho_lote=options['lote'])
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        for numero_linha, mensagem in resultado['erros']:
+            self.stderr.write(f"Linha {numero_linha}: {mensagem}")
+
+        acao = "validado(s)" if options['simular'] else "importado(s)"
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado['importados']} processo(s) {acao}, {len(resultado['erros'])} linha(s) "
+            f"rejeitada(s) em {time.monotonic() - inicio:.1f}s."))
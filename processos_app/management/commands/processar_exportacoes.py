@@ -0,0 +1,85 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from processos_app.exportacao import (encerrar_exportacoes_abandonadas, inicio_limite_exportacao,
+                                      processar_exportacao)
+from processos_app.idempotencia import limpar_chaves_expiradas
+from processos_app.models import ContadorVersao, ExportacaoJob
+from processos_app.permissoes import ContextoPermissao
+from processos_app.views import filtrar_finalizados_exportacao
+
+
+class Command(BaseCommand):
+    help = ("Processa a fila de exportações de processos finalizados solicitadas pela "
+            "página de finalizados, marca como erro as interrompidas há mais de "
+            "EXPORTACAO_TIMEOUT_MINUTOS e remove os arquivos mais antigos que "
+            "EXPORTACAO_RETENCAO_DIAS e as chaves de idempotência expiradas.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--intervalo', type=int, default=5,
+            help="Segundos entre as consultas à fila quando não há exportações pendentes (padrão: 5).")
+        parser.add_argument(
+            '--uma-vez', action='store_true',
+            help="Processa as exportações pendentes e encerra.")
+
+    def handle(self, *args, **options):
+        while True:
+            abandonadas = encerrar_exportacoes_abandonadas()
+            if abandonadas:
+                self.stdout.write(self.style.WARNING(
+                    f"{abandonadas} exportação(ões) interrompida(s) marcada(s) como erro."))
+            self._limpar_antigas()
+            while (job := self._reservar_proximo()) is not None:
+                self._processar(job)
+            if options['uma_vez']:
+                break
+            time.sleep(options['intervalo'])
+
+    def _reservar_proximo(self):
+        # O UPDATE condicional garante que, com mais de um worker, cada job
+        # seja reservado por apenas um deles.
+        with transaction.atomic():
+            job = (ExportacaoJob.objects.select_for_update(skip_locked=True)
+                   .filter(status='PENDENTE').order_by('criado_em').first())
+            if job is None:
+                return None
+            reservado = ExportacaoJob.objects.filter(pk=job.pk, status='PENDENTE').update(
+                status='PROCESSANDO',
+                iniciado_em=timezone.now(),
+                versao_dados=ContadorVersao.objects.obter('processos'),
+            )
+        if not reservado:
+            return self._reservar_proximo()
+        job.refresh_from_db()
+        return job
+
+    def _processar(self, job):
+        try:
+            if job.usuario is None:
+                raise ValueError("O usuário que solicitou a exportação não existe mais.")
+            queryset = filtrar_finalizados_exportacao(ContextoPermissao(job.usuario), job.parametros)
+            processar_exportacao(job, queryset)
+        except Exception as e:
+            ExportacaoJob.objects.filter(pk=job.pk).update(
+                status='ERRO', mensagem=str(e), concluido_em=timezone.now())
+            self.stdout.write(self.style.ERROR(f"Exportação {job.pk} falhou: {e}"))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"Exportação {job.pk} concluída: {job.total} linha(s)."))
+
+    def _limpar_antigas(self):
+        limite = timezone.now() - timedelta(days=settings.EXPORTACAO_RETENCAO_DIAS)
+        # Jobs em PROCESSANDO só entram depois do prazo de abandono
+        antigas = ExportacaoJob.objects.filter(criado_em__lt=limite).exclude(status='PENDENTE').exclude(
+            status='PROCESSANDO', iniciado_em__gte=inicio_limite_exportacao())
+        for job in antigas:
+            if job.arquivo:
+                job.arquivo.delete(save=False)
+            job.delete()
+        limpar_chaves_expiradas()
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from processos_app.planilhas import ler_linhas
+from processos_app.usuarios import provisionar_usuarios
+
+
+class Command(BaseCommand):
+    help = ("Cria em lote os usuários de uma planilha XLSX ou CSV (colunas usuario e nivel; "
+            "opcionais email, nome, sobrenome e senha), já com o perfil do nível informado.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help="Caminho do arquivo .xlsx ou .csv.")
+        parser.add_argument(
+            '--simular', action='store_true',
+            help="Apenas valida as linhas e relata os erros, sem gravar nada.")
+        parser.add_argument(
+            '--senha-inicial',
+            help="Senha dos usuários cuja linha não traz a coluna senha. Sem ela, esses "
+                 "usuários ficam sem senha utilizável até que um administrador defina uma.")
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+        try:
+            with open(options['arquivo'], 'rb') as arquivo:
+                resultado = provisionar_usuarios(
+                    ler_linhas(arquivo, options['arquivo']),
+                    simular=options['simular'], senha_inicial=options['senha_inicial'])
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        for numero_linha, mensagem in resultado['erros']:
+            self.stderr.write(f"Linha {numero_linha}: {mensagem}")
+
+        acao = "validado(s)" if options['simular'] else "criado(s)"
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado['criados']} usuário(s) {acao}, {len(resultado['erros'])} linha(s) "
+            f"rejeitada(s) em {time.monotonic() - inicio:.1f}s."))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from processos_app.models import FacetaProcesso
+
+
+class Command(BaseCommand):
+    help = ("Recalcula a tabela de facetas (gênero/espécie com contagem de processos "
+            "abertos e finalizados) a partir da tabela de processos.")
+
+    def handle(self, *args, **options):
+        total = FacetaProcesso.objects.reconstruir()
+        self.stdout.write(self.style.SUCCESS(
+            f"Facetas reconstruídas: {total} combinação(ões) de gênero/espécie."))
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError
+
+from processos_app.monitoramento import varrer_monitoramento
+
+
+class Command(BaseCommand):
+    help = ("Atualiza em lote o status de monitoramento dos processos finalizados "
+            "(PENDENTE -> ATRASADO e CONCLUIDO -> PENDENTE).")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--intervalo', type=int, default=0,
+            help="Repete a varredura a cada N segundos em vez de executar uma única vez. "
+                 "É assim que o serviço 'monitoramento' dos arquivos do compose a executa.")
+
+    def handle(self, *args, **options):
+        intervalo = options['intervalo']
+        while True:
+            try:
+                varredura = varrer_monitoramento(origem='COMANDO')
+            except DatabaseError as e:
+                if intervalo <= 0:
+                    raise
+                # Em execução contínua, uma falha passageira do banco não
+                # derruba o serviço; a próxima varredura tenta de novo
+                self.stderr.write(f"Erro na varredura: {e}")
+            else:
+                self.stdout.write(self.style.SUCCESS(
+                    f"Varredura concluída: {varredura.atrasados} atrasado(s), "
+                    f"{varredura.reabertos} reaberto(s)."))
+            if intervalo <= 0:
+                break
+            time.sleep(intervalo)
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-18 07:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('processos_app', '0012_alter_processo_volume'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VarreduraMonitoramento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('executada_em', models.DateTimeField(auto_now_add=True, verbose_name='Executada Em')),
+                ('data_referencia', models.DateField(verbose_name='Data de Referência')),
+                ('atrasados', models.IntegerField(default=0, verbose_name='Marcados como Atrasados')),
+                ('reabertos', models.IntegerField(default=0, verbose_name='Reabertos como Pendentes')),
+                ('origem', models.CharField(choices=[('COMANDO', 'Comando de Gerenciamento'), ('AGENDADOR', 'Agendador Interno')], default='COMANDO', max_length=20, verbose_name='Origem')),
+            ],
+            options={
+                'verbose_name': 'Varredura de Monitoramento',
+                'verbose_name_plural': 'Varreduras de Monitoramento',
+                'db_table': 'varreduras_monitoramento',
+            },
+        ),
+    ]
@@ -0,0 +1,95 @@
+# Generated by Django 5.2.5 on 2026-10-18 07:12
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+# Cópia de processos_app.busca como estava nesta migração: o documento gravado
+# aqui não pode mudar se a normalização da aplicação mudar depois.
+CAMPOS_BUSCA = [
+    'numero_processo', 'secretaria', 'destino', 'genero', 'especie', 'objeto',
+    'contratada', 'tecnico', 'observacao', 'valor', 'periodo',
+]
+
+
+def normalizar_texto(texto):
+    if not texto:
+        return ''
+    texto = unicodedata.normalize('NFKD', str(texto))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(re.findall(r'\w+', texto.lower()))
+
+
+def montar_documento_busca(processo):
+    partes = (normalizar_texto(getattr(processo, campo)) for campo in CAMPOS_BUSCA)
+    return ' '.join(parte for parte in partes if parte)
+
+
+def preencher_documento_busca(apps, schema_editor):
+    Processo = apps.get_model('processos_app', 'Processo')
+    db_alias = schema_editor.connection.alias
+    lote = []
+    for processo in Processo.objects.using(db_alias).only('id', *CAMPOS_BUSCA).iterator(chunk_size=2000):
+        processo.documento_busca = montar_documento_busca(processo)
+        lote.append(processo)
+        if len(lote) >= 2000:
+            Processo.objects.using(db_alias).bulk_update(lote, ['documento_busca'])
+            lote = []
+    if lote:
+        Processo.objects.using(db_alias).bulk_update(lote, ['documento_busca'])
+
+
+def criar_indice_busca(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.indexes import GinIndex
+        from django.contrib.postgres.search import SearchVector
+
+        schema_editor.add_index(apps.get_model('processos_app', 'Processo'), GinIndex(
+            SearchVector('documento_busca', config='simple'), name='processos_documento_busca_gin'))
+    elif connection.vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS processos_busca USING fts5("
+            "documento_busca, content='processos', content_rowid='id', "
+            "tokenize='unicode61 remove_diacritics 2')")
+        schema_editor.execute(
+            "CREATE TRIGGER IF NOT EXISTS processos_busca_ai AFTER INSERT ON processos BEGIN "
+            "INSERT INTO processos_busca(rowid, documento_busca) VALUES (new.id, new.documento_busca); END")
+        schema_editor.execute(
+            "CREATE TRIGGER IF NOT EXISTS processos_busca_ad AFTER DELETE ON processos BEGIN "
+            "INSERT INTO processos_busca(processos_busca, rowid, documento_busca) "
+            "VALUES ('delete', old.id, old.documento_busca); END")
+        schema_editor.execute(
+            "CREATE TRIGGER IF NOT EXISTS processos_busca_au AFTER UPDATE OF documento_busca ON processos BEGIN "
+            "INSERT INTO processos_busca(processos_busca, rowid, documento_busca) "
+            "VALUES ('delete', old.id, old.documento_busca); "
+            "INSERT INTO processos_busca(rowid, documento_busca) VALUES (new.id, new.documento_busca); END")
+        schema_editor.execute("INSERT INTO processos_busca(processos_busca) VALUES ('rebuild')")
+
+
+def remover_indice_busca(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS processos_documento_busca_gin')
+    elif connection.vendor == 'sqlite':
+        for gatilho in ('ai', 'ad', 'au'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS processos_busca_{gatilho}')
+        schema_editor.execute('DROP TABLE IF EXISTS processos_busca')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('processos_app', '0013_varreduramonitoramento'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='processo',
+            name='documento_busca',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='Documento de Busca'),
+        ),
+        migrations.RunPython(preencher_documento_busca, migrations.RunPython.noop),
+        migrations.RunPython(criar_indice_busca, remover_indice_busca),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.5 on 2026-10-18 07:14
+
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def preencher_data_prazo(apps, schema_editor):
+    Processo = apps.get_model('processos_app', 'Processo')
+    processos = Processo.objects.using(schema_editor.connection.alias)
+    # Um UPDATE por valor distinto de prazo_dias, sem percorrer linha a linha
+    for prazo_dias in processos.exclude(prazo_dias__isnull=True).values_list(
+            'prazo_dias', flat=True).distinct():
+        processos.filter(prazo_dias=prazo_dias).update(
+            data_prazo=F('data_entrada') + timedelta(days=prazo_dias))
+    sem_prazo = processos.filter(prazo_dias__isnull=True)
+    sem_prazo.filter(prioridade='SIM').update(
+        data_prazo=F('data_entrada') + timedelta(days=2))
+    sem_prazo.exclude(prioridade='SIM').update(
+        data_prazo=F('data_entrada') + timedelta(days=7))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('processos_app', '0014_processo_documento_busca'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='processo',
+            name='data_prazo',
+            field=models.DateField(blank=True, editable=False, null=True, verbose_name='Data do Prazo'),
+        ),
+        migrations.RunPython(preencher_data_prazo, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='processo',
+            index=models.Index(condition=models.Q(('data_saida__isnull', True)), fields=['data_prazo', 'id'], name='processos_abertos_prazo_idx'),
+        ),
+    ]
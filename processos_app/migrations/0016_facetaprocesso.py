@@ -0,0 +1,46 @@
+# Generated by Django 5.2.5 on 2026-10-18 07:15
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def popular_facetas(apps, schema_editor):
+    Processo = apps.get_model('processos_app', 'Processo')
+    FacetaProcesso = apps.get_model('processos_app', 'FacetaProcesso')
+    db_alias = schema_editor.connection.alias
+    contagens = Processo.objects.using(db_alias).values('genero', 'especie').annotate(
+        total_abertos=Count('id', filter=Q(data_saida__isnull=True)),
+        total_finalizados=Count('id', filter=Q(data_saida__isnull=False)),
+    ).order_by()
+    FacetaProcesso.objects.using(db_alias).bulk_create([
+        FacetaProcesso(genero=c['genero'], especie=c['especie'],
+                       abertos=c['total_abertos'], finalizados=c['total_finalizados'])
+        for c in contagens
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('processos_app', '0015_processo_data_prazo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FacetaProcesso',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('genero', models.CharField(max_length=255, verbose_name='Gênero')),
+                ('especie', models.CharField(max_length=255, verbose_name='Espécie')),
+                ('abertos', models.IntegerField(default=0, verbose_name='Processos Abertos')),
+                ('finalizados', models.IntegerField(default=0, verbose_name='Processos Finalizados')),
+            ],
+            options={
+                'verbose_name': 'Faceta de Processos',
+                'verbose_name_plural': 'Facetas de Processos',
+                'db_table': 'processos_facetas',
+                'constraints': [models.UniqueConstraint(fields=('genero', 'especie'), name='processos_faceta_unica')],
+            },
+        ),
+        migrations.RunPython(popular_facetas, migrations.RunPython.noop),
+    ]
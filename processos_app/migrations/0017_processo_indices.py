@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-18 07:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('processos_app', '0016_facetaprocesso'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='processo',
+            index=models.Index(condition=models.Q(('data_saida__isnull', True)), fields=['data_entrada', 'prioridade', 'id'], name='processos_abertos_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='processo',
+            index=models.Index(condition=models.Q(('data_saida__isnull', False)), fields=['-data_saida', 'id'], name='processos_finalizados_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='processo',
+            index=models.Index(fields=['genero', 'especie'], name='processos_genero_especie_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='processo',
+            index=models.Index(fields=['status_monitoramento', 'proxima_data_monitoramento'], name='processos_monitoramento_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='processo',
+            index=models.Index(fields=['numero_processo', '-data_entrada', '-hora_entrada'], name='processos_numero_idx'),
+        ),
+    ]
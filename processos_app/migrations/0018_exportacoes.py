@@ -0,0 +1,56 @@
+# Generated by Django 5.2.5 on 2026-10-18 07:20
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('processos_app', '0017_processo_indices'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorVersao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=50, unique=True, verbose_name='Nome')),
+                ('valor', models.BigIntegerField(default=0, verbose_name='Valor')),
+            ],
+            options={
+                'verbose_name': 'Contador de Versão',
+                'verbose_name_plural': 'Contadores de Versão',
+                'db_table': 'contadores_versao',
+            },
+        ),
+        migrations.CreateModel(
+            name='ExportacaoJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('escopo', models.CharField(max_length=50, verbose_name='Escopo')),
+                ('parametros', models.JSONField(default=dict, verbose_name='Parâmetros')),
+                ('chave', models.CharField(max_length=64, verbose_name='Chave de Cache')),
+                ('versao_dados', models.BigIntegerField(default=0, verbose_name='Versão dos Dados')),
+                ('status', models.CharField(choices=[('PENDENTE', 'Pendente'), ('PROCESSANDO', 'Processando'), ('CONCLUIDO', 'Concluído'), ('ERRO', 'Erro')], default='PENDENTE', max_length=20, verbose_name='Status')),
+                ('progresso', models.IntegerField(default=0, verbose_name='Linhas Processadas')),
+                ('total', models.IntegerField(blank=True, null=True, verbose_name='Total de Linhas')),
+                ('arquivo', models.FileField(blank=True, null=True, upload_to='exportacoes/', verbose_name='Arquivo')),
+                ('nome_arquivo', models.CharField(max_length=255, verbose_name='Nome do Arquivo')),
+                ('mensagem', models.TextField(blank=True, null=True, verbose_name='Mensagem')),
+                ('criado_em', models.DateTimeField(auto_now_add=True, verbose_name='Criado Em')),
+                ('iniciado_em', models.DateTimeField(blank=True, null=True, verbose_name='Iniciado Em')),
+                ('concluido_em', models.DateTimeField(blank=True, null=True, verbose_name='Concluído Em')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Solicitado Por')),
+            ],
+            options={
+                'verbose_name': 'Exportação',
+                'verbose_name_plural': 'Exportações',
+                'db_table': 'exportacoes',
+                'indexes': [models.Index(fields=['chave', 'versao_dados', 'status'], name='exportacoes_chave_idx'), models.Index(fields=['status', 'criado_em'], name='exportacoes_fila_idx')],
+            },
+        ),
+    ]
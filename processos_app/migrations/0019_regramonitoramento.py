@@ -0,0 +1,58 @@
+# Generated by Django 5.2.5 on 2026-10-18 07:24
+
+from django.db import migrations, models
+
+
+# Regras que estavam fixas em salvar_processo/atualizar_processo. 'Concessão
+# Patrocínio' pertence a LICITACOES_E_CONTRATOS, como no formulário de cadastro.
+REGRAS_INICIAIS = [
+    ('LIQUIDACOES', 'P.C. Bolsa Atleta', 'SEMESTRAL'),
+    ('LIQUIDACOES', 'P.C. Adiantamento', 'TRIMESTRAL'),
+    ('LIQUIDACOES', 'Subvenção Social - Prestação de Contas', 'QUADRIMESTRAL'),
+    ('LIQUIDACOES', 'Subvenção Social - P.C. Anual', 'ANUAL'),
+    ('LIQUIDACOES', 'P.C. Subvenção Bloco Carnaval', 'TRIMESTRAL'),
+    ('LIQUIDACOES', 'P.C. Patrocínio', 'TRIMESTRAL'),
+    ('LIQUIDACOES', 'Concessão Aux. Bolsa Atleta', 'TRIMESTRAL'),
+    ('LIQUIDACOES', 'Concessão Aux. Aluguel Social', 'TRIMESTRAL'),
+    ('LIQUIDACOES', 'Concessão Adiantamento', 'TRIMESTRAL'),
+    ('LIQUIDACOES', 'Subvenção Social - Concessão', 'TRIMESTRAL'),
+    ('LIQUIDACOES', 'Concessão Diária', 'TRIMESTRAL'),
+    ('LICITACOES_E_CONTRATOS', 'Concessão Patrocínio', 'TRIMESTRAL'),
+]
+
+
+def criar_regras_iniciais(apps, schema_editor):
+    RegraMonitoramento = apps.get_model('processos_app', 'RegraMonitoramento')
+    RegraMonitoramento.objects.using(schema_editor.connection.alias).bulk_create([
+        RegraMonitoramento(genero=genero, especie=especie, prazo_monitoramento=prazo)
+        for genero, especie, prazo in REGRAS_INICIAIS
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('processos_app', '0018_exportacoes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegraMonitoramento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('genero', models.CharField(choices=[('LIQUIDACOES', 'Liquidações'), ('LICITACOES_E_CONTRATOS', 'Licitações e Contratos'), ('OUTROS_GENERO', 'Outros')], max_length=255, verbose_name='Gênero')),
+                ('especie', models.CharField(max_length=255, verbose_name='Espécie')),
+                ('prazo_monitoramento', models.CharField(choices=[('SEMESTRAL', 'Semestral'), ('QUADRIMESTRAL', 'Quadrimestral'), ('ANUAL', 'Anual'), ('TRIMESTRAL', 'Trimestral'), ('NAO_APLICAVEL', 'Não Aplicável')], max_length=20, verbose_name='Prazo de Monitoramento')),
+                ('conclui_ciclos_anteriores', models.BooleanField(default=True, verbose_name='Conclui Ciclos Anteriores')),
+                ('ativa', models.BooleanField(default=True, verbose_name='Ativa')),
+            ],
+            options={
+                'verbose_name': 'Regra de Monitoramento',
+                'verbose_name_plural': 'Regras de Monitoramento',
+                'db_table': 'regras_monitoramento',
+                'ordering': ['genero', 'especie'],
+                'constraints': [models.UniqueConstraint(fields=('genero', 'especie'), name='regras_monitoramento_unica')],
+            },
+        ),
+        migrations.RunPython(criar_regras_iniciais, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 07:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('processos_app', '0019_regramonitoramento'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='processo',
+            name='versao',
+            field=models.PositiveIntegerField(default=1, editable=False, verbose_name='Versão'),
+        ),
+    ]
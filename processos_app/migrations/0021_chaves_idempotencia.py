@@ -0,0 +1,36 @@
+# Generated by Django 5.2.5 on 2026-10-18 07:37
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('processos_app', '0020_processo_versao'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChaveIdempotencia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chave', models.CharField(max_length=64, verbose_name='Chave')),
+                ('endpoint', models.CharField(max_length=100, verbose_name='Endpoint')),
+                ('hash_requisicao', models.CharField(max_length=64, verbose_name='Hash da Requisição')),
+                ('status_http', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Status HTTP')),
+                ('resposta', models.JSONField(blank=True, null=True, verbose_name='Resposta')),
+                ('criado_em', models.DateTimeField(auto_now_add=True, verbose_name='Criado Em')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Chave de Idempotência',
+                'verbose_name_plural': 'Chaves de Idempotência',
+                'db_table': 'chaves_idempotencia',
+                'indexes': [models.Index(fields=['criado_em'], name='chaves_idempotencia_criado_idx')],
+                'constraints': [models.UniqueConstraint(fields=('usuario', 'endpoint', 'chave'), name='chaves_idempotencia_unica')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-18 07:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('processos_app', '0021_chaves_idempotencia'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='monitoramentorecord',
+            index=models.Index(fields=['processo', 'data_registro'], name='monitoramento_linha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='processhistory',
+            index=models.Index(fields=['process', 'changed_at'], name='process_history_linha_idx'),
+        ),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 5.2.5 on 2026-10-18 07:40
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from datetime import timedelta
+
+from django.db import migrations, models
+
+# Linhas do histórico por campo gravadas pela mesma edição têm changed_at com
+# poucos milissegundos de diferença (auto_now_add é calculado por linha)
+JANELA_MESMA_EDICAO = timedelta(seconds=2)
+TAMANHO_LOTE = 1000
+
+
+def agrupar_historico(apps, schema_editor):
+    alias = schema_editor.connection.alias
+    ProcessHistory = apps.get_model('processos_app', 'ProcessHistory')
+    AlteracaoProcesso = apps.get_model('processos_app', 'AlteracaoProcesso')
+
+    linhas = ProcessHistory.objects.using(alias).order_by('process_id', 'changed_at', 'id').values_list(
+        'process_id', 'changed_by_id', 'changed_at', 'field_name', 'old_value', 'new_value')
+    lote = []
+    atual = None
+    for process_id, changed_by_id, changed_at, field_name, old_value, new_value in linhas.iterator(chunk_size=2000):
+        if (atual is not None and atual.processo_id == process_id
+                and atual.alterado_por_id == changed_by_id
+                and changed_at - atual.alterado_em <= JANELA_MESMA_EDICAO
+                and field_name not in atual.diferencas):
+            atual.diferencas[field_name] = [old_value, new_value]
+            continue
+        if len(lote) >= TAMANHO_LOTE:
+            AlteracaoProcesso.objects.using(alias).bulk_create(lote)
+            lote = []
+        atual = AlteracaoProcesso(processo_id=process_id, alterado_por_id=changed_by_id,
+                                  alterado_em=changed_at, diferencas={field_name: [old_value, new_value]})
+        lote.append(atual)
+    AlteracaoProcesso.objects.using(alias).bulk_create(lote)
+
+
+def desagrupar_historico(apps, schema_editor):
+    alias = schema_editor.connection.alias
+    ProcessHistory = apps.get_model('processos_app', 'ProcessHistory')
+    AlteracaoProcesso = apps.get_model('processos_app', 'AlteracaoProcesso')
+    # Preserva a data original em vez da data da migração
+    ProcessHistory._meta.get_field('changed_at').auto_now_add = False
+
+    lote = []
+    for alteracao in AlteracaoProcesso.objects.using(alias).order_by('id').iterator(chunk_size=2000):
+        lote.extend(
+            ProcessHistory(process_id=alteracao.processo_id, changed_by_id=alteracao.alterado_por_id,
+                           changed_at=alteracao.alterado_em, field_name=campo,
+                           old_value=valores[0], new_value=valores[1])
+            for campo, valores in alteracao.diferencas.items())
+        if len(lote) >= TAMANHO_LOTE:
+            ProcessHistory.objects.using(alias).bulk_create(lote)
+            lote = []
+    ProcessHistory.objects.using(alias).bulk_create(lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('processos_app', '0022_indices_linha_do_tempo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlteracaoProcesso',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('alterado_em', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Data/Hora da Mudança')),
+                ('diferencas', models.JSONField(default=dict, verbose_name='Diferenças')),
+                ('alterado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Alterado Por')),
+                ('processo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alteracoes', to='processos_app.processo', verbose_name='Processo')),
+            ],
+            options={
+                'verbose_name': 'Alteração do Processo',
+                'verbose_name_plural': 'Alterações dos Processos',
+                'db_table': 'processos_alteracoes',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='alteracaoprocesso',
+            index=models.Index(fields=['processo', 'alterado_em'], name='processos_alteracoes_linha_idx'),
+        ),
+        migrations.RunPython(agrupar_historico, desagrupar_historico),
+        migrations.DeleteModel(
+            name='ProcessHistory',
+        ),
+    ]
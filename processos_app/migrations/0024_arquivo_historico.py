@@ -0,0 +1,44 @@
+# Generated by Django 5.2.5 on 2026-10-18 07:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('processos_app', '0023_alteracoes_processo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoteArquivoHistorico',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('ALTERACOES', 'Alterações de Processos'), ('MONITORAMENTO', 'Registros de Monitoramento')], max_length=20, verbose_name='Tipo')),
+                ('mes', models.DateField(verbose_name='Mês de Referência')),
+                ('arquivo', models.FileField(upload_to='arquivo_historico/', verbose_name='Arquivo')),
+                ('linhas', models.IntegerField(default=0, verbose_name='Linhas')),
+                ('criado_em', models.DateTimeField(auto_now_add=True, verbose_name='Criado Em')),
+            ],
+            options={
+                'verbose_name': 'Lote de Histórico Arquivado',
+                'verbose_name_plural': 'Lotes de Histórico Arquivado',
+                'db_table': 'arquivo_historico_lotes',
+                'indexes': [models.Index(fields=['tipo', 'mes'], name='arquivo_historico_mes_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='IndiceArquivoHistorico',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('processo_id', models.BigIntegerField(db_index=True, verbose_name='Processo')),
+                ('lote', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='indice', to='processos_app.lotearquivohistorico', verbose_name='Lote')),
+            ],
+            options={
+                'verbose_name': 'Índice do Histórico Arquivado',
+                'verbose_name_plural': 'Índice do Histórico Arquivado',
+                'db_table': 'arquivo_historico_indice',
+            },
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.5 on 2026-10-18 07:44
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+
+# Cópia de processos_app.busca.normalizar_numero_processo como estava nesta
+# migração, para que os valores preenchidos aqui não dependam do código atual
+def normalizar_numero_processo(numero):
+    if not numero:
+        return ''
+    texto = str(numero)
+    if not texto.isascii():
+        texto = unicodedata.normalize('NFKD', texto)
+        texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(re.findall(r'\w+', texto.lower()))
+
+
+def preencher_numero_normalizado(apps, schema_editor):
+    Processo = apps.get_model('processos_app', 'Processo')
+    db_alias = schema_editor.connection.alias
+    lote = []
+    for processo in Processo.objects.using(db_alias).only('id', 'numero_processo').iterator(chunk_size=2000):
+        processo.numero_normalizado = normalizar_numero_processo(processo.numero_processo)
+        lote.append(processo)
+        if len(lote) >= 2000:
+            Processo.objects.using(db_alias).bulk_update(lote, ['numero_normalizado'])
+            lote = []
+    if lote:
+        Processo.objects.using(db_alias).bulk_update(lote, ['numero_normalizado'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('processos_app', '0024_arquivo_historico'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='processo',
+            name='processos_numero_idx',
+        ),
+        migrations.AddField(
+            model_name='processo',
+            name='numero_normalizado',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255, verbose_name='Número Normalizado'),
+        ),
+        migrations.RunPython(preencher_numero_normalizado, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='processo',
+            index=models.Index(fields=['numero_normalizado', '-data_entrada', '-hora_entrada'], name='processos_numero_idx'),
+        ),
+    ]
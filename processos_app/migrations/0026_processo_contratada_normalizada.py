@@ -0,0 +1,69 @@
+# Generated by Django 5.2.5 on 2026-10-18 07:50
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+# Índices de prefixo (e a normalização) como estavam em processos_app.busca
+# nesta migração, copiados para que ela não dependa do código atual
+INDICES_PREFIXO = {
+    'numero_normalizado': 'processos_numero_prefixo_idx',
+    'contratada_normalizada': 'processos_contratada_pref_idx',
+}
+
+
+def normalizar_texto(texto):
+    if not texto:
+        return ''
+    texto = str(texto)
+    if not texto.isascii():
+        texto = unicodedata.normalize('NFKD', texto)
+        texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(re.findall(r'\w+', texto.lower()))
+
+
+def preencher_contratada_normalizada(apps, schema_editor):
+    Processo = apps.get_model('processos_app', 'Processo')
+    db_alias = schema_editor.connection.alias
+    lote = []
+    for processo in Processo.objects.using(db_alias).exclude(contratada__isnull=True).exclude(
+            contratada='').only('id', 'contratada').iterator(chunk_size=2000):
+        processo.contratada_normalizada = normalizar_texto(processo.contratada)[:255]
+        lote.append(processo)
+        if len(lote) >= 2000:
+            Processo.objects.using(db_alias).bulk_update(lote, ['contratada_normalizada'])
+            lote = []
+    if lote:
+        Processo.objects.using(db_alias).bulk_update(lote, ['contratada_normalizada'])
+
+
+def criar_indices_prefixo(apps, schema_editor):
+    # Collation "C" no Postgres, que ordena pelos bytes como o BINARY do SQLite
+    postgresql = schema_editor.connection.vendor == 'postgresql'
+    for coluna, nome in INDICES_PREFIXO.items():
+        expressao = f'("{coluna}" COLLATE "C")' if postgresql else f'"{coluna}"'
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {nome} ON processos ({expressao})')
+
+
+def remover_indices(apps, schema_editor):
+    for nome in INDICES_PREFIXO.values():
+        schema_editor.execute(f'DROP INDEX IF EXISTS {nome}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('processos_app', '0025_processo_numero_normalizado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='processo',
+            name='contratada_normalizada',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255, verbose_name='Contratada Normalizada'),
+        ),
+        migrations.RunPython(preencher_contratada_normalizada, migrations.RunPython.noop),
+        # Índices por expressão (collation "C" no Postgres), fora do Meta como o GIN da busca
+        migrations.RunPython(criar_indices_prefixo, remover_indices),
+    ]
@@ -1,10 +1,18 @@
 # processos_app/models.py
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F, Q
 from datetime import datetime, date, timedelta
+import uuid
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, pre_save, post_migrate
 from django.dispatch import receiver
-from django.contrib.auth.models import User
+from django.utils import timezone
+from .busca import (CAMPOS_BUSCA, montar_documento_busca, normalizar_numero_processo, normalizar_texto,
+                    instalar_indice_busca, instalar_indices_prefixo)
+
+
+class ConflitoVersao(Exception):
+    """O processo foi alterado por outra gravação desde que foi carregado."""
 
 
 class Processo(models.Model):
@@ -123,38 +131,249 @@ class Processo(models.Model):
         verbose_name="Status da Análise"
     )
 
+    # Texto normalizado (sem acentos, minúsculo) usado pela busca textual
+    documento_busca = models.TextField(
+        blank=True, default='', editable=False, verbose_name="Documento de Busca")
+
+    # Número sem pontuação nem acentos, usado para localizar o processo pelo número
+    numero_normalizado = models.CharField(
+        max_length=255, blank=True, default='', editable=False, verbose_name="Número Normalizado")
+
+    # Contratada sem acentos e em minúsculas, usada no autocompletar por prefixo
+    # (índice criado por busca.instalar_indices_prefixo)
+    contratada_normalizada = models.CharField(
+        max_length=255, blank=True, default='', editable=False, verbose_name="Contratada Normalizada")
+
+    # Data limite (data_entrada + prazo_dias), mantida para filtrar e ordenar no banco
+    data_prazo = models.DateField(
+        null=True, blank=True, editable=False, verbose_name="Data do Prazo")
+
+    # Incrementada a cada gravação; serve de ETag e de condição do UPDATE
+    versao = models.PositiveIntegerField(
+        default=1, editable=False, verbose_name="Versão")
+
+    CAMPOS_PRAZO = {'data_entrada', 'prazo_dias', 'prioridade'}
+
     def __str__(self):
         return self.numero_processo
 
+    def calcular_data_prazo(self):
+        if not self.data_entrada:
+            return None
+        if self.prazo_dias is not None:
+            dias_prazo = self.prazo_dias
+        else:
+            dias_prazo = 2 if self.prioridade == 'SIM' else 7
+        return self.data_entrada + timedelta(days=dias_prazo)
+
+    @property
+    def dias_restantes(self):
+        if not self.data_prazo:
+            return None
+        return (self.data_prazo - date.today()).days
+
+    @property
+    def prazo_formatado(self):
+        dias_restantes = self.dias_restantes
+        if dias_restantes is None:
+            return "-"
+        return f"{dias_restantes} dia(s) {'atrasado' if dias_restantes < 0 else 'restante(s)'}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Guarda o estado carregado para que os sinais ajustem as facetas
+        if {'genero', 'especie', 'data_saida'} <= set(field_names):
+            instance._faceta_original = instance.estado_faceta()
+        return instance
+
+    def estado_faceta(self):
+        return (self.genero, self.especie, self.data_saida is None)
+
+    @property
+    def etag(self):
+        return f'"{self.pk}-{self.versao}"'
+
+    def preparar_campos_derivados(self):
+        # Também chamado antes de bulk_create, que não passa por save()
+        self.documento_busca = montar_documento_busca(self)
+        self.numero_normalizado = normalizar_numero_processo(self.numero_processo)
+        self.contratada_normalizada = normalizar_texto(self.contratada)[:255]
+        self.data_prazo = self.calcular_data_prazo()
+
+    def save(self, *args, **kwargs):
+        self.preparar_campos_derivados()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if update_fields & set(CAMPOS_BUSCA):
+                update_fields.add('documento_busca')
+            if 'numero_processo' in update_fields:
+                update_fields.add('numero_normalizado')
+            if 'contratada' in update_fields:
+                update_fields.add('contratada_normalizada')
+            if update_fields & self.CAMPOS_PRAZO:
+                update_fields.add('data_prazo')
+            kwargs['update_fields'] = update_fields
+
+        if self._state.adding:
+            super().save(*args, **kwargs)
+            return
+
+        # Processo já gravado: o UPDATE só acontece se a versão no banco ainda for
+        # a carregada (ver _do_update); do contrário levanta ConflitoVersao.
+        versao_carregada = self.versao
+        self._versao_esperada = versao_carregada
+        self.versao = versao_carregada + 1
+        if update_fields is not None:
+            update_fields.add('versao')
+        try:
+            super().save(*args, **kwargs)
+        except ConflitoVersao:
+            self.versao = versao_carregada
+            raise
+        finally:
+            self._versao_esperada = None
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        versao_esperada = getattr(self, '_versao_esperada', None)
+        if versao_esperada is None:
+            return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+        if not super()._do_update(base_qs.filter(versao=versao_esperada), using, pk_val,
+                                  values, update_fields, forced_update):
+            if base_qs.filter(pk=pk_val).exists():
+                raise ConflitoVersao(f"Processo {pk_val} alterado por outra gravação.")
+            return False
+        return True
+
     class Meta:
         db_table = 'processos'
         verbose_name_plural = "Processos"
+        indexes = [
+            # Listagem de processos abertos (ordem de listar_processos)
+            models.Index(fields=['data_entrada', 'prioridade', 'id'], name='processos_abertos_idx',
+                         condition=models.Q(data_saida__isnull=True)),
+            models.Index(fields=['data_prazo', 'id'], name='processos_abertos_prazo_idx',
+                         condition=models.Q(data_saida__isnull=True)),
+            # Listagem e exportação de finalizados (ordem de listar_finalizados)
+            models.Index(fields=['-data_saida', 'id'], name='processos_finalizados_idx',
+                         condition=models.Q(data_saida__isnull=False)),
+            models.Index(fields=['genero', 'especie'], name='processos_genero_especie_idx'),
+            # Varredura de monitoramento
+            models.Index(fields=['status_monitoramento', 'proxima_data_monitoramento'],
+                         name='processos_monitoramento_idx'),
+            # Busca por número (get_process_by_number e conclusão automática de ciclos)
+            models.Index(fields=['numero_normalizado', '-data_entrada', '-hora_entrada'],
+                         name='processos_numero_idx'),
+        ]
+
+
+class FacetaProcessoManager(models.Manager):
+    def ativas(self):
+        return self.filter(Q(abertos__gt=0) | Q(finalizados__gt=0))
+
+    def generos(self):
+        return self.ativas().values_list('genero', flat=True).distinct().order_by('genero')
+
+    def especies(self, generos):
+        return self.ativas().filter(genero__in=generos).values_list(
+            'especie', flat=True).distinct().order_by('especie')
+
+    def taxonomia(self):
+        """{genero: [especies em ordem alfabética]} das facetas com processos."""
+        mapa = {}
+        for genero, especie in self.ativas().values_list('genero', 'especie').order_by('genero', 'especie'):
+            mapa.setdefault(genero, []).append(especie)
+        return mapa
+
+    def ajustar(self, genero, especie, abertos=0, finalizados=0):
+        if not abertos and not finalizados:
+            return
+        faceta, created = self.get_or_create(genero=genero, especie=especie)
+        self.filter(pk=faceta.pk).update(
+            abertos=F('abertos') + abertos, finalizados=F('finalizados') + finalizados)
+        # A taxonomia (pares gênero/espécie com processos) só muda quando a
+        # faceta passa a ter ou deixa de ter processos
+        ativa_antes = faceta.abertos > 0 or faceta.finalizados > 0
+        if ativa_antes != self.ativas().filter(pk=faceta.pk).exists():
+            ContadorVersao.objects.incrementar('taxonomia')
+
+    def ajustar_estado(self, estado, delta):
+        genero, especie, aberto = estado
+        if aberto:
+            self.ajustar(genero, especie, abertos=delta)
+        else:
+            self.ajustar(genero, especie, finalizados=delta)
 
+    def reconstruir(self):
+        contagens = Processo.objects.values('genero', 'especie').annotate(
+            total_abertos=Count('id', filter=Q(data_saida__isnull=True)),
+            total_finalizados=Count('id', filter=Q(data_saida__isnull=False)),
+        ).order_by()
+        with transaction.atomic():
+            self.all().delete()
+            self.bulk_create([
+                self.model(genero=c['genero'], especie=c['especie'],
+                           abertos=c['total_abertos'], finalizados=c['total_finalizados'])
+                for c in contagens
+            ])
+            ContadorVersao.objects.incrementar('taxonomia')
+        return len(contagens)
 
-class ProcessHistory(models.Model):
-    process = models.ForeignKey(
-        Processo, on_delete=models.CASCADE, verbose_name="Processo")
-    field_name = models.CharField(max_length=255, verbose_name="Campo")
-    old_value = models.TextField(
-        null=True, blank=True, verbose_name="Valor Antigo")
-    new_value = models.TextField(
-        null=True, blank=True, verbose_name="Novo Valor")
-    changed_at = models.DateTimeField(
-        auto_now_add=True, verbose_name="Data/Hora da Mudança")
-    changed_by = models.ForeignKey(
+
+class FacetaProcesso(models.Model):
+    genero = models.CharField(max_length=255, verbose_name="Gênero")
+    especie = models.CharField(max_length=255, verbose_name="Espécie")
+    abertos = models.IntegerField(default=0, verbose_name="Processos Abertos")
+    finalizados = models.IntegerField(
+        default=0, verbose_name="Processos Finalizados")
+
+    objects = FacetaProcessoManager()
+
+    def __str__(self):
+        return f"{self.genero} / {self.especie}"
+
+    class Meta:
+        db_table = 'processos_facetas'
+        verbose_name = "Faceta de Processos"
+        verbose_name_plural = "Facetas de Processos"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['genero', 'especie'], name='processos_faceta_unica'),
+        ]
+
+
+class AlteracaoProcesso(models.Model):
+    # Uma linha por gravação (change-set), com todos os campos alterados em
+    # 'diferencas': {"campo": [valor_antigo, valor_novo], ...}
+    processo = models.ForeignKey(Processo, on_delete=models.CASCADE,
+                                 related_name='alteracoes', verbose_name="Processo")
+    alterado_em = models.DateTimeField(default=timezone.now, verbose_name="Data/Hora da Mudança")
+    alterado_por = models.ForeignKey(
         User, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Alterado Por")
+    diferencas = models.JSONField(default=dict, verbose_name="Diferenças")
 
     def __str__(self):
-        return f"Histórico de {self.process.numero_processo} - {self.field_name}"
+        return f"Alteração de {self.processo.numero_processo} em {self.alterado_em:%d/%m/%Y %H:%M:%S}"
 
-    @property
-    def changed_at_formatted(self):
-        return self.changed_at.strftime("%d/%m/%Y %H:%M:%S")
+    def campos_alterados(self):
+        """
+        (campo, valor_antigo, valor_novo) na ordem dos campos do Processo; o
+        JSON gravado no Postgres (jsonb) não preserva a ordem das chaves.
+        """
+        return [(campo, *self.diferencas[campo])
+                for campo in sorted(self.diferencas, key=lambda campo: ORDEM_CAMPOS.get(campo, len(ORDEM_CAMPOS)))]
 
     class Meta:
-        db_table = 'process_history'
-        verbose_name = "Histórico do Processo"
-        verbose_name_plural = "Histórico dos Processos"
+        db_table = 'processos_alteracoes'
+        verbose_name = "Alteração do Processo"
+        verbose_name_plural = "Alterações dos Processos"
+        indexes = [
+            models.Index(fields=['processo', 'alterado_em'], name='processos_alteracoes_linha_idx'),
+        ]
+
+
+ORDEM_CAMPOS = {field.name: indice for indice, field in enumerate(Processo._meta.concrete_fields)}
 
 
 class MonitoramentoRecord(models.Model):
@@ -174,6 +393,219 @@ class MonitoramentoRecord(models.Model):
         db_table = 'monitoramento_registros'
         verbose_name = "Registro de Monitoramento"
         verbose_name_plural = "Registros de Monitoramento"
+        indexes = [
+            models.Index(fields=['processo', 'data_registro'], name='monitoramento_linha_idx'),
+        ]
+
+class VarreduraMonitoramento(models.Model):
+    ORIGEM_CHOICES = [
+        ('COMANDO', 'Comando de Gerenciamento'),
+        ('AGENDADOR', 'Agendador Interno'),
+    ]
+
+    executada_em = models.DateTimeField(
+        auto_now_add=True, verbose_name="Executada Em")
+    data_referencia = models.DateField(verbose_name="Data de Referência")
+    atrasados = models.IntegerField(
+        default=0, verbose_name="Marcados como Atrasados")
+    reabertos = models.IntegerField(
+        default=0, verbose_name="Reabertos como Pendentes")
+    origem = models.CharField(
+        max_length=20, choices=ORIGEM_CHOICES, default='COMANDO', verbose_name="Origem")
+
+    def __str__(self):
+        return f"Varredura de {self.executada_em.strftime('%d/%m/%Y %H:%M')}"
+
+    class Meta:
+        db_table = 'varreduras_monitoramento'
+        verbose_name = "Varredura de Monitoramento"
+        verbose_name_plural = "Varreduras de Monitoramento"
+
+class RegraMonitoramento(models.Model):
+    GENERO_CHOICES = [
+        ('LIQUIDACOES', 'Liquidações'),
+        ('LICITACOES_E_CONTRATOS', 'Licitações e Contratos'),
+        ('OUTROS_GENERO', 'Outros'),
+    ]
+
+    genero = models.CharField(
+        max_length=255, choices=GENERO_CHOICES, verbose_name="Gênero")
+    especie = models.CharField(max_length=255, verbose_name="Espécie")
+    prazo_monitoramento = models.CharField(
+        max_length=20,
+        choices=Processo.MONITORAMENTO_CHOICES,
+        verbose_name="Prazo de Monitoramento"
+    )
+    # A entrada de um processo desta espécie conclui os ciclos de monitoramento
+    # pendentes dos processos anteriores com o mesmo número
+    conclui_ciclos_anteriores = models.BooleanField(
+        default=True, verbose_name="Conclui Ciclos Anteriores")
+    ativa = models.BooleanField(default=True, verbose_name="Ativa")
+
+    def __str__(self):
+        return f"{self.genero} / {self.especie}: {self.get_prazo_monitoramento_display()}"
+
+    class Meta:
+        db_table = 'regras_monitoramento'
+        verbose_name = "Regra de Monitoramento"
+        verbose_name_plural = "Regras de Monitoramento"
+        ordering = ['genero', 'especie']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['genero', 'especie'], name='regras_monitoramento_unica'),
+        ]
+
+
+class ContadorVersaoManager(models.Manager):
+    def obter(self, nome):
+        return self.filter(nome=nome).values_list('valor', flat=True).first() or 0
+
+    def incrementar(self, nome):
+        if not self.filter(nome=nome).update(valor=F('valor') + 1):
+            contador, created = self.get_or_create(nome=nome, defaults={'valor': 1})
+            if not created:
+                self.filter(nome=nome).update(valor=F('valor') + 1)
+
+    def incrementar_ao_confirmar(self, nome):
+        # Incrementa só depois do COMMIT, fora da transação de quem escreve: o
+        # UPDATE na linha do contador não prende o lock até o fim de cada
+        # transação, o que serializaria as escritas concorrentes. Quem lê a
+        # versão antiga nesse intervalo já vê os dados novos e a chave é
+        # trocada logo em seguida; se a transação for desfeita, nada muda.
+        transaction.on_commit(lambda: self.incrementar(nome))
+
+
+class ContadorVersao(models.Model):
+    # Contadores monotônicos usados como carimbo de versão ('processos',
+    # 'taxonomia', ...)
+    nome = models.CharField(max_length=50, unique=True, verbose_name="Nome")
+    valor = models.BigIntegerField(default=0, verbose_name="Valor")
+
+    objects = ContadorVersaoManager()
+
+    def __str__(self):
+        return f"{self.nome} = {self.valor}"
+
+    class Meta:
+        db_table = 'contadores_versao'
+        verbose_name = "Contador de Versão"
+        verbose_name_plural = "Contadores de Versão"
+
+
+class ExportacaoJob(models.Model):
+    STATUS_CHOICES = [
+        ('PENDENTE', 'Pendente'),
+        ('PROCESSANDO', 'Processando'),
+        ('CONCLUIDO', 'Concluído'),
+        ('ERRO', 'Erro'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    usuario = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Solicitado Por")
+    # Visibilidade de dados do solicitante (ex.: 'nivel:1'); usuários com o mesmo
+    # escopo compartilham o resultado em cache
+    escopo = models.CharField(max_length=50, verbose_name="Escopo")
+    parametros = models.JSONField(default=dict, verbose_name="Parâmetros")
+    chave = models.CharField(max_length=64, verbose_name="Chave de Cache")
+    versao_dados = models.BigIntegerField(default=0, verbose_name="Versão dos Dados")
+    status = models.CharField(
+        max_length=20, choices=STATUS_CHOICES, default='PENDENTE', verbose_name="Status")
+    progresso = models.IntegerField(default=0, verbose_name="Linhas Processadas")
+    total = models.IntegerField(null=True, blank=True, verbose_name="Total de Linhas")
+    arquivo = models.FileField(
+        upload_to='exportacoes/', null=True, blank=True, verbose_name="Arquivo")
+    nome_arquivo = models.CharField(max_length=255, verbose_name="Nome do Arquivo")
+    mensagem = models.TextField(null=True, blank=True, verbose_name="Mensagem")
+    criado_em = models.DateTimeField(auto_now_add=True, verbose_name="Criado Em")
+    iniciado_em = models.DateTimeField(null=True, blank=True, verbose_name="Iniciado Em")
+    concluido_em = models.DateTimeField(null=True, blank=True, verbose_name="Concluído Em")
+
+    def __str__(self):
+        return f"Exportação {self.id} ({self.status})"
+
+    @property
+    def percentual(self):
+        if self.status == 'CONCLUIDO':
+            return 100
+        if not self.total:
+            return 0
+        return min(99, int(self.progresso * 100 / self.total))
+
+    class Meta:
+        db_table = 'exportacoes'
+        verbose_name = "Exportação"
+        verbose_name_plural = "Exportações"
+        indexes = [
+            models.Index(fields=['chave', 'versao_dados', 'status'], name='exportacoes_chave_idx'),
+            models.Index(fields=['status', 'criado_em'], name='exportacoes_fila_idx'),
+        ]
+
+
+class LoteArquivoHistorico(models.Model):
+    # Arquivo JSON Lines compactado (gzip) com registros de histórico mais antigos
+    # que HISTORICO_ARQUIVAMENTO_DIAS, retirados das tabelas quentes (ver arquivamento.py)
+    TIPO_CHOICES = [
+        ('ALTERACOES', 'Alterações de Processos'),
+        ('MONITORAMENTO', 'Registros de Monitoramento'),
+    ]
+
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES, verbose_name="Tipo")
+    mes = models.DateField(verbose_name="Mês de Referência")
+    arquivo = models.FileField(upload_to='arquivo_historico/', verbose_name="Arquivo")
+    linhas = models.IntegerField(default=0, verbose_name="Linhas")
+    criado_em = models.DateTimeField(auto_now_add=True, verbose_name="Criado Em")
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} {self.mes:%m/%Y} ({self.linhas} linhas)"
+
+    class Meta:
+        db_table = 'arquivo_historico_lotes'
+        verbose_name = "Lote de Histórico Arquivado"
+        verbose_name_plural = "Lotes de Histórico Arquivado"
+        indexes = [
+            models.Index(fields=['tipo', 'mes'], name='arquivo_historico_mes_idx'),
+        ]
+
+
+class IndiceArquivoHistorico(models.Model):
+    # Processos presentes em cada lote, para abrir só os arquivos necessários.
+    # Sem chave estrangeira para Processo: o arquivo sobrevive à exclusão do processo.
+    lote = models.ForeignKey(LoteArquivoHistorico, on_delete=models.CASCADE,
+                             related_name='indice', verbose_name="Lote")
+    processo_id = models.BigIntegerField(db_index=True, verbose_name="Processo")
+
+    class Meta:
+        db_table = 'arquivo_historico_indice'
+        verbose_name = "Índice do Histórico Arquivado"
+        verbose_name_plural = "Índice do Histórico Arquivado"
+
+
+class ChaveIdempotencia(models.Model):
+    # Resposta gravada para cada cabeçalho Idempotency-Key recebido, devolvida
+    # de novo quando o navegador reenvia a mesma requisição (ver idempotencia.py)
+    chave = models.CharField(max_length=64, verbose_name="Chave")
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="Usuário")
+    endpoint = models.CharField(max_length=100, verbose_name="Endpoint")
+    hash_requisicao = models.CharField(max_length=64, verbose_name="Hash da Requisição")
+    status_http = models.PositiveSmallIntegerField(null=True, blank=True, verbose_name="Status HTTP")
+    resposta = models.JSONField(null=True, blank=True, verbose_name="Resposta")
+    criado_em = models.DateTimeField(auto_now_add=True, verbose_name="Criado Em")
+
+    def __str__(self):
+        return f"{self.endpoint} {self.chave}"
+
+    class Meta:
+        db_table = 'chaves_idempotencia'
+        verbose_name = "Chave de Idempotência"
+        verbose_name_plural = "Chaves de Idempotência"
+        constraints = [
+            models.UniqueConstraint(fields=['usuario', 'endpoint', 'chave'],
+                                    name='chaves_idempotencia_unica'),
+        ]
+        indexes = [
+            models.Index(fields=['criado_em'], name='chaves_idempotencia_criado_idx'),
+        ]
 
 # NEW PROFILE MODEL
 
@@ -192,11 +624,72 @@ class Profile(models.Model):
     def __str__(self):
         return f'{self.user.username} Profile'
 
-# Signal to create or update user profile when a User is created/updated
+# Signal to create the user profile when a User is created. Later saves (the
+# login updates last_login every time) don't touch the profile; users created
+# with bulk_create get theirs from provisionar_usuarios.
 
 
 @receiver(post_save, sender=User)
-def create_or_update_user_profile(sender, instance, created, **kwargs):
-    if created:
+def create_user_profile(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
         Profile.objects.create(user=instance)
-    instance.profile.save()
+
+
+# Signals that keep FacetaProcesso in sync with Processo saves/deletes
+
+
+@receiver(pre_save, sender=Processo)
+def carregar_faceta_original(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding or hasattr(instance, '_faceta_original'):
+        return
+    original = Processo.objects.filter(pk=instance.pk).values_list(
+        'genero', 'especie', 'data_saida').first()
+    if original:
+        instance._faceta_original = (original[0], original[1], original[2] is None)
+
+
+@receiver(post_save, sender=Processo)
+def atualizar_faceta_ao_salvar(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    original = None if created else getattr(instance, '_faceta_original', None)
+    novo = instance.estado_faceta()
+    if original != novo:
+        if original:
+            FacetaProcesso.objects.ajustar_estado(original, -1)
+        FacetaProcesso.objects.ajustar_estado(novo, 1)
+    instance._faceta_original = novo
+
+
+@receiver(post_delete, sender=Processo)
+def atualizar_faceta_ao_deletar(sender, instance, **kwargs):
+    estado = getattr(instance, '_faceta_original', None) or instance.estado_faceta()
+    FacetaProcesso.objects.ajustar_estado(estado, -1)
+
+
+@receiver(post_save, sender=Processo)
+@receiver(post_delete, sender=Processo)
+def incrementar_versao_processos(sender, raw=False, **kwargs):
+    if not raw:
+        ContadorVersao.objects.incrementar_ao_confirmar('processos')
+
+
+@receiver(post_save, sender=RegraMonitoramento)
+@receiver(post_delete, sender=RegraMonitoramento)
+def invalidar_cache_regras(sender, raw=False, **kwargs):
+    if raw:
+        return
+    from .monitoramento import invalidar_regras_monitoramento
+    # O contador avisa os demais processos do servidor; o cache local é
+    # descartado na hora
+    ContadorVersao.objects.incrementar('regras_monitoramento')
+    invalidar_regras_monitoramento()
+
+
+@receiver(post_migrate)
+def garantir_indice_busca(sender, using='default', **kwargs):
+    if sender.name != 'processos_app':
+        return
+    from django.db import connections
+    instalar_indice_busca(connections[using])
+    instalar_indices_prefixo(connections[using])
@@ -0,0 +1,169 @@
+# processos_app/monitoramento.py
+import logging
+import threading
+import time
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.db.models import F
+
+from .models import (Processo, VarreduraMonitoramento, ContadorVersao, RegraMonitoramento,
+                     MonitoramentoRecord)
+
+logger = logging.getLogger(__name__)
+
+# Regras de monitoramento compiladas: (versão, verificado_em, prazos, espécies
+# que concluem ciclos anteriores). As alterações feitas neste processo limpam o
+# cache na hora; as de outros processos são percebidas pelo contador de versão,
+# consultado no máximo a cada INTERVALO_VERIFICACAO_REGRAS segundos.
+INTERVALO_VERIFICACAO_REGRAS = 30
+_regras = None
+_regras_lock = threading.Lock()
+
+
+def calcular_proxima_data_monitoramento(data_base, prazo_monitoramento_tipo):
+    """
+    Calcula a próxima data de monitoramento com base na data base e no tipo de prazo.
+    """
+    if not data_base or not prazo_monitoramento_tipo:
+        return None
+
+    if prazo_monitoramento_tipo == 'SEMESTRAL':
+        return data_base + timedelta(days=6*30)  # Aproximadamente 6 meses
+    elif prazo_monitoramento_tipo == 'QUADRIMESTRAL':
+        return data_base + timedelta(days=4*30)  # Aproximadamente 4 meses
+    elif prazo_monitoramento_tipo == 'ANUAL':
+        return data_base + timedelta(days=12*30)  # Aproximadamente 12 meses
+    elif prazo_monitoramento_tipo == 'TRIMESTRAL':
+        return data_base + timedelta(days=3*30)  # Aproximadamente 3 meses
+    return None
+
+
+def _compilar_regras():
+    versao = ContadorVersao.objects.obter('regras_monitoramento')
+    prazos = {}
+    conclusao = set()
+    for genero, especie, prazo, conclui in RegraMonitoramento.objects.filter(ativa=True).values_list(
+            'genero', 'especie', 'prazo_monitoramento', 'conclui_ciclos_anteriores'):
+        prazos[(genero, especie)] = prazo
+        if conclui:
+            conclusao.add(especie)
+    return versao, time.monotonic(), prazos, frozenset(conclusao)
+
+
+def _regras_monitoramento():
+    global _regras
+    regras = _regras
+    if regras is not None and time.monotonic() - regras[1] < INTERVALO_VERIFICACAO_REGRAS:
+        return regras
+    with _regras_lock:
+        regras = _regras
+        if regras is None:
+            _regras = _compilar_regras()
+        elif time.monotonic() - regras[1] >= INTERVALO_VERIFICACAO_REGRAS:
+            if ContadorVersao.objects.obter('regras_monitoramento') == regras[0]:
+                _regras = (regras[0], time.monotonic(), regras[2], regras[3])
+            else:
+                _regras = _compilar_regras()
+        return _regras
+
+
+def invalidar_regras_monitoramento():
+    global _regras
+    with _regras_lock:
+        _regras = None
+
+
+def definir_monitoramento(genero, especie, data_base):
+    """
+    Consulta a regra de monitoramento do par (gênero, espécie) e devolve
+    (prazo_monitoramento, status_monitoramento, proxima_data_monitoramento).
+    Pares sem regra ativa não são monitorados.
+    """
+    prazo = _regras_monitoramento()[2].get((genero, especie), 'NAO_APLICAVEL')
+    if prazo == 'NAO_APLICAVEL':
+        return 'NAO_APLICAVEL', 'NAO_APLICAVEL', None
+    return prazo, 'PENDENTE', calcular_proxima_data_monitoramento(data_base, prazo)
+
+
+def especies_conclusao_automatica():
+    """
+    Espécies cuja entrada conclui os ciclos de monitoramento pendentes dos
+    processos anteriores com o mesmo número.
+    """
+    return _regras_monitoramento()[3]
+
+
+def concluir_ciclos_anteriores(processo, usuario, hoje=None):
+    """
+    Conclui o monitoramento pendente ou atrasado dos processos anteriores com o
+    mesmo número quando 'processo' é de uma espécie que encerra ciclos (ex.: uma
+    nova P.C.). Usa um UPDATE e um bulk_create; deve ser chamada dentro da mesma
+    transação que gravou 'processo'. Retorna a quantidade de ciclos concluídos.
+    """
+    especies = especies_conclusao_automatica()
+    if processo.especie not in especies:
+        return 0
+
+    hoje = hoje or date.today()
+    ids = list(Processo.objects.select_for_update().filter(
+        numero_normalizado=processo.numero_normalizado,
+        especie__in=especies,
+        status_monitoramento__in=['PENDENTE', 'ATRASADO'],
+    ).exclude(id=processo.id).values_list('id', flat=True))
+    if not ids:
+        return 0
+
+    # Remove a próxima data e o tipo de prazo para "desativar" o monitoramento
+    # dos ciclos anteriores
+    Processo.objects.filter(id__in=ids).update(
+        status_monitoramento='CONCLUIDO',
+        proxima_data_monitoramento=None,
+        prazo_monitoramento='NAO_APLICAVEL',
+        versao=F('versao') + 1,
+    )
+    observacao = (f"Monitoramento concluído automaticamente pela entrada de um novo processo "
+                  f"com o mesmo número ({processo.numero_processo}) e espécie relacionada: "
+                  f"{processo.especie}.")
+    MonitoramentoRecord.objects.bulk_create([
+        MonitoramentoRecord(processo_id=processo_id, data_registro=hoje,
+                            observacao=observacao, registrado_por=usuario)
+        for processo_id in ids
+    ])
+    ContadorVersao.objects.incrementar_ao_confirmar('processos')
+    return len(ids)
+
+
+def varrer_monitoramento(hoje=None, origem='COMANDO'):
+    """
+    Aplica as transições de status de monitoramento dos processos finalizados
+    com dois UPDATEs em lote dentro de uma única transação:
+      - PENDENTE com próxima data vencida passa para ATRASADO;
+      - CONCLUIDO com próxima data alcançada volta para PENDENTE.
+    Retorna o registro da varredura com a quantidade de linhas alteradas.
+    """
+    hoje = hoje or date.today()
+    finalizados = Processo.objects.filter(data_saida__isnull=False)
+
+    with transaction.atomic():
+        atrasados = finalizados.filter(
+            status_monitoramento='PENDENTE',
+            proxima_data_monitoramento__lt=hoje
+        ).update(status_monitoramento='ATRASADO', versao=F('versao') + 1)
+
+        reabertos = finalizados.filter(
+            status_monitoramento='CONCLUIDO',
+            proxima_data_monitoramento__isnull=False,
+            proxima_data_monitoramento__lte=hoje
+        ).update(status_monitoramento='PENDENTE', versao=F('versao') + 1)
+
+        if atrasados or reabertos:
+            ContadorVersao.objects.incrementar_ao_confirmar('processos')
+
+        varredura = VarreduraMonitoramento.objects.create(
+            data_referencia=hoje,
+            atrasados=atrasados,
+            reabertos=reabertos,
+            origem=origem,
+        )
+    return varredura
@@ -0,0 +1,142 @@
+# processos_app/pagination.py
+import base64
+import json
+from datetime import date, time, datetime
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q
+
+
+# Limites de itens por página nas listagens
+POR_PAGINA_PADRAO = 50
+POR_PAGINA_MAXIMO = 200
+POR_PAGINA_OPCOES = [25, 50, 100, 200]
+
+
+def obter_por_pagina(valor):
+    """
+    Converte o parâmetro 'por_pagina' da URL, limitando-o ao máximo permitido.
+    """
+    try:
+        por_pagina = int(valor)
+    except (TypeError, ValueError):
+        return POR_PAGINA_PADRAO
+    if por_pagina < 1:
+        return POR_PAGINA_PADRAO
+    return min(por_pagina, POR_PAGINA_MAXIMO)
+
+
+def _serializar_valor(valor):
+    if isinstance(valor, (date, time, datetime)):
+        return valor.isoformat()
+    return valor
+
+
+def codificar_cursor(valores):
+    payload = json.dumps([_serializar_valor(v) for v in valores],
+                         separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def _converter_valor(model, campo, valor):
+    try:
+        return model._meta.get_field(campo).to_python(valor)
+    except FieldDoesNotExist:
+        # Campos anotados (ex.: 'relevancia') são mantidos como vieram no JSON
+        return valor
+
+
+def decodificar_cursor(cursor, model, campos):
+    """
+    Decodifica um cursor gerado por codificar_cursor, convertendo cada valor
+    para o tipo Python do campo correspondente. Retorna None se for inválido.
+    """
+    if not cursor:
+        return None
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + padding))
+        if not isinstance(valores, list) or len(valores) != len(campos):
+            return None
+        return [_converter_valor(model, campo, valor)
+                for campo, valor in zip(campos, valores)]
+    except Exception:
+        return None
+
+
+class PaginaCursor:
+    def __init__(self, itens, proximo_cursor, cursor_anterior, por_pagina):
+        self.itens = itens
+        self.proximo_cursor = proximo_cursor
+        self.cursor_anterior = cursor_anterior
+        self.por_pagina = por_pagina
+
+    @property
+    def tem_proxima(self):
+        return self.proximo_cursor is not None
+
+    @property
+    def tem_anterior(self):
+        return self.cursor_anterior is not None
+
+    def __iter__(self):
+        return iter(self.itens)
+
+    def __len__(self):
+        return len(self.itens)
+
+
+def _filtro_keyset(ordenacao, valores, para_tras=False):
+    # Monta (k1 > v1) OR (k1 = v1 AND k2 > v2) OR ... respeitando a direção
+    # de cada chave. O último campo da ordenação deve ser único (ex.: 'id').
+    filtro = Q()
+    igualdades = {}
+    for campo_ordem, valor in zip(ordenacao, valores):
+        descendente = campo_ordem.startswith('-')
+        campo = campo_ordem.lstrip('-')
+        if descendente != para_tras:
+            lookup = f'{campo}__lt'
+        else:
+            lookup = f'{campo}__gt'
+        filtro |= Q(**igualdades, **{lookup: valor})
+        igualdades[campo] = valor
+    return filtro
+
+
+def _inverter_ordenacao(ordenacao):
+    return [campo[1:] if campo.startswith('-') else f'-{campo}' for campo in ordenacao]
+
+
+def paginar_por_cursor(queryset, ordenacao, apos=None, antes=None, por_pagina=POR_PAGINA_PADRAO):
+    """
+    Paginação por chave (keyset) sobre 'ordenacao'. O custo de cada página não
+    depende da posição na listagem e os cursores continuam válidos mesmo com
+    inserções concorrentes, pois apontam para valores e não para deslocamentos.
+    """
+    campos = [campo.lstrip('-') for campo in ordenacao]
+    model = queryset.model
+
+    valores_antes = decodificar_cursor(antes, model, campos)
+    valores_apos = None if valores_antes else decodificar_cursor(apos, model, campos)
+
+    if valores_antes is not None:
+        itens = list(queryset.filter(_filtro_keyset(ordenacao, valores_antes, para_tras=True))
+                     .order_by(*_inverter_ordenacao(ordenacao))[:por_pagina + 1])
+        tem_anterior = len(itens) > por_pagina
+        itens = itens[:por_pagina]
+        itens.reverse()
+        tem_proxima = True
+    else:
+        if valores_apos is not None:
+            queryset = queryset.filter(_filtro_keyset(ordenacao, valores_apos))
+        itens = list(queryset.order_by(*ordenacao)[:por_pagina + 1])
+        tem_proxima = len(itens) > por_pagina
+        itens = itens[:por_pagina]
+        tem_anterior = valores_apos is not None
+
+    def chave(item):
+        return codificar_cursor([getattr(item, campo) for campo in campos])
+
+    proximo_cursor = chave(itens[-1]) if itens and tem_proxima else None
+    cursor_anterior = chave(itens[0]) if itens and tem_anterior else None
+    return PaginaCursor(itens, proximo_cursor, cursor_anterior, por_pagina)
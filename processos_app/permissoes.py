@@ -0,0 +1,119 @@
+# processos_app/permissoes.py
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import User
+from django.utils.functional import SimpleLazyObject
+
+# Gêneros visíveis para cada nível de perfil (None = todos)
+GENEROS_POR_NIVEL = {
+    '0': None,  # Protocolo: vê todos, com funções limitadas
+    '1': frozenset({'LICITACOES_E_CONTRATOS'}),  # Analista 1
+    '2': frozenset({'LIQUIDACOES'}),  # Analista 2
+    '3': None,  # Usuário Geral
+}
+
+
+class ContextoPermissao:
+    """
+    O que o usuário pode ver e fazer, calculado uma vez a partir do nível do
+    perfil. Use permissoes_do_usuario(user) ou request.permissoes.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.superusuario = user.is_superuser
+        perfil = getattr(user, 'profile', None)
+        self.nivel = perfil.level if perfil is not None else None
+
+        if self.superusuario:
+            self.generos = None
+        else:
+            # Sem perfil ou com nível desconhecido, nenhum processo é visível
+            self.generos = GENEROS_POR_NIVEL.get(self.nivel, frozenset())
+
+        def nivel_em(*niveis):
+            return self.superusuario or self.nivel in niveis
+
+        self.pode_editar = nivel_em('0', '1', '2', '3')
+        self.pode_editar_finalizados = nivel_em('1', '2', '3')
+        self.pode_concluir_monitoramento = nivel_em('1', '2', '3')
+        # Cadastrar, salvar e importar processos
+        self.pode_cadastrar = nivel_em('0', '3')
+        self.pode_marcar_saida = nivel_em('0', '3')
+        self.pode_exportar = nivel_em('0', '3')
+        self.pode_excluir = self.superusuario
+
+    def pode_acessar_genero(self, genero):
+        return self.generos is None or genero in self.generos
+
+    def filtrar_processos(self, queryset):
+        if self.generos is None:
+            return queryset
+        if not self.generos:
+            return queryset.none()
+        return queryset.filter(genero__in=self.generos)
+
+    @property
+    def escopo(self):
+        # Identifica o conjunto de processos visível (gravado em ExportacaoJob.escopo)
+        if self.superusuario:
+            return 'superusuario'
+        if self.nivel is None:
+            return 'sem_perfil'
+        return f'nivel:{self.nivel}'
+
+
+def permissoes_do_usuario(user):
+    """
+    Devolve o ContextoPermissao de 'user', guardado na própria instância para
+    que decorators e views da mesma requisição não o recalculem.
+    """
+    try:
+        return user._permissoes
+    except AttributeError:
+        user._permissoes = ContextoPermissao(user)
+        return user._permissoes
+
+
+class ContextoPermissaoMiddleware:
+    """
+    Disponibiliza request.permissoes (calculado no primeiro acesso). Sob ASGI
+    roda direto no event loop: não há nada a executar na thread síncrona, e o
+    contexto só é calculado quando a view o usa.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        request.permissoes = SimpleLazyObject(lambda: permissoes_do_usuario(request.user))
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        request.permissoes = SimpleLazyObject(lambda: permissoes_do_usuario(request.user))
+        return await self.get_response(request)
+
+
+class BackendComPerfil(ModelBackend):
+    """ModelBackend que carrega o Profile no mesmo SELECT do usuário da sessão."""
+
+    def get_user(self, user_id):
+        try:
+            user = User._default_manager.select_related('profile').get(pk=user_id)
+        except User.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        try:
+            user = await User._default_manager.select_related('profile').aget(pk=user_id)
+        except User.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,84 @@
+# processos_app/planilhas.py
+import csv
+import io
+import os
+from functools import lru_cache
+
+import openpyxl
+
+from .busca import normalizar_texto
+
+
+class ErroLinha(ValueError):
+    pass
+
+
+def ler_linhas(arquivo, nome):
+    """
+    Percorre as linhas de uma planilha XLSX ou de um CSV (separado por vírgula
+    ou ponto e vírgula) sem carregá-la inteira na memória. A primeira linha
+    é o cabeçalho.
+    """
+    extensao = os.path.splitext(nome)[1].lower()
+    if extensao == '.xlsx':
+        workbook = openpyxl.load_workbook(arquivo, read_only=True, data_only=True)
+        try:
+            yield from workbook.active.iter_rows(values_only=True)
+        finally:
+            workbook.close()
+    elif extensao == '.csv':
+        texto = io.TextIOWrapper(arquivo, encoding='utf-8-sig', newline='')
+        try:
+            amostra = texto.read(4096)
+            texto.seek(0)
+            try:
+                dialeto = csv.Sniffer().sniff(amostra, delimiters=',;')
+            except csv.Error:
+                dialeto = csv.excel
+            yield from csv.reader(texto, dialeto)
+        finally:
+            texto.detach()
+    else:
+        raise ValueError("Formato não suportado. Envie um arquivo .xlsx ou .csv.")
+
+
+@lru_cache(maxsize=1024)
+def chave(texto):
+    """Forma comparável de um cabeçalho ou valor: sem acentos, maiúsculas, pontuação ou '_'."""
+    return normalizar_texto(str(texto).replace('_', ' '))
+
+
+def mapear_colunas(cabecalho, aliases, obrigatorios):
+    """
+    Associa cada coluna do cabeçalho ao campo de 'aliases' ({chave: campo});
+    vale a primeira coluna de cada campo. Levanta ValueError se faltar algum
+    dos campos 'obrigatorios'.
+    """
+    colunas = {}
+    for indice, titulo in enumerate(cabecalho):
+        campo = aliases.get(chave(titulo or ''))
+        if campo and campo not in colunas:
+            colunas[campo] = indice
+    faltando = [campo for campo in obrigatorios if campo not in colunas]
+    if faltando:
+        raise ValueError(f"Coluna(s) obrigatória(s) ausente(s): {', '.join(faltando)}.")
+    return colunas
+
+
+def linha_vazia(linha):
+    return not linha or all(valor in (None, '') for valor in linha)
+
+
+def valores_da_linha(linha, colunas):
+    return {campo: linha[indice] if indice < len(linha) else None
+            for campo, indice in colunas.items()}
+
+
+def texto_celula(valor):
+    """Texto de uma célula sem espaços nas pontas, ou None se vazia."""
+    if valor is None:
+        return None
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    texto = str(valor).strip()
+    return texto or None
@@ -0,0 +1,29 @@
+# processos_app/sugestoes.py
+from django.db.models import Max
+
+from .busca import filtrar_prefixo, normalizar_numero_processo, normalizar_texto
+
+LIMITE_SUGESTOES_PADRAO = 10
+LIMITE_SUGESTOES_MAXIMO = 25
+
+# campo -> (coluna normalizada e indexada, coluna exibida, normalização do texto digitado)
+CAMPOS_SUGESTAO = {
+    'numero_processo': ('numero_normalizado', 'numero_processo', normalizar_numero_processo),
+    'contratada': ('contratada_normalizada', 'contratada', normalizar_texto),
+}
+
+
+def sugerir(queryset, campo, texto, limite=LIMITE_SUGESTOES_PADRAO):
+    """
+    Devolve até 'limite' valores distintos de 'campo' ('numero_processo' ou
+    'contratada') que começam com 'texto', comparados sem acentos, maiúsculas
+    ou pontuação, em ordem alfabética. A busca percorre só o trecho do índice
+    da coluna normalizada que começa com o prefixo.
+    """
+    coluna, exibida, normalizar = CAMPOS_SUGESTAO[campo]
+    prefixo = normalizar(texto)
+    if not prefixo:
+        return []
+    linhas = (filtrar_prefixo(queryset, coluna, prefixo)
+              .values('chave_prefixo').annotate(valor=Max(exibida)).order_by('chave_prefixo')[:limite])
+    return [linha['valor'] for linha in linhas]
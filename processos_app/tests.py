@@ -0,0 +1,625 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+from datetime import date, datetime, time, timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import Max
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .busca import aplicar_busca, filtrar_prefixo, instalar_indice_busca
+from .exportacao import encerrar_exportacoes_abandonadas
+from .historico import linha_do_tempo
+from .management.commands.processar_exportacoes import Command as ProcessarExportacoes
+from .models import (AlteracaoProcesso, ChaveIdempotencia, ConflitoVersao, ContadorVersao, ExportacaoJob,
+                     FacetaProcesso, IndiceArquivoHistorico, LoteArquivoHistorico, MonitoramentoRecord, Processo)
+
+# Padrões de plano que indicam leitura completa da tabela de processos ou
+# ordenação de todas as linhas em memória.
+VARREDURA_COMPLETA = {
+    'postgresql': re.compile(r'Seq Scan on processos\b'),
+    'sqlite': re.compile(r'\bSCAN processos\b(?! USING)'),
+}
+ORDENACAO_EM_MEMORIA = {
+    'postgresql': re.compile(r'^\s*(->\s*)?Sort\b', re.MULTILINE),
+    'sqlite': re.compile(r'USE TEMP B-TREE FOR ORDER BY'),
+}
+
+QUANTIDADE_SEMEADA = 5000
+
+
+class IndicesProcessoTests(TestCase):
+    """
+    As consultas principais das views de processos devem continuar usando
+    índice: o EXPLAIN de cada uma não pode ter varredura sequencial da tabela
+    nem, quando a ordem é exigida, ordenação em memória.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        if connection.vendor not in VARREDURA_COMPLETA:
+            return
+        generos = [
+            ('LIQUIDACOES', ['Pagamento Geral', 'P.C. Bolsa Atleta', 'Concessão Diária']),
+            ('LICITACOES_E_CONTRATOS', ['Inexigibilidade', 'Concessão Patrocínio']),
+            ('OUTROS_GENERO', ['Ofício']),
+        ]
+        status = ['PENDENTE', 'CONCLUIDO', 'ATRASADO', 'NAO_APLICAVEL']
+        inicio = date.today() - timedelta(days=3 * 365)
+        lote = []
+        for i in range(QUANTIDADE_SEMEADA):
+            genero, especies = generos[i % len(generos)]
+            data_entrada = inicio + timedelta(days=i % 1000)
+            finalizado = i % 5 != 0
+            processo = Processo(
+                numero_processo=f'{i}/{2000 + i % 25}', volume='1', secretaria='Finanças',
+                data_entrada=data_entrada, hora_entrada=time(9, i % 60),
+                data_saida=data_entrada + timedelta(days=5) if finalizado else None,
+                hora_saida=time(16, 0) if finalizado else None,
+                genero=genero, especie=especies[i % len(especies)],
+                objeto=f'Processo de verificação {i}', contratada=f'Empresa {i % 97}',
+                prioridade='SIM' if i % 7 == 0 else 'NAO', prazo_dias=2 if i % 7 == 0 else 7,
+                status_monitoramento=status[i % len(status)],
+                proxima_data_monitoramento=data_entrada + timedelta(days=90),
+            )
+            processo.preparar_campos_derivados()
+            lote.append(processo)
+        Processo.objects.bulk_create(lote, batch_size=1000)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE processos' if connection.vendor == 'postgresql' else 'ANALYZE')
+
+    def setUp(self):
+        if connection.vendor not in VARREDURA_COMPLETA:
+            self.skipTest(f"Banco '{connection.vendor}' não suportado por esta verificação.")
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                # Com seqscan desabilitado o planejador só recorre à varredura
+                # sequencial quando nenhum índice atende a consulta. Vale até o
+                # fim do teste (o savepoint desfaz o SET LOCAL).
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def _consultas(self):
+        hoje = date.today()
+        abertos = Processo.objects.filter(data_saida__isnull=True)
+        finalizados = Processo.objects.filter(data_saida__isnull=False)
+        return [
+            ('listar_processos', abertos.order_by('data_entrada', 'prioridade', 'id')[:51], True),
+            ('listar_processos (por prazo)', abertos.filter(data_prazo__lt=hoje).order_by('data_prazo', 'id')[:51], True),
+            ('listar_processos (gênero/espécie)', abertos.filter(
+                genero='LIQUIDACOES', especie='Pagamento Geral'), False),
+            ('listar_processos (pesquisa)', aplicar_busca(abertos, 'verificacao empresa'), False),
+            ('listar_finalizados', finalizados.order_by('-data_saida', 'id')[:51], True),
+            ('exportar_finalizados_excel', Processo.objects.filter(
+                data_saida__range=[hoje - timedelta(days=30), hoje]).order_by('data_saida'), True),
+            ('varredura de monitoramento', finalizados.filter(
+                status_monitoramento='PENDENTE', proxima_data_monitoramento__lt=hoje), False),
+            ('get_process_by_number', Processo.objects.filter(numero_normalizado='10 2010').order_by(
+                '-data_entrada', '-hora_entrada')[:1], True),
+            ('sugerir_processos', filtrar_prefixo(Processo.objects.all(), 'contratada_normalizada', 'empresa 1')
+                .values('chave_prefixo').annotate(valor=Max('contratada')).order_by('chave_prefixo')[:10], True),
+        ]
+
+    def test_consultas_usam_indice(self):
+        for nome, queryset, exige_ordem in self._consultas():
+            with self.subTest(consulta=nome):
+                plano = queryset.explain()
+                self.assertIsNone(VARREDURA_COMPLETA[connection.vendor].search(plano),
+                                  f"{nome}: varredura sequencial\n{plano}")
+                if exige_ordem:
+                    self.assertIsNone(ORDENACAO_EM_MEMORIA[connection.vendor].search(plano),
+                                      f"{nome}: ordenação em memória\n{plano}")
+
+
+@override_settings(EXPORTACAO_TIMEOUT_MINUTOS=30, EXPORTACAO_RETENCAO_DIAS=7)
+class ExportacaoAbandonadaTests(TestCase):
+    """Jobs deixados em PROCESSANDO por um worker encerrado não ficam presos."""
+
+    PARAMETROS = {'data_inicial': '2025-01-01', 'data_final': '2025-01-31'}
+
+    def setUp(self):
+        self.usuario = User.objects.create_superuser('admin', 'admin@example.com', 'senha')
+        self.client.force_login(self.usuario)
+
+    def _job_processando(self, minutos, dias_criacao=0):
+        resposta = self.client.get(reverse('exportar_finalizados_excel'), self.PARAMETROS)
+        job = ExportacaoJob.objects.get(pk=resposta.json()['id'])
+        ExportacaoJob.objects.filter(pk=job.pk).update(
+            status='PROCESSANDO', iniciado_em=timezone.now() - timedelta(minutes=minutos),
+            criado_em=timezone.now() - timedelta(days=dias_criacao, minutes=minutos))
+        return job
+
+    def test_view_reaproveita_job_em_andamento(self):
+        job = self._job_processando(minutos=5)
+        resposta = self.client.get(reverse('exportar_finalizados_excel'), self.PARAMETROS)
+        self.assertEqual(resposta.status_code, 202)
+        self.assertEqual(resposta.json()['id'], str(job.pk))
+
+    def test_view_nao_reaproveita_job_abandonado(self):
+        job = self._job_processando(minutos=45)
+        resposta = self.client.get(reverse('exportar_finalizados_excel'), self.PARAMETROS)
+        self.assertEqual(resposta.status_code, 202)
+        self.assertNotEqual(resposta.json()['id'], str(job.pk))
+        self.assertEqual(ExportacaoJob.objects.get(pk=resposta.json()['id']).status, 'PENDENTE')
+
+    def test_worker_marca_abandonados_como_erro(self):
+        abandonado = self._job_processando(minutos=45)
+        ExportacaoJob.objects.exclude(pk=abandonado.pk).delete()
+        em_andamento = self._job_processando(minutos=5)
+
+        self.assertEqual(encerrar_exportacoes_abandonadas(), 1)
+        abandonado.refresh_from_db()
+        em_andamento.refresh_from_db()
+        self.assertEqual(abandonado.status, 'ERRO')
+        self.assertIsNotNone(abandonado.concluido_em)
+        self.assertEqual(em_andamento.status, 'PROCESSANDO')
+
+    def test_limpeza_inclui_processando_abandonado(self):
+        abandonado = self._job_processando(minutos=45, dias_criacao=10)
+        ExportacaoJob.objects.exclude(pk=abandonado.pk).delete()
+        recente = self._job_processando(minutos=5, dias_criacao=10)
+
+        ProcessarExportacoes()._limpar_antigas()
+        self.assertFalse(ExportacaoJob.objects.filter(pk=abandonado.pk).exists())
+        self.assertTrue(ExportacaoJob.objects.filter(pk=recente.pk).exists())
+
+
+class MigracaoAlteracoesProcessoTests(TransactionTestCase):
+    """
+    A migração 0023 agrupa as linhas de ProcessHistory (uma por campo) em
+    change-sets de AlteracaoProcesso e apaga a tabela antiga: as linhas do
+    mesmo processo e usuário com até 2s de diferença formam uma alteração.
+    """
+
+    anterior = [('processos_app', '0022_indices_linha_do_tempo')]
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        self.atual = executor.loader.graph.leaf_nodes('processos_app')
+        executor.migrate(self.anterior)
+        self.apps = executor.loader.project_state(self.anterior).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.atual)
+        # O SQLite recria a tabela de processos ao desfazer/refazer migrações
+        # e perde os gatilhos da busca textual
+        instalar_indice_busca(connection)
+
+    def _semear(self):
+        Processo = self.apps.get_model('processos_app', 'Processo')
+        ProcessHistory = self.apps.get_model('processos_app', 'ProcessHistory')
+        ProcessHistory._meta.get_field('changed_at').auto_now_add = False
+        ana = User.objects.create(username='ana')
+        bruno = User.objects.create(username='bruno')
+        processos = [Processo.objects.create(
+            numero_processo=numero, volume='1', secretaria='Finanças', data_entrada=date(2025, 1, 2),
+            hora_entrada=time(9, 0), genero='LIQUIDACOES', especie='Pagamento Geral', objeto='Objeto')
+            for numero in ('1/2025', '2/2025')]
+        t0 = timezone.now().replace(microsecond=0) - timedelta(days=1)
+
+        def linha(processo, usuario, segundos, campo, antigo, novo):
+            ProcessHistory.objects.create(
+                process_id=processo.pk, changed_by_id=usuario.pk, changed_at=t0 + timedelta(seconds=segundos),
+                field_name=campo, old_value=antigo, new_value=novo)
+
+        primeiro, segundo = processos
+        # Uma edição de Ana (dois campos gravados com milissegundos de diferença)
+        linha(primeiro, ana, 0, 'objeto', 'Objeto', 'Objeto novo')
+        linha(primeiro, ana, 0.004, 'volume', '1', '2')
+        # Bruno edita o mesmo processo 1s depois: outra alteração
+        linha(primeiro, bruno, 1, 'contratada', None, 'Empresa X')
+        # Ana, no mesmo instante, em outro processo: outra alteração
+        linha(segundo, ana, 0, 'objeto', 'Objeto', 'Outro objeto')
+        # Ana altera de novo um campo da primeira edição dentro da janela: outra alteração
+        linha(primeiro, ana, 1.5, 'objeto', 'Objeto novo', 'Objeto final')
+        # Ana, minutos depois
+        linha(primeiro, ana, 300, 'prioridade', 'NAO', 'SIM')
+        return processos, ana, bruno, t0
+
+    def test_agrupa_historico_em_alteracoes(self):
+        (primeiro, segundo), ana, bruno, t0 = self._semear()
+        MigrationExecutor(connection).migrate(self.atual)
+
+        alteracoes = [
+            (alteracao.processo_id, alteracao.alterado_por_id, alteracao.alterado_em - t0,
+             alteracao.campos_alterados())
+            for alteracao in AlteracaoProcesso.objects.order_by('processo_id', 'alterado_em', 'id')]
+        self.assertEqual(alteracoes, [
+            (primeiro.pk, ana.pk, timedelta(0), [('volume', '1', '2'), ('objeto', 'Objeto', 'Objeto novo')]),
+            (primeiro.pk, bruno.pk, timedelta(seconds=1), [('contratada', None, 'Empresa X')]),
+            (primeiro.pk, ana.pk, timedelta(seconds=1.5), [('objeto', 'Objeto novo', 'Objeto final')]),
+            (primeiro.pk, ana.pk, timedelta(seconds=300), [('prioridade', 'NAO', 'SIM')]),
+            (segundo.pk, ana.pk, timedelta(0), [('objeto', 'Objeto', 'Outro objeto')]),
+        ])
+
+    def test_reversao_restaura_uma_linha_por_campo(self):
+        self._semear()
+        ProcessHistory = self.apps.get_model('processos_app', 'ProcessHistory')
+        campos = ('process_id', 'changed_by_id', 'field_name', 'old_value', 'new_value')
+        originais = sorted(ProcessHistory.objects.values_list(*campos))
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.atual)
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.anterior)
+
+        self.assertEqual(sorted(ProcessHistory.objects.values_list(*campos)), originais)
+
+
+class ArquivamentoHistoricoTests(TestCase):
+    """
+    'manage.py arquivar_historico' tira linhas das tabelas quentes: o arquivo
+    gerado tem de reproduzir os registros e a linha do tempo não pode mudar.
+    """
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        configuracao = override_settings(MEDIA_ROOT=self.media, HISTORICO_ARQUIVAMENTO_DIAS=730)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+
+        self.usuario = User.objects.create(username='ana')
+        self.processo, self.outro = [Processo.objects.create(
+            numero_processo=numero, volume='1', secretaria='Finanças', data_entrada=date(2023, 3, 1),
+            hora_entrada=time(9, 0), data_saida=date(2023, 3, 2), hora_saida=time(16, 0),
+            genero='LIQUIDACOES', especie='Pagamento Geral', objeto='Objeto')
+            for numero in ('1/2023', '2/2023')]
+        AlteracaoProcesso.objects.all().delete()
+        MonitoramentoRecord.objects.all().delete()
+
+    def _alteracao(self, processo, quando, campo, antigo, novo):
+        return AlteracaoProcesso.objects.create(
+            processo=processo, alterado_por=self.usuario, diferencas={campo: [antigo, novo]},
+            alterado_em=timezone.make_aware(quando))
+
+    def _monitoramento(self, processo, dia, observacao):
+        record = MonitoramentoRecord.objects.create(
+            processo=processo, observacao=observacao, registrado_por=self.usuario)
+        MonitoramentoRecord.objects.filter(pk=record.pk).update(data_registro=dia)
+        record.data_registro = dia
+        return record
+
+    def _semear_marco_2023(self):
+        return [
+            self._alteracao(self.processo, datetime(2023, 3, 10, 14, 30), 'objeto', 'Objeto', 'Objeto revisto'),
+            self._alteracao(self.processo, datetime(2023, 3, 20, 9, 0), 'destino', None, 'Arquivo'),
+            self._alteracao(self.outro, datetime(2023, 3, 15, 11, 0), 'valor', '10,00', '12,00'),
+        ], [self._monitoramento(self.processo, date(2023, 3, 25), 'Conferido')]
+
+    def _arquivar(self):
+        call_command('arquivar_historico', stdout=StringIO())
+
+    def _ler_lote(self, tipo):
+        lote = LoteArquivoHistorico.objects.get(tipo=tipo)
+        with lote.arquivo.open('rb') as arquivo:
+            return lote, [json.loads(linha) for linha in gzip.decompress(arquivo.read()).splitlines()]
+
+    def test_arquiva_mes_e_preserva_linha_do_tempo(self):
+        alteracoes, registros = self._semear_marco_2023()
+        recente = self._alteracao(self.processo, datetime.now() - timedelta(days=1), 'volume', '1', '2')
+        antes, _ = linha_do_tempo(self.processo, por_pagina=50, incluir_arquivo=True)
+
+        self._arquivar()
+
+        # As linhas antigas saíram das tabelas; a recente ficou
+        self.assertEqual(list(AlteracaoProcesso.objects.values_list('id', flat=True)), [recente.id])
+        self.assertFalse(MonitoramentoRecord.objects.exists())
+
+        lote, linhas = self._ler_lote('ALTERACOES')
+        self.assertEqual((lote.mes, lote.linhas), (date(2023, 3, 1), 3))
+        for linha in linhas:
+            linha['alterado_em'] = parse_datetime(linha['alterado_em'])
+        self.assertEqual(sorted(linhas, key=lambda linha: linha['id']), [{
+            'id': alteracao.id,
+            'processo_id': alteracao.processo_id,
+            'alterado_em': alteracao.alterado_em,
+            'alterado_por_id': self.usuario.id,
+            'alterado_por': 'ana',
+            'diferencas': alteracao.diferencas,
+        } for alteracao in alteracoes])
+        self.assertEqual(set(lote.indice.values_list('processo_id', flat=True)),
+                         {self.processo.id, self.outro.id})
+
+        lote, linhas = self._ler_lote('MONITORAMENTO')
+        self.assertEqual((lote.mes, lote.linhas), (date(2023, 3, 1), 1))
+        self.assertEqual(linhas, [{
+            'id': registros[0].id, 'processo_id': self.processo.id, 'data_registro': '2023-03-25',
+            'registrado_por_id': self.usuario.id, 'registrado_por': 'ana', 'observacao': 'Conferido',
+        }])
+        self.assertEqual(list(lote.indice.values_list('processo_id', flat=True)), [self.processo.id])
+
+        depois, _ = linha_do_tempo(self.processo, por_pagina=50, incluir_arquivo=True)
+        self.assertEqual(depois, antes)
+        self.assertEqual(len(depois), 4)
+        outro, _ = linha_do_tempo(self.outro, por_pagina=50, incluir_arquivo=True)
+        self.assertEqual([item['campo'] for item in outro], ['valor'])
+
+    def test_falha_ao_gravar_arquivo_mantem_registros(self):
+        self._semear_marco_2023()
+        self._alteracao(self.processo, datetime(2023, 4, 5, 10, 0), 'objeto', 'Objeto revisto', 'Final')
+        salvar = FileSystemStorage._save
+        chamadas = []
+
+        def salvar_e_falhar_no_segundo(storage, nome, conteudo):
+            chamadas.append(nome)
+            if len(chamadas) == 2:
+                raise OSError("disco cheio")
+            return salvar(storage, nome, conteudo)
+
+        with mock.patch.object(FileSystemStorage, '_save', salvar_e_falhar_no_segundo):
+            with self.assertRaises(OSError):
+                self._arquivar()
+
+        self.assertEqual(len(chamadas), 2)
+        self.assertEqual(AlteracaoProcesso.objects.count(), 4)
+        self.assertEqual(MonitoramentoRecord.objects.count(), 1)
+        self.assertFalse(LoteArquivoHistorico.objects.exists())
+        self.assertFalse(IndiceArquivoHistorico.objects.exists())
+        # O arquivo do primeiro mês, gravado antes da falha, foi removido
+        gravados = [nome for _, _, nomes in os.walk(self.media) for nome in nomes]
+        self.assertEqual(gravados, [])
+
+
+def _novo_processo(**campos):
+    dados = dict(numero_processo='1/2025', volume='1', secretaria='Finanças', data_entrada=date(2025, 1, 2),
+                 hora_entrada=time(9, 0), genero='LIQUIDACOES', especie='Pagamento Geral', objeto='Objeto',
+                 prioridade='NAO', prazo_dias=7)
+    dados.update(campos)
+    return Processo.objects.create(**dados)
+
+
+class ConcorrenciaProcessoTests(TestCase):
+    """Controle otimista: a versão da linha e o If-Match das views de gravação."""
+
+    def setUp(self):
+        self.usuario = User.objects.create_user('ana', password='senha')
+        self.client.force_login(self.usuario)
+        self.processo = _novo_processo()
+
+    def _atualizar(self, dados, **cabecalhos):
+        return self.client.post(reverse('atualizar_processo', args=[self.processo.id]), dados,
+                                content_type='application/json', headers=cabecalhos)
+
+    def test_save_incrementa_versao(self):
+        self.assertEqual(self.processo.versao, 1)
+        self.processo.objeto = 'Outro'
+        self.processo.save()
+        self.assertEqual(self.processo.versao, 2)
+        self.assertEqual(Processo.objects.get(pk=self.processo.pk).versao, 2)
+
+    def test_save_de_instancia_desatualizada_levanta_conflito(self):
+        outra = Processo.objects.get(pk=self.processo.pk)
+        outra.objeto = 'Gravado antes'
+        outra.save()
+
+        self.processo.objeto = 'Gravado depois'
+        # Como nas views: o save levanta dentro de um atomic, desfeito por inteiro
+        with self.assertRaises(ConflitoVersao), transaction.atomic():
+            self.processo.save(update_fields=['objeto'])
+        # A instância volta à versão carregada e o banco fica com a outra gravação
+        self.assertEqual(self.processo.versao, 1)
+        atual = Processo.objects.get(pk=self.processo.pk)
+        self.assertEqual((atual.objeto, atual.versao), ('Gravado antes', 2))
+
+    def test_if_match_atual_grava(self):
+        resposta = self._atualizar({'objeto': 'Novo objeto'}, if_match=self.processo.etag)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.json()['versao'], 2)
+        self.assertEqual(resposta['ETag'], f'"{self.processo.id}-2"')
+        self.assertEqual(AlteracaoProcesso.objects.filter(processo=self.processo).count(), 1)
+
+    def test_if_match_desatualizado_responde_409(self):
+        etag_antiga = self.processo.etag
+        self._atualizar({'objeto': 'Primeira edição'})
+
+        resposta = self._atualizar({'objeto': 'Edição sobre versão antiga'}, if_match=etag_antiga)
+        self.assertEqual(resposta.status_code, 409)
+        self.assertTrue(resposta.json()['conflito'])
+        self.assertEqual(resposta['ETag'], f'"{self.processo.id}-2"')
+        atual = Processo.objects.get(pk=self.processo.pk)
+        self.assertEqual((atual.objeto, atual.versao), ('Primeira edição', 2))
+        self.assertEqual(AlteracaoProcesso.objects.filter(processo=self.processo).count(), 1)
+
+    def test_sem_if_match_grava(self):
+        resposta = self._atualizar({'objeto': 'Sem cabeçalho'})
+        self.assertEqual(resposta.status_code, 200)
+
+    def test_concluir_monitoramento_com_if_match_desatualizado(self):
+        etag_antiga = self.processo.etag
+        self._atualizar({'objeto': 'Primeira edição'})
+
+        resposta = self.client.post(reverse('concluir_monitoramento', args=[self.processo.id]),
+                                    headers={'If-Match': etag_antiga})
+        self.assertEqual(resposta.status_code, 409)
+        self.assertFalse(MonitoramentoRecord.objects.filter(processo=self.processo).exists())
+        self.assertIsNone(Processo.objects.get(pk=self.processo.pk).data_saida)
+
+    def test_versao_dos_dados_muda_so_depois_do_commit(self):
+        versao = ContadorVersao.objects.obter('processos')
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self._atualizar({'objeto': 'Novo objeto'})
+            self.assertEqual(ContadorVersao.objects.obter('processos'), versao)
+        self.assertTrue(callbacks)
+        self.assertEqual(ContadorVersao.objects.obter('processos'), versao + 1)
+
+
+class IdempotenciaSalvarProcessoTests(TestCase):
+    """Reenvios de salvar_processo com o mesmo Idempotency-Key."""
+
+    def setUp(self):
+        self.usuario = User.objects.create_user('ana', password='senha')
+        self.client.force_login(self.usuario)
+        self.dados = {
+            'numero_processo': '7/2025', 'volume': '1', 'secretaria': 'Finanças',
+            'data_entrada': '2025-01-02', 'hora_entrada': '09:00', 'genero': 'LIQUIDACOES',
+            'especie': 'Pagamento Geral', 'objeto': 'Objeto', 'prioridade': 'NAO',
+        }
+
+    def _salvar(self, dados, chave='chave-1', cliente=None):
+        return (cliente or self.client).post(
+            reverse('salvar_processo'), json.dumps(dados), content_type='application/json',
+            headers={'Idempotency-Key': chave})
+
+    def test_reenvio_repete_a_resposta_sem_gravar_de_novo(self):
+        primeira = self._salvar(self.dados)
+        segunda = self._salvar(self.dados)
+
+        self.assertEqual(primeira.status_code, 200)
+        self.assertEqual(segunda.status_code, 200)
+        self.assertEqual(segunda.json(), primeira.json())
+        self.assertEqual(segunda['Idempotent-Replayed'], 'true')
+        self.assertNotIn('Idempotent-Replayed', primeira)
+        self.assertEqual(Processo.objects.count(), 1)
+
+    def test_chave_reusada_com_outro_corpo_responde_422(self):
+        self._salvar(self.dados)
+        resposta = self._salvar({**self.dados, 'objeto': 'Outro objeto'})
+
+        self.assertEqual(resposta.status_code, 422)
+        self.assertEqual(list(Processo.objects.values_list('objeto', flat=True)), ['Objeto'])
+
+    def test_chave_em_processamento_responde_409(self):
+        # Reserva gravada pela primeira requisição, ainda sem resposta
+        ChaveIdempotencia.objects.create(
+            chave='chave-1', usuario=self.usuario, endpoint='salvar_processo',
+            hash_requisicao=hashlib.sha256(json.dumps(self.dados).encode()).hexdigest())
+        resposta = self._salvar(self.dados)
+
+        self.assertEqual(resposta.status_code, 409)
+        self.assertFalse(Processo.objects.exists())
+
+    def test_resposta_de_erro_nao_e_guardada(self):
+        resposta = self._salvar({**self.dados, 'volume': ''})
+        self.assertEqual(resposta.status_code, 400)
+        self.assertFalse(ChaveIdempotencia.objects.exists())
+
+        # A mesma chave pode ser usada na nova tentativa, já corrigida
+        resposta = self._salvar(self.dados)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(Processo.objects.count(), 1)
+
+    def test_chave_e_por_usuario(self):
+        outro = User.objects.create_user('bruno', password='senha')
+        cliente = Client()
+        cliente.force_login(outro)
+
+        self._salvar(self.dados)
+        resposta = self._salvar(self.dados, cliente=cliente)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertNotIn('Idempotent-Replayed', resposta)
+        self.assertEqual(Processo.objects.count(), 2)
+
+    def test_chave_longa_demais_responde_400(self):
+        resposta = self._salvar(self.dados, chave='x' * 65)
+        self.assertEqual(resposta.status_code, 400)
+        self.assertFalse(Processo.objects.exists())
+
+
+class LoteProcessosTests(TestCase):
+    """Verificação de versão e efeitos colaterais das ações em lote."""
+
+    def setUp(self):
+        self.usuario = User.objects.create_user('ana', password='senha')
+        self.client.force_login(self.usuario)
+        self.abertos = [_novo_processo(numero_processo=f'{n}/2025') for n in (1, 2)]
+        self.finalizado = _novo_processo(numero_processo='3/2025', data_saida=date(2025, 1, 10),
+                                         hora_saida=time(15, 0))
+
+    def _enviar(self, nome_url, processos):
+        corpo = {'processos': [{'id': processo.pk, 'versao': processo.versao} for processo in processos]}
+        return self.client.post(reverse(nome_url), json.dumps(corpo), content_type='application/json')
+
+    def _faceta(self):
+        faceta = FacetaProcesso.objects.get(genero='LIQUIDACOES', especie='Pagamento Geral')
+        return faceta.abertos, faceta.finalizados
+
+    def _versoes(self):
+        return dict(Processo.objects.values_list('pk', 'versao'))
+
+    def test_marcar_saida_lote(self):
+        versoes = self._versoes()
+        self.assertEqual(self._faceta(), (2, 1))
+
+        resposta = self._enviar('marcar_saida_lote', self.abertos + [self.finalizado])
+
+        self.assertEqual(resposta.status_code, 200)
+        ids_abertos = sorted(processo.pk for processo in self.abertos)
+        self.assertEqual(sorted(resposta.json()['atualizados']), ids_abertos)
+        self.assertEqual(resposta.json()['ignorados'], [self.finalizado.pk])
+        for processo in self.abertos:
+            processo.refresh_from_db()
+            self.assertIsNotNone(processo.data_saida)
+            self.assertEqual(processo.versao, versoes[processo.pk] + 1)
+        self.finalizado.refresh_from_db()
+        self.assertEqual(self.finalizado.data_saida, date(2025, 1, 10))
+        self.assertEqual(self.finalizado.versao, versoes[self.finalizado.pk])
+
+        alteracoes = AlteracaoProcesso.objects.filter(alterado_por=self.usuario)
+        self.assertEqual(sorted(alteracoes.values_list('processo_id', flat=True)), ids_abertos)
+        self.assertEqual(alteracoes.first().diferencas['data_saida'][0], None)
+        self.assertEqual(self._faceta(), (0, 3))
+
+    def test_marcar_saida_lote_com_versao_desatualizada(self):
+        Processo.objects.filter(pk=self.abertos[1].pk).update(versao=self.abertos[1].versao + 1)
+        versoes = self._versoes()
+
+        resposta = self._enviar('marcar_saida_lote', self.abertos)
+
+        self.assertEqual(resposta.status_code, 409)
+        self.assertTrue(resposta.json()['conflito'])
+        self.assertEqual(resposta.json()['ids'], [self.abertos[1].pk])
+        self.assertFalse(Processo.objects.filter(pk__in=[p.pk for p in self.abertos],
+                                                 data_saida__isnull=False).exists())
+        self.assertEqual(self._versoes(), versoes)
+        self.assertFalse(AlteracaoProcesso.objects.filter(alterado_por=self.usuario).exists())
+        self.assertEqual(self._faceta(), (2, 1))
+
+    def test_concluir_monitoramento_lote(self):
+        versoes = self._versoes()
+
+        resposta = self._enviar('concluir_monitoramento_lote', [self.abertos[0], self.finalizado])
+
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(sorted(resposta.json()['atualizados']), sorted([self.abertos[0].pk, self.finalizado.pk]))
+        self.assertEqual(resposta.json()['ignorados'], [])
+        for processo in (self.abertos[0], self.finalizado):
+            processo.refresh_from_db()
+            self.assertEqual(processo.status_monitoramento, 'CONCLUIDO')
+            self.assertIsNone(processo.proxima_data_monitoramento)
+            self.assertEqual(processo.versao, versoes[processo.pk] + 1)
+            self.assertEqual(processo.monitoramento_registros.count(), 1)
+        # A saída já registrada é preservada; o aberto recebe a de hoje
+        self.assertEqual(self.finalizado.data_saida, date(2025, 1, 10))
+        self.assertEqual(self.finalizado.hora_saida, time(15, 0))
+        self.assertEqual(self.abertos[0].data_saida, timezone.localdate())
+
+        alteracoes = AlteracaoProcesso.objects.filter(alterado_por=self.usuario)
+        self.assertEqual(list(alteracoes.values_list('processo_id', flat=True)), [self.abertos[0].pk])
+        self.assertEqual(self._faceta(), (1, 2))
+
+    def test_concluir_monitoramento_lote_com_versao_desatualizada(self):
+        Processo.objects.filter(pk=self.finalizado.pk).update(versao=self.finalizado.versao + 1)
+        versoes = self._versoes()
+
+        resposta = self._enviar('concluir_monitoramento_lote', [self.abertos[0], self.finalizado])
+
+        self.assertEqual(resposta.status_code, 409)
+        self.assertEqual(resposta.json()['ids'], [self.finalizado.pk])
+        self.assertEqual(self._versoes(), versoes)
+        self.assertFalse(MonitoramentoRecord.objects.exists())
+        self.assertFalse(Processo.objects.filter(status_monitoramento='CONCLUIDO').exists())
+        self.assertEqual(self._faceta(), (2, 1))
@@ -7,21 +7,37 @@ urlpatterns = [
     path('', views.listar_processos, name='index'),
     path('cadastrar', views.cadastrar_processo, name='cadastrar_processo'),
     path('salvar', views.salvar_processo, name='salvar_processo'),
+    path('importar', views.importar_planilha, name='importar_planilha'),
     path('listar', views.listar_processos, name='listar_processos'),
     path('processo/<int:process_id>/historico',
          views.ver_historico_processo, name='ver_historico_processo'),
+    path('processo/<int:process_id>/historico/itens',
+         views.historico_processo_itens, name='historico_processo_itens'),
     path('atualizar/<int:id>', views.atualizar_processo, name='atualizar_processo'),
     path('finalizados', views.listar_finalizados, name='listar_finalizados'),
     path('exportar_finalizados_excel', views.exportar_finalizados_excel,
          name='exportar_finalizados_excel'),
-    path('get_process_by_number/<str:numero_processo>',
+    path('exportar_finalizados_csv', views.exportar_finalizados_streaming,
+         {'formato': 'csv'}, name='exportar_finalizados_csv'),
+    path('exportar_finalizados_jsonl', views.exportar_finalizados_streaming,
+         {'formato': 'jsonl'}, name='exportar_finalizados_jsonl'),
+    path('exportacoes/<uuid:job_id>/status', views.status_exportacao,
+         name='status_exportacao'),
+    path('exportacoes/<uuid:job_id>/download', views.baixar_exportacao,
+         name='baixar_exportacao'),
+    path('get_process_by_number/<path:numero_processo>',
          views.get_process_by_number, name='get_process_by_number'),
+    path('processos/sugestoes/', views.sugerir_processos, name='sugerir_processos'),
     path('deletar/<int:id>', views.deletar_processo, name='deletar_processo'),
     path('processo/<int:process_id>/concluir_monitoramento/',
          views.concluir_monitoramento, name='concluir_monitoramento'),
     # New URL for marking exit date/time
     path('processo/<int:process_id>/marcar_saida/',
          views.marcar_saida_processo, name='marcar_saida_processo'),  # NEW
+    path('processos/marcar_saida_lote/',
+         views.marcar_saida_lote, name='marcar_saida_lote'),
+    path('processos/concluir_monitoramento_lote/',
+         views.concluir_monitoramento_lote, name='concluir_monitoramento_lote'),
     # User management
     path('register/', views.register, name='register'),
     path('manage_users/', views.manage_users, name='manage_users'),
@@ -30,7 +46,5 @@ urlpatterns = [
     path('manage_users/delete/<int:user_id>/',
          views.delete_user, name='delete_user'),
     # API endpoints for dynamic filters
-    path('api/get_especies_by_genero/', views.get_especies_by_genero,
-         name='get_especies_by_genero'),
-    path('api/get_all_especies/', views.get_all_especies, name='get_all_especies'),
+    path('api/taxonomia/', views.taxonomia_processos, name='taxonomia_processos'),
 ]
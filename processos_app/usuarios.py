@@ -0,0 +1,129 @@
+# processos_app/usuarios.py
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+
+from .models import Profile
+from .planilhas import ErroLinha, chave, linha_vazia, mapear_colunas, texto_celula, valores_da_linha
+
+TAMANHO_LOTE_USUARIOS = 500
+
+COLUNAS_USUARIOS = {
+    'usuario': ['usuario', 'username', 'login'],
+    'nivel': ['nivel', 'level', 'nivel do usuario'],
+    'email': ['email', 'e-mail'],
+    'nome': ['nome', 'first name'],
+    'sobrenome': ['sobrenome', 'last name'],
+    'senha': ['senha', 'password'],
+}
+ALIASES_USUARIOS = {chave(alias): campo
+                    for campo, aliases in COLUNAS_USUARIOS.items() for alias in aliases}
+
+# Nível pelo código ('1'), pelo rótulo completo ou pelo nome curto ("Analista 1")
+NIVEIS = {chave(valor): codigo
+          for codigo, rotulo in Profile.USER_LEVEL_CHOICES
+          for valor in (codigo, rotulo, rotulo.split(' (')[0])}
+
+
+def _montar_usuario(valores):
+    """
+    Valida uma linha e devolve (User não salvo, nível, senha ou ''). Levanta
+    ErroLinha com o motivo da rejeição.
+    """
+    dados = {campo: texto_celula(valores.get(campo)) or '' for campo in COLUNAS_USUARIOS}
+    username = dados['usuario']
+    if not username:
+        raise ErroLinha("usuário não informado")
+    if len(username) > User._meta.get_field('username').max_length:
+        raise ErroLinha(f"usuário '{username}' longo demais")
+    try:
+        User.username_validator(username)
+    except ValidationError:
+        raise ErroLinha(f"usuário '{username}' contém caracteres não permitidos")
+
+    nivel = NIVEIS.get(chave(dados['nivel']))
+    if nivel is None:
+        raise ErroLinha(f"nível inválido '{dados['nivel']}'")
+
+    if dados['email']:
+        try:
+            validate_email(dados['email'])
+        except ValidationError:
+            raise ErroLinha(f"e-mail inválido '{dados['email']}'")
+
+    usuario = User(username=username, email=dados['email'],
+                   first_name=dados['nome'][:150], last_name=dados['sobrenome'][:150])
+    return usuario, nivel, dados['senha']
+
+
+def _gravar_usuarios(novos, tamanho_lote):
+    with transaction.atomic():
+        # bulk_create não dispara o post_save que criaria cada Profile
+        User.objects.bulk_create([usuario for usuario, _, _ in novos], batch_size=tamanho_lote)
+        Profile.objects.bulk_create([
+            Profile(user=usuario, level=nivel) for usuario, nivel, _ in novos
+        ], batch_size=tamanho_lote)
+
+
+def provisionar_usuarios(linhas, simular=False, senha_inicial=None, tamanho_lote=TAMANHO_LOTE_USUARIOS):
+    """
+    Cria usuários e perfis a partir de 'linhas' (a primeira é o cabeçalho, com
+    as colunas usuario e nivel e, opcionalmente, email, nome, sobrenome e
+    senha) com bulk_create, numa única transação. Usuários já existentes e
+    linhas inválidas são ignorados e relatados. Sem senha na linha nem
+    'senha_inicial', o usuário fica sem senha utilizável. Com 'simular',
+    apenas valida.
+    Retorna {'criados': n, 'erros': [(numero_da_linha, mensagem), ...]}.
+    """
+    linhas = iter(linhas)
+    try:
+        colunas = mapear_colunas(next(linhas), ALIASES_USUARIOS, ('usuario', 'nivel'))
+    except StopIteration:
+        raise ValueError("Arquivo vazio.")
+
+    erros = []
+    candidatos = {}
+    for numero_linha, linha in enumerate(linhas, start=2):
+        if linha_vazia(linha):
+            continue
+        valores = valores_da_linha(linha, colunas)
+        try:
+            usuario, nivel, senha = _montar_usuario(valores)
+            if usuario.username in candidatos:
+                raise ErroLinha(f"usuário '{usuario.username}' repetido "
+                                f"(linha {candidatos[usuario.username][0]})")
+        except ErroLinha as e:
+            erros.append((numero_linha, str(e)))
+            continue
+        candidatos[usuario.username] = (numero_linha, usuario, nivel, senha or senha_inicial)
+
+    nomes = list(candidatos)
+    existentes = set()
+    for inicio in range(0, len(nomes), tamanho_lote):
+        existentes.update(User.objects.filter(
+            username__in=nomes[inicio:inicio + tamanho_lote]).values_list('username', flat=True))
+
+    novos = []
+    for numero_linha, usuario, nivel, senha in candidatos.values():
+        if usuario.username in existentes:
+            erros.append((numero_linha, f"usuário '{usuario.username}' já existe"))
+        else:
+            novos.append((usuario, nivel, senha))
+    erros.sort()
+
+    if simular or not novos:
+        return {'criados': len(novos), 'erros': erros}
+
+    # O PBKDF2 é a parte cara da criação e libera o GIL: os hashes são
+    # calculados em paralelo. make_password(None) gera uma senha inutilizável.
+    with ThreadPoolExecutor() as executor:
+        hashes = executor.map(make_password, [senha or None for _, _, senha in novos])
+        for (usuario, _, _), senha_hash in zip(novos, hashes):
+            usuario.password = senha_hash
+
+    _gravar_usuarios(novos, tamanho_lote)
+    return {'criados': len(novos), 'erros': erros}
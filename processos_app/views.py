@@ -1,69 +1,45 @@
 # processos/views.py
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, FileResponse, Http404, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import patch_cache_control, patch_vary_headers
 from django.views.decorators.csrf import csrf_exempt
-from .models import Processo, ProcessHistory, MonitoramentoRecord, Profile
+from .models import (Processo, AlteracaoProcesso, MonitoramentoRecord, Profile, FacetaProcesso, ContadorVersao,
+                     ExportacaoJob, ConflitoVersao)
+import hashlib
 import json
+from collections import Counter
+from functools import lru_cache
 from datetime import datetime, date, timedelta, time
-from django.db.models import Q
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required, user_passes_test
 from .forms import CustomUserCreationForm
 from django.contrib.auth.models import User
 from .forms import ProcessoForm
-import openpyxl
-from openpyxl.styles import Font, Alignment, Border, Side
-from django.utils import timezone, dateformat
+from django.utils import timezone
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q, F, Case, When, Value
+from django.db.models.functions import Coalesce
 from django.contrib.auth.forms import AuthenticationForm
-
-
-# Helper function to check user permissions based on level
-def can_access_genero(user, genero):
-    if user.is_superuser:  # Superusers can access all
-        return True
-
-    try:
-        user_level = user.profile.level
-    except Profile.DoesNotExist:
-        return False  # No profile, no access
-
-    if user_level == '3':  # Usuário Geral can access all
-        return True
-    elif user_level == '1' and genero == 'LICITACOES_E_CONTRATOS':  # Analista 1 only Licitações
-        return True
-    elif user_level == '2' and genero == 'LIQUIDACOES':  # Analista 2 only Liquidações
-        return True
-    elif user_level == '0':  # Protocolo has no specific genre restrictions for general views, but specific functions
-        return True
-    return False
-
-# Helper function to filter querysets by user level
-
-
-def filter_processes_by_user_level(user, queryset):
-    if user.is_superuser:
-        return queryset  # Superusers see all
-
-    try:
-        user_level = user.profile.level
-    except Profile.DoesNotExist:
-        return queryset.none()  # If no profile, no processes
-
-    if user_level == '3':  # Usuário Geral sees all
-        return queryset
-    elif user_level == '1':  # Analista 1 sees only LICITACOES_E_CONTRATOS
-        return queryset.filter(genero='LICITACOES_E_CONTRATOS')
-    elif user_level == '2':  # Analista 2 sees only LIQUIDACOES
-        return queryset.filter(genero='LIQUIDACOES')
-    elif user_level == '0':  # Protocolo sees all processes, but might have limitations on functions
-        return queryset
-    return queryset.none()  # Default to no access if level is not recognized
+from .busca import aplicar_busca, normalizar_numero_processo
+from .arquivamento import tem_historico_arquivado
+from .assincrono import em_asgi, iterar_em_thread, leitura_assincrona
+from .historico import linha_do_tempo
+from .idempotencia import idempotente
+from .monitoramento import definir_monitoramento, concluir_ciclos_anteriores
+from .exportacao import blocos_exportacao, inicio_limite_exportacao, FORMATOS_STREAMING
+from .importacao import importar_processos
+from .planilhas import ler_linhas
+from .sugestoes import sugerir, CAMPOS_SUGESTAO, LIMITE_SUGESTOES_PADRAO, LIMITE_SUGESTOES_MAXIMO
+from .permissoes import permissoes_do_usuario
+from .pagination import paginar_por_cursor, obter_por_pagina, POR_PAGINA_OPCOES, POR_PAGINA_PADRAO
 
 
 @login_required
 def cadastrar_processo(request):
     # Only Protocolo (0) and Usuário Geral (3) can create new processes
-    if not (request.user.is_superuser or (hasattr(request.user, 'profile') and request.user.profile.level in ['0', '3'])):
+    if not request.permissoes.pode_cadastrar:
         return HttpResponse("Você não tem permissão para cadastrar novos processos.", status=403)
 
     if request.method == 'POST':
@@ -72,7 +48,7 @@ def cadastrar_processo(request):
             processo = form.save(commit=False)
 
             # Ensure the user has permission to create this type of process
-            if not can_access_genero(request.user, processo.genero):
+            if not request.permissoes.pode_acessar_genero(processo.genero):
                 return HttpResponse("Você não tem permissão para cadastrar processos deste gênero.", status=403)
 
             if processo.prioridade == 'SIM':
@@ -87,42 +63,6 @@ def cadastrar_processo(request):
     return render(request, 'Formulario.html', {'form': form})
 
 
-def calcular_prazo(data_entrada, prioridade_value):
-    if not data_entrada or not prioridade_value:
-        return None
-    try:
-        if prioridade_value == 'SIM':
-            dias_prazo = 2
-        elif prioridade_value == 'NAO':
-            dias_prazo = 7
-        else:
-            dias_prazo = 7
-
-        data_prazo = data_entrada + timedelta(days=dias_prazo)
-        return data_prazo
-    except Exception as e:
-        print(f"Erro ao calcular prazo: {e}")
-        return None
-
-
-def calcular_proxima_data_monitoramento(data_base, prazo_monitoramento_tipo):
-    """
-    Calcula a próxima data de monitoramento com base na data base e no tipo de prazo.
-    """
-    if not data_base or not prazo_monitoramento_tipo:
-        return None
-
-    if prazo_monitoramento_tipo == 'SEMESTRAL':
-        return data_base + timedelta(days=6*30)  # Aproximadamente 6 meses
-    elif prazo_monitoramento_tipo == 'QUADRIMESTRAL':
-        return data_base + timedelta(days=4*30)  # Aproximadamente 4 meses
-    elif prazo_monitoramento_tipo == 'ANUAL':
-        return data_base + timedelta(days=12*30)  # Aproximadamente 12 meses
-    elif prazo_monitoramento_tipo == 'TRIMESTRAL':
-        return data_base + timedelta(days=3*30)  # Aproximadamente 3 meses
-    return None
-
-
 @login_required
 def index(request):
     return render(request, 'Formulario.html')
@@ -130,6 +70,7 @@ def index(request):
 
 @csrf_exempt
 @login_required
+@idempotente
 def salvar_processo(request):
     if request.method == 'POST':
         try:
@@ -145,10 +86,10 @@ def salvar_processo(request):
                 data['hora_saida'], '%H:%M').time() if data.get('hora_saida') else None
 
             # Permission check: Only Protocolo (0) and Usuário Geral (3) can save new processes
-            if not (request.user.is_superuser or (hasattr(request.user, 'profile') and request.user.profile.level in ['0', '3'])):
+            if not request.permissoes.pode_cadastrar:
                 return JsonResponse({"success": False, "message": "Você não tem permissão para salvar novos processos."}, status=403)
 
-            if not can_access_genero(request.user, data['genero']):
+            if not request.permissoes.pode_acessar_genero(data['genero']):
                 return JsonResponse({"success": False, "message": "Você não tem permissão para salvar processos deste gênero."}, status=403)
 
             prazo_dias_value = None
@@ -157,11 +98,6 @@ def salvar_processo(request):
             elif data['prioridade'] == 'NAO':
                 prazo_dias_value = 7
 
-            # Lógica de definição do prazo de monitoramento
-            prazo_monitoramento_value = 'NAO_APLICAVEL'
-            proxima_data_monitoramento_value = None
-            status_monitoramento_value = 'NAO_APLICAVEL'
-
             especie_processo = data.get('especie')
             genero_processo = data.get('genero')
 
@@ -170,289 +106,355 @@ def salvar_processo(request):
             # a data_saida é o ponto de partida lógico. Caso contrário, data_entrada.
             data_base_monitoramento = data_saida_obj if data_saida_obj else data_entrada_obj
 
-            # Apply monitoring logic based on genre and species
-            if genero_processo == 'LIQUIDACOES':
-                if especie_processo == 'P.C. Bolsa Atleta':
-                    prazo_monitoramento_value = 'SEMESTRAL'
-                    status_monitoramento_value = 'PENDENTE'
-                elif especie_processo == 'P.C. Adiantamento':
-                    prazo_monitoramento_value = 'TRIMESTRAL'
-                    status_monitoramento_value = 'PENDENTE'
-                elif especie_processo == 'Subvenção Social - Prestação de Contas':
-                    prazo_monitoramento_value = 'QUADRIMESTRAL'
-                    status_monitoramento_value = 'PENDENTE'
-                elif especie_processo == 'Subvenção Social - P.C. Anual':
-                    prazo_monitoramento_value = 'ANUAL'
-                    status_monitoramento_value = 'PENDENTE'
-                elif especie_processo == 'P.C. Subvenção Bloco Carnaval':
-                    prazo_monitoramento_value = 'TRIMESTRAL'
-                    status_monitoramento_value = 'PENDENTE'
-                elif especie_processo == 'P.C. Patrocínio':
-                    prazo_monitoramento_value = 'TRIMESTRAL'
-                    status_monitoramento_value = 'PENDENTE'
-                elif especie_processo in ['Concessão Aux. Bolsa Atleta', 'Concessão Aux. Aluguel Social',
-                                          'Concessão Adiantamento', 'Subvenção Social - Concessão', 'Concessão Diária']:
-                    prazo_monitoramento_value = 'TRIMESTRAL'
-                    status_monitoramento_value = 'PENDENTE'
-            elif genero_processo == 'LICITACOES_E_CONTRATOS':
-                # Only 'Concessão Patrocínio' needs monitoring in this genre
-                if especie_processo == 'Concessão Patrocínio':
-                    prazo_monitoramento_value = 'TRIMESTRAL'
-                    status_monitoramento_value = 'PENDENTE'
-                else:
-                    # Other species in LICITACOES_E_CONTRATOS do not need monitoring
-                    prazo_monitoramento_value = 'NAO_APLICAVEL'
-                    status_monitoramento_value = 'NAO_APLICAVEL'
-            else:  # For 'OUTROS_GENERO' or any other unlisted genre
-                prazo_monitoramento_value = 'NAO_APLICAVEL'
-                status_monitoramento_value = 'NAO_APLICAVEL'
-
-            if prazo_monitoramento_value != 'NAO_APLICAVEL' and data_base_monitoramento:
-                proxima_data_monitoramento_value = calcular_proxima_data_monitoramento(
-                    data_base_monitoramento, prazo_monitoramento_value)
+            # Prazo, status e próxima data vêm da tabela de regras de monitoramento
+            prazo_monitoramento_value, status_monitoramento_value, proxima_data_monitoramento_value = \
+                definir_monitoramento(genero_processo, especie_processo, data_base_monitoramento)
 
             # Server-side validation: 'volume' is required
             if not data.get('volume') or not str(data.get('volume')).strip():
                 return JsonResponse({"success": False, "message": "Campo 'volume' é obrigatório."}, status=400)
 
-            processo = Processo.objects.create(
-                numero_processo=data['numero_processo'],
-                volume=data['volume'],
-                secretaria=data['secretaria'],
-                data_entrada=data_entrada_obj,
-                hora_entrada=hora_entrada_obj,
-                data_saida=data_saida_obj,
-                hora_saida=hora_saida_obj,
-                destino=data.get('destino') or None,
-                genero=genero_processo,  # Use the determined genre
-                especie=especie_processo,  # Use the determined species
-                objeto=data['objeto'],
-                contratada=data.get('contratada') or None,
-                recorrente=data.get('recorrente', 'NAO'),
-                prioridade=data['prioridade'],
-                prazo_dias=prazo_dias_value,
-                tecnico=data.get('tecnico') or None,
-                numero_despacho=data.get('numero_despacho') or None,
-                observacao=data.get('observacao') or None,
-                prazo_monitoramento=prazo_monitoramento_value,
-                proxima_data_monitoramento=proxima_data_monitoramento_value,
-                status_monitoramento=status_monitoramento_value,
-                # NEW FIELDS
-                valor=data.get('valor') or None,
-                periodo=data.get('periodo') or None,
-                status_analise=data.get('status_analise', 'NAO_APLICAVEL')
-            )
-
-            # Lógica para concluir monitoramento de processos anteriores com o mesmo número
-            # e que são da espécie 'Concessão' (ou similar) que indicam uma nova PC sendo enviada
-            especies_para_finalizar_automaticamente = [
-                'P.C. Bolsa Atleta', 'Subvenção Social - Prestação de Contas',
-                'Subvenção Social - P.C. Anual', 'Concessão Patrocínio',
-                'P.C. Adiantamento', 'P.C. Patrocínio', 'P.C. Subvenção Bloco Carnaval',
-                'Concessão Aux. Bolsa Atleta', 'Concessão Aux. Aluguel Social',
-                'Concessão Adiantamento', 'Subvenção Social - Concessão', 'Concessão Diária'
-            ]
-
-            # Só dispara se o NOVO processo for um que indica que uma PC está sendo submetida
-            if especie_processo in especies_para_finalizar_automaticamente:
-                processos_anteriores = Processo.objects.filter(
+            # O novo processo e a conclusão dos ciclos anteriores com o mesmo número
+            # (quando ele indica que uma nova P.C. está sendo enviada) são gravados juntos
+            with transaction.atomic():
+                processo = Processo.objects.create(
                     numero_processo=data['numero_processo'],
-                    # Busca por processos anteriores desses tipos específicos
-                    especie__in=especies_para_finalizar_automaticamente
-                ).exclude(id=processo.id)  # Exclui o processo que acabou de ser criado
-
-                for p_antigo in processos_anteriores:
-                    if p_antigo.status_monitoramento in ['PENDENTE', 'ATRASADO']:
-                        p_antigo.status_monitoramento = 'CONCLUIDO'
-                        # Adiciona um registro de monitoramento
-                        MonitoramentoRecord.objects.create(
-                            processo=p_antigo,
-                            data_registro=date.today(),
-                            observacao=f"Monitoramento concluído automaticamente pela entrada de um novo processo com o mesmo número ({processo.numero_processo}) e espécie relacionada: {especie_processo}.",
-                            registrado_por=request.user
-                        )
-                        # Remove a próxima data de monitoramento e o tipo de prazo para "desativar" monitoramento para o ciclo anterior.
-                        p_antigo.proxima_data_monitoramento = None
-                        p_antigo.prazo_monitoramento = 'NAO_APLICAVEL'
-                        p_antigo.save()
-
-            return JsonResponse({"success": True, "message": "Processo salvo!", "id": processo.id})
+                    volume=data['volume'],
+                    secretaria=data['secretaria'],
+                    data_entrada=data_entrada_obj,
+                    hora_entrada=hora_entrada_obj,
+                    data_saida=data_saida_obj,
+                    hora_saida=hora_saida_obj,
+                    destino=data.get('destino') or None,
+                    genero=genero_processo,  # Use the determined genre
+                    especie=especie_processo,  # Use the determined species
+                    objeto=data['objeto'],
+                    contratada=data.get('contratada') or None,
+                    recorrente=data.get('recorrente', 'NAO'),
+                    prioridade=data['prioridade'],
+                    prazo_dias=prazo_dias_value,
+                    tecnico=data.get('tecnico') or None,
+                    numero_despacho=data.get('numero_despacho') or None,
+                    observacao=data.get('observacao') or None,
+                    prazo_monitoramento=prazo_monitoramento_value,
+                    proxima_data_monitoramento=proxima_data_monitoramento_value,
+                    status_monitoramento=status_monitoramento_value,
+                    # NEW FIELDS
+                    valor=data.get('valor') or None,
+                    periodo=data.get('periodo') or None,
+                    status_analise=data.get('status_analise', 'NAO_APLICAVEL')
+                )
+                ciclos_concluidos = concluir_ciclos_anteriores(processo, request.user)
+
+            mensagem = "Processo salvo!"
+            if ciclos_concluidos:
+                mensagem += f" {ciclos_concluidos} ciclo(s) de monitoramento anterior(es) concluído(s)."
+            return JsonResponse({"success": True, "message": mensagem, "id": processo.id,
+                                 "ciclos_concluidos": ciclos_concluidos})
         except Exception as e:
             print(f"Erro em salvar_processo: {e}")
             return JsonResponse({"success": False, "message": str(e)}, status=400)
     return JsonResponse({"success": False, "message": "Método não permitido"}, status=405)
 
 
+# Quantidade máxima de erros de linha devolvidos pela importação
+LIMITE_ERROS_IMPORTACAO = 200
+
+
+@csrf_exempt
+@login_required
+def importar_planilha(request):
+    """
+    Recebe uma planilha XLSX/CSV ('arquivo') de processos antigos e a importa em
+    lotes. Com 'simular=1' apenas valida. Devolve o total importado e os erros
+    por linha.
+    """
+    if request.method != 'POST':
+        return JsonResponse({"success": False, "message": "Método não permitido"}, status=405)
+
+    # Mesma permissão de salvar_processo
+    if not request.permissoes.pode_cadastrar:
+        return JsonResponse({"success": False, "message": "Você não tem permissão para importar processos."}, status=403)
+
+    arquivo = request.FILES.get('arquivo')
+    if not arquivo:
+        return JsonResponse({"success": False, "message": "Envie o arquivo no campo 'arquivo'."}, status=400)
+
+    simular = request.POST.get('simular') in ('1', 'true', 'sim')
+    try:
+        resultado = importar_processos(
+            ler_linhas(arquivo, arquivo.name), simular=simular,
+            pode_importar_genero=request.permissoes.pode_acessar_genero)
+    except ValueError as e:
+        return JsonResponse({"success": False, "message": str(e)}, status=400)
+
+    erros = resultado['erros']
+    acao = "validado(s)" if simular else "importado(s)"
+    return JsonResponse({
+        "success": True,
+        "message": f"{resultado['importados']} processo(s) {acao}, {len(erros)} linha(s) rejeitada(s).",
+        "importados": resultado['importados'],
+        "simulacao": simular,
+        "total_erros": len(erros),
+        "erros": [{"linha": linha, "mensagem": mensagem}
+                  for linha, mensagem in erros[:LIMITE_ERROS_IMPORTACAO]],
+    })
+
+
+@leitura_assincrona
 @login_required
 def listar_processos(request):
     termo_pesquisa = request.GET.get('termo', '').strip()
     prioridade_filtro = request.GET.get('prioridade', 'todas')
     genero_filtro = request.GET.get('genero', 'todas')
     especie_filtro = request.GET.get('especie', 'todas')
+    prazo_filtro = request.GET.get('prazo', 'todos')
+    ordenar = request.GET.get('ordenar', 'entrada')
 
     base_query = Processo.objects.filter(data_saida__isnull=True)
-    processos_query = filter_processes_by_user_level(request.user, base_query)
+    processos_query = request.permissoes.filtrar_processos(base_query)
 
     if termo_pesquisa:
-        processos_query = processos_query.filter(
-            Q(numero_processo__icontains=termo_pesquisa) |
-            Q(secretaria__icontains=termo_pesquisa) |
-            Q(objeto__icontains=termo_pesquisa) |
-            Q(contratada__icontains=termo_pesquisa) |
-            Q(tecnico__icontains=termo_pesquisa) |
-            Q(valor__icontains=termo_pesquisa) |
-            Q(periodo__icontains=termo_pesquisa)
-        )
+        processos_query = aplicar_busca(processos_query, termo_pesquisa)
 
     if prioridade_filtro != 'todas':
         processos_query = processos_query.filter(prioridade=prioridade_filtro)
 
     if genero_filtro != 'todas':
-        if request.user.is_superuser or (hasattr(request.user, 'profile') and request.user.profile.level == '3'):
+        if request.permissoes.pode_acessar_genero(genero_filtro):
             processos_query = processos_query.filter(genero=genero_filtro)
-        elif (hasattr(request.user, 'profile') and request.user.profile.level == '1' and genero_filtro == 'LICITACOES_E_CONTRATOS'):
-            processos_query = processos_query.filter(
-                genero='LICITACOES_E_CONTRATOS')
-        elif (hasattr(request.user, 'profile') and request.user.profile.level == '2' and genero_filtro == 'LIQUIDACOES'):
-            processos_query = processos_query.filter(genero='LIQUIDACOES')
         else:
             processos_query = processos_query.none()
 
     if especie_filtro != 'todas':
         processos_query = processos_query.filter(especie=especie_filtro)
 
-    processos_query = processos_query.order_by('data_entrada', 'prioridade')
+    # Filtros de prazo sobre a coluna indexada data_prazo:
+    # 'atrasados' ou um número N de dias (vencem entre hoje e hoje + N)
+    today = date.today()
+    if prazo_filtro == 'atrasados':
+        processos_query = processos_query.filter(data_prazo__lt=today)
+    elif prazo_filtro.isdigit():
+        processos_query = processos_query.filter(
+            data_prazo__range=[today, today + timedelta(days=int(prazo_filtro))])
+    else:
+        prazo_filtro = 'todos'
 
-    for processo in processos_query:
-        prazo_obj = calcular_prazo(processo.data_entrada, processo.prioridade)
-        if prazo_obj:
-            dias_restantes = (prazo_obj - date.today()).days
-            processo.prazo_formatado = f"{dias_restantes} dia(s) {'atrasado' if dias_restantes < 0 else 'restante(s)'}"
-        else:
-            processo.prazo_formatado = "-"
+    por_pagina = obter_por_pagina(request.GET.get('por_pagina'))
+    if ordenar == 'prazo':
+        # Menos dias restantes (mais atrasados) primeiro
+        ordenacao = ['data_prazo', 'id']
+    else:
+        ordenar = 'entrada'
+        ordenacao = ['data_entrada', 'prioridade', 'id']
+        if termo_pesquisa:
+            # Resultados de pesquisa são ordenados primeiro pela relevância
+            ordenacao = ['-relevancia'] + ordenacao
+    pagina = paginar_por_cursor(
+        processos_query, ordenacao,
+        apos=request.GET.get('apos'), antes=request.GET.get('antes'),
+        por_pagina=por_pagina)
 
-    all_generos = Processo.objects.values_list(
-        'genero', flat=True).distinct().order_by('genero')
     all_generos = [
-        g for g in all_generos if can_access_genero(request.user, g)]
+        g for g in FacetaProcesso.objects.generos() if request.permissoes.pode_acessar_genero(g)]
 
     all_especies = []
     if genero_filtro != 'todas':
-        if can_access_genero(request.user, genero_filtro):
-            all_especies = Processo.objects.filter(genero=genero_filtro).values_list(
-                'especie', flat=True).distinct().order_by('especie')
+        if request.permissoes.pode_acessar_genero(genero_filtro):
+            all_especies = FacetaProcesso.objects.especies([genero_filtro])
     else:
-        allowed_generos_for_all_species = [g for g in Processo.objects.values_list(
-            'genero', flat=True).distinct() if can_access_genero(request.user, g)]
-        all_especies = Processo.objects.filter(genero__in=allowed_generos_for_all_species).values_list(
-            'especie', flat=True).distinct().order_by('especie')
-
-    # Pre-calculate flags for template logic
-    can_edit = request.user.is_superuser or \
-        (hasattr(request.user, 'profile')
-         and request.user.profile.level in ['1', '2', '3', '0'])
-
-    can_delete = request.user.is_superuser
-
-    can_mark_saida = request.user.is_superuser or \
-        (hasattr(request.user, 'profile')
-         and request.user.profile.level in ['0', '3'])
-
-    can_create_process = request.user.is_superuser or \
-        (hasattr(request.user, 'profile')
-         and request.user.profile.level in ['0', '3'])
+        all_especies = FacetaProcesso.objects.especies(all_generos)
 
+    permissoes = request.permissoes
     return render(request, 'lista_processos.html', {
-        'processos': processos_query,
+        'processos': pagina.itens,
+        'pagina': pagina,
+        'por_pagina_opcoes': POR_PAGINA_OPCOES,
+        'por_pagina_padrao': POR_PAGINA_PADRAO,
         'prioridade_filtro': prioridade_filtro,
         'termo_pesquisa': termo_pesquisa,
         'genero_filtro': genero_filtro,
         'especie_filtro': especie_filtro,
+        'prazo_filtro': prazo_filtro,
+        'ordenar': ordenar,
         'all_generos': all_generos,
         'all_especies': all_especies,
-        'user_level': request.user.profile.level if hasattr(request.user, 'profile') else None,
-        'can_edit': can_edit,
-        'can_delete': can_delete,
-        'can_mark_saida': can_mark_saida,
-        'can_create_process': can_create_process,
+        'user_level': permissoes.nivel,
+        'can_edit': permissoes.pode_editar,
+        'can_delete': permissoes.pode_excluir,
+        'can_mark_saida': permissoes.pode_marcar_saida,
+        'can_create_process': permissoes.pode_cadastrar,
     })
 
 
+# Campos que podem ser enviados para atualizar_processo
+CAMPOS_EDITAVEIS_PROCESSO = frozenset(
+    field.name for field in Processo._meta.concrete_fields
+    if field.editable and not field.primary_key)
+
+# Campos recalculados por atualizar_processo a partir dos campos editados
+CAMPOS_DERIVADOS_PROCESSO = ('prazo_dias', 'prazo_monitoramento',
+                             'status_monitoramento', 'proxima_data_monitoramento')
+
+
+def _resposta_conflito(processo):
+    response = JsonResponse({
+        "success": False,
+        "conflito": True,
+        "message": "Este processo foi alterado por outro usuário desde que a página foi carregada. Recarregue para ver a versão atual.",
+    }, status=409)
+    if processo.versao is not None:
+        response['ETag'] = processo.etag
+    return response
+
+
+def _verificar_if_match(request, processo):
+    """
+    Compara o cabeçalho If-Match (ETag da linha exibida na listagem) com a
+    versão atual do processo. Retorna a resposta 409 se ele já foi alterado.
+    """
+    if_match = request.headers.get('If-Match', '').strip()
+    if not if_match or if_match == '*':
+        return None
+    etags = {etag.strip().removeprefix('W/') for etag in if_match.split(',')}
+    if processo.etag in etags:
+        return None
+    return _resposta_conflito(processo)
+
+
+def _resposta_gravacao(processo, dados):
+    response = JsonResponse({**dados, "versao": processo.versao})
+    response['ETag'] = processo.etag
+    return response
+
+
+LIMITE_PROCESSOS_LOTE = 500
+
+
+def _ler_lote_processos(request):
+    """
+    Lê o corpo {"processos": [{"id": 1, "versao": 3}, ...]} das ações em lote e
+    devolve {id: versao}. A versão é opcional (None dispensa a verificação de
+    concorrência). Levanta ValueError se o corpo for inválido.
+    """
+    try:
+        itens = json.loads(request.body or b'{}').get('processos')
+    except (json.JSONDecodeError, AttributeError):
+        raise ValueError("Corpo da requisição inválido.")
+    if not isinstance(itens, list) or not itens:
+        raise ValueError("Nenhum processo selecionado.")
+    if len(itens) > LIMITE_PROCESSOS_LOTE:
+        raise ValueError(f"Selecione no máximo {LIMITE_PROCESSOS_LOTE} processos por vez.")
+
+    versoes = {}
+    for item in itens:
+        if not isinstance(item, dict):
+            item = {'id': item}
+        try:
+            versao = item.get('versao')
+            versoes[int(item.get('id'))] = int(versao) if versao not in (None, '') else None
+        except (TypeError, ValueError):
+            raise ValueError("Identificador de processo inválido.")
+    return versoes
+
+
+def _conflitos_lote(versoes, candidatos):
+    return [processo['id'] for processo in candidatos
+            if versoes[processo['id']] is not None and versoes[processo['id']] != processo['versao']]
+
+
+def _resposta_conflito_lote(ids):
+    return JsonResponse({
+        "success": False,
+        "conflito": True,
+        "ids": ids,
+        "message": f"{len(ids)} processo(s) selecionado(s) foram alterados por outro usuário desde que a página foi carregada. Nada foi gravado; recarregue e tente novamente.",
+    }, status=409)
+
+
+def _ajustar_facetas_saida(candidatos):
+    # Processos que passam de abertos para finalizados (o UPDATE em lote não
+    # dispara os sinais que mantêm as facetas)
+    saidas = Counter((processo['genero'], processo['especie'])
+                     for processo in candidatos if processo['data_saida'] is None)
+    for (genero, especie), quantidade in saidas.items():
+        FacetaProcesso.objects.ajustar(genero, especie, abertos=-quantidade, finalizados=quantidade)
+
+
+def _diferencas_saida(data_saida, hora_saida):
+    return {'data_saida': [None, data_saida.strftime('%Y-%m-%d')],
+            'hora_saida': [None, hora_saida.strftime('%H:%M:%S')]}
+
+
+def _valor_historico(field_name, valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, time):
+        return valor.strftime('%H:%M')
+    if isinstance(valor, date):
+        return valor.strftime('%Y-%m-%d')
+    if field_name == 'status_analise':
+        return dict(Processo.STATUS_ANALISE_CHOICES).get(valor, valor)
+    return str(valor)
+
+
 @csrf_exempt
 @login_required
 def atualizar_processo(request, id):
     if request.method == 'POST':
+        # Fora do try: o except genérico abaixo responderia 400
+        processo = Processo.objects.filter(id=id).first()
+        if processo is None:
+            return JsonResponse({"success": False, "message": "Processo não encontrado."}, status=404)
         try:
             data = json.loads(request.body)
-            processo = get_object_or_404(Processo, id=id)
 
             # Permission check for updating a process
-            if not (request.user.is_superuser or (hasattr(request.user, 'profile') and request.user.profile.level in ['1', '2', '3', '0'])):
+            if not request.permissoes.pode_editar:
                 return JsonResponse({"success": False, "message": "Você não tem permissão para editar processos."}, status=403)
 
-            if not can_access_genero(request.user, processo.genero):
+            if not request.permissoes.pode_acessar_genero(processo.genero):
                 return JsonResponse({"success": False, "message": "Você não tem permissão para editar este processo."}, status=403)
 
             if 'genero' in data and data['genero'] != processo.genero:
-                if not can_access_genero(request.user, data['genero']):
+                if not request.permissoes.pode_acessar_genero(data['genero']):
                     return JsonResponse({"success": False, "message": "Você não tem permissão para alterar o gênero para este valor."}, status=403)
 
-            changed_fields = {}
-            original_values = {field.name: getattr(
-                processo, field.name) for field in Processo._meta.fields}
+            conflito = _verificar_if_match(request, processo)
+            if conflito:
+                return conflito
 
-            for field_name, new_value in data.items():
-                current_value = getattr(processo, field_name)
+            campos_desconhecidos = sorted(set(data) - CAMPOS_EDITAVEIS_PROCESSO)
+            if campos_desconhecidos:
+                return JsonResponse({"success": False, "message": f"Campo(s) inválido(s): {', '.join(campos_desconhecidos)}."}, status=400)
 
-                converted_value = None
-                if field_name.startswith('data_') and new_value:
-                    converted_value = datetime.strptime(
-                        new_value, '%Y-%m-%d').date()
-                elif field_name.startswith('hora_') and new_value:
-                    converted_value = datetime.strptime(
-                        new_value, '%H:%M').time()
-                elif new_value == '':
+            changed_fields = {}
+            for field_name, new_value in data.items():
+                field = Processo._meta.get_field(field_name)
+                if new_value == '' or new_value is None:
                     converted_value = None
                 else:
-                    converted_value = new_value
+                    try:
+                        converted_value = field.to_python(new_value)
+                    except ValidationError:
+                        return JsonResponse({"success": False, "message": f"Valor inválido para o campo '{field_name}'."}, status=400)
 
                 # Special handling for 'status_analise' to use default if not provided
-                if field_name == 'status_analise' and (new_value == '' or new_value is None):
+                if field_name == 'status_analise' and converted_value is None:
                     converted_value = 'NAO_APLICAVEL'
 
-                if str(current_value) != str(converted_value):
+                current_value = getattr(processo, field_name)
+                if current_value != converted_value:
                     setattr(processo, field_name, converted_value)
+                    changed_fields[field_name] = {
+                        'old': _valor_historico(field_name, current_value),
+                        'new': _valor_historico(field_name, converted_value)}
 
-                    old_val_str = ''
-                    if original_values[field_name] is not None:
-                        if isinstance(original_values[field_name], date):
-                            old_val_str = original_values[field_name].strftime(
-                                '%Y-%m-%d')
-                        elif isinstance(original_values[field_name], time):
-                            old_val_str = original_values[field_name].strftime(
-                                '%H:%M')
-                        elif field_name == 'status_analise':
-                            # Get display value for old status_analise
-                            old_val_str = dict(Processo.STATUS_ANALISE_CHOICES).get(
-                                original_values[field_name], original_values[field_name])
-                        else:
-                            old_val_str = str(original_values[field_name])
-
-                    new_val_str = ''
-                    if converted_value is not None:
-                        if isinstance(converted_value, date):
-                            new_val_str = converted_value.strftime('%Y-%m-%d')
-                        elif isinstance(converted_value, time):
-                            new_val_str = converted_value.strftime('%H:%M')
-                        elif field_name == 'status_analise':
-                            # Get display value for new status_analise
-                            new_val_str = dict(Processo.STATUS_ANALISE_CHOICES).get(
-                                converted_value, converted_value)
-                        else:
-                            new_val_str = str(converted_value)
+            if not changed_fields:
+                return _resposta_gravacao(processo, {"success": True, "message": "Nenhuma alteração."})
 
-                    changed_fields[field_name] = {
-                        'old': old_val_str, 'new': new_val_str}
+            # Campos derivados recalculados abaixo; só entram no UPDATE se mudarem
+            derivados_originais = {campo: getattr(processo, campo) for campo in CAMPOS_DERIVADOS_PROCESSO}
 
             if 'prioridade' in data:
                 if data['prioridade'] == 'SIM':
@@ -467,49 +469,9 @@ def atualizar_processo(request, id):
 
             data_base_monitoramento_recalc = data_saida_actual if data_saida_actual else data_entrada_actual
 
-            novo_prazo_monitoramento_value = 'NAO_APLICAVEL'
-            novo_status_monitoramento_value = 'NAO_APLICAVEL'
-
-            # Re-evaluate monitoring based on updated genre and species
-            if genero_actual == 'LIQUIDACOES':
-                if especie_actual == 'P.C. Bolsa Atleta':
-                    novo_prazo_monitoramento_value = 'SEMESTRAL'
-                    novo_status_monitoramento_value = 'PENDENTE'
-                elif especie_actual == 'P.C. Adiantamento':
-                    novo_prazo_monitoramento_value = 'TRIMESTRAL'
-                    novo_status_monitoramento_value = 'PENDENTE'
-                elif especie_actual == 'Subvenção Social - Prestação de Contas':
-                    novo_prazo_monitoramento_value = 'QUADRIMESTRAL'
-                    novo_status_monitoramento_value = 'PENDENTE'
-                elif especie_actual == 'Subvenção Social - P.C. Anual':
-                    novo_prazo_monitoramento_value = 'ANUAL'
-                    novo_status_monitoramento_value = 'PENDENTE'
-                elif especie_actual == 'Concessão Patrocínio':
-                    novo_prazo_monitoramento_value = 'TRIMESTRAL'
-                    novo_status_monitoramento_value = 'PENDENTE'
-                elif especie_actual == 'P.C. Subvenção Bloco Carnaval':
-                    novo_prazo_monitoramento_value = 'TRIMESTRAL'
-                    novo_status_monitoramento_value = 'PENDENTE'
-                elif especie_actual == 'P.C. Patrocínio':
-                    novo_prazo_monitoramento_value = 'TRIMESTRAL'
-                    novo_status_monitoramento_value = 'PENDENTE'
-                elif especie_actual in ['Concessão Aux. Bolsa Atleta', 'Concessão Aux. Aluguel Social',
-                                        'Concessão Adiantamento', 'Subvenção Social - Concessão', 'Concessão Diária']:
-                    novo_prazo_monitoramento_value = 'TRIMESTRAL'
-                    novo_status_monitoramento_value = 'PENDENTE'
-            elif genero_actual == 'LICITACOES_E_CONTRATOS':
-
-                if especie_actual == 'Concessão Patrocínio':
-                    novo_prazo_monitoramento_value = 'TRIMESTRAL'
-                    novo_status_monitoramento_value = 'PENDENTE'
-                else:
-                    # Other species in LICITACOES_E_CONTRATOS do not need monitoring
-                    novo_prazo_monitoramento_value = 'NAO_APLICAVEL'
-                    novo_status_monitoramento_value = 'NAO_APLICAVEL'
-            else:
-                # For 'OUTROS_GENERO' or any other unlisted genre
-                novo_prazo_monitoramento_value = 'NAO_APLICAVEL'
-                novo_status_monitoramento_value = 'NAO_APLICAVEL'
+            # Reavalia o monitoramento com o gênero e a espécie atualizados
+            novo_prazo_monitoramento_value, novo_status_monitoramento_value, nova_proxima_data_monitoramento = \
+                definir_monitoramento(genero_actual, especie_actual, data_base_monitoramento_recalc)
 
             if (processo.prazo_monitoramento != novo_prazo_monitoramento_value) or \
                (processo.status_monitoramento == 'NAO_APLICAVEL' and novo_status_monitoramento_value == 'PENDENTE') or \
@@ -518,25 +480,24 @@ def atualizar_processo(request, id):
 
                 processo.prazo_monitoramento = novo_prazo_monitoramento_value
                 processo.status_monitoramento = novo_status_monitoramento_value
+                processo.proxima_data_monitoramento = nova_proxima_data_monitoramento
 
-                if processo.prazo_monitoramento != 'NAO_APLICAVEL' and data_base_monitoramento_recalc:
-                    processo.proxima_data_monitoramento = calcular_proxima_data_monitoramento(
-                        data_base_monitoramento_recalc, processo.prazo_monitoramento)
-                else:
-                    processo.proxima_data_monitoramento = None
-            processo.save()
+            update_fields = set(changed_fields)
+            update_fields.update(campo for campo, valor in derivados_originais.items()
+                                 if getattr(processo, campo) != valor)
 
-            for field_name, values in changed_fields.items():
-                ProcessHistory.objects.create(
-                    process=processo,
-                    field_name=field_name,
-                    old_value=values['old'],
-                    new_value=values['new'],
-                    changed_by=request.user
-                )
-            return JsonResponse({"success": True, "message": "Processo atualizado!"})
-        except Processo.DoesNotExist:
-            return JsonResponse({"success": False, "message": "Processo não encontrado."}, status=404)
+            try:
+                with transaction.atomic():
+                    processo.save(update_fields=update_fields)
+                    AlteracaoProcesso.objects.create(
+                        processo=processo,
+                        alterado_por=request.user,
+                        diferencas={field_name: [values['old'], values['new']]
+                                    for field_name, values in changed_fields.items()},
+                    )
+            except ConflitoVersao:
+                return _resposta_conflito(processo)
+            return _resposta_gravacao(processo, {"success": True, "message": "Processo atualizado!"})
         except Exception as e:
             print(f"Erro em atualizar_processo: {e}")
             return JsonResponse({"success": False, "message": str(e)}, status=400)
@@ -545,7 +506,7 @@ def atualizar_processo(request, id):
 
 @csrf_exempt
 @login_required
-@user_passes_test(lambda u: u.is_superuser)  # Only superusers can delete
+@user_passes_test(lambda u: permissoes_do_usuario(u).pode_excluir)  # Only superusers can delete
 def deletar_processo(request, id):
     if request.method == 'POST':
         try:
@@ -559,84 +520,76 @@ def deletar_processo(request, id):
     return JsonResponse({'success': False, 'message': 'Método não permitido.'}, status=405)
 
 
+# Itens da linha do tempo do histórico por página
+POR_PAGINA_HISTORICO = 50
+
+
+@leitura_assincrona
 @login_required
 def ver_historico_processo(request, process_id):
     processo = get_object_or_404(Processo, id=process_id)
-    if not can_access_genero(request.user, processo.genero):
+    if not request.permissoes.pode_acessar_genero(processo.genero):
         return HttpResponse("Você não tem permissão para visualizar o histórico deste processo.", status=403)
 
-    history_records = ProcessHistory.objects.filter(
-        process=processo).order_by('-changed_at')
-    monitoramento_records = MonitoramentoRecord.objects.filter(
-        processo=processo).order_by('-data_registro')
-
-    formatted_history = []
-    for record in history_records:
-        print(
-            f"Raw changed_at: {record.changed_at}, Type: {type(record.changed_at)}")
-        rec_dict = {
-            'field_name': record.field_name,
-            'old_value': record.old_value,
-            'new_value': record.new_value,
-            'changed_at_formatted': dateformat.format(timezone.localtime(record.changed_at), 'd/m/Y H:i:s',),
-            'changed_by_user': record.changed_by.username if record.changed_by else 'N/A'
-        }
-        formatted_history.append(rec_dict)
-
-    formatted_monitoramento_records = []
-    for record in monitoramento_records:
-        mon_dict = {
-            'data_registro': record.data_registro.strftime('%d/%m/%Y %H:%M:%S'),
-            'observacao': record.observacao,
-            'registrado_por': record.registrado_por.username if record.registrado_por else 'N/A'
-        }
-        formatted_monitoramento_records.append(mon_dict)
+    # Só a primeira página; as seguintes são carregadas pela página em
+    # historico_processo_itens conforme a rolagem. O histórico arquivado só é
+    # lido quando pedido (?arquivo=1).
+    incluir_arquivo = request.GET.get('arquivo') == '1'
+    itens, proximo_cursor = linha_do_tempo(processo, por_pagina=POR_PAGINA_HISTORICO,
+                                           incluir_arquivo=incluir_arquivo)
 
     return render(request, 'historico_processo.html', {
-        'history': formatted_history,
-        'monitoramento_records': formatted_monitoramento_records,
+        'itens': itens,
+        'proximo_cursor': proximo_cursor,
+        'incluir_arquivo': incluir_arquivo,
+        'tem_arquivo': incluir_arquivo or tem_historico_arquivado(processo.id),
         'process_id': process_id,
         'process_number': processo.numero_processo,
     })
 
 
+@leitura_assincrona
+@login_required
+def historico_processo_itens(request, process_id):
+    processo = get_object_or_404(Processo, id=process_id)
+    if not request.permissoes.pode_acessar_genero(processo.genero):
+        return JsonResponse({"success": False, "message": "Você não tem permissão para visualizar o histórico deste processo."}, status=403)
+
+    por_pagina = obter_por_pagina(request.GET.get('por_pagina', POR_PAGINA_HISTORICO))
+    itens, proximo_cursor = linha_do_tempo(processo, apos=request.GET.get('apos'), por_pagina=por_pagina,
+                                           incluir_arquivo=request.GET.get('arquivo') == '1')
+    return JsonResponse({"success": True, "itens": itens, "proximo_cursor": proximo_cursor})
+
+
 @csrf_exempt
 @login_required
 def concluir_monitoramento(request, process_id):
     processo = get_object_or_404(Processo, id=process_id)
 
     # Permission check for concluding monitoring
-    if not (request.user.is_superuser or (hasattr(request.user, 'profile') and request.user.profile.level in ['1', '2', '3'])):
+    if not request.permissoes.pode_concluir_monitoramento:
         return JsonResponse({"success": False, "message": "Você não tem permissão para concluir o monitoramento deste processo."}, status=403)
 
-    if not can_access_genero(request.user, processo.genero):
+    if not request.permissoes.pode_acessar_genero(processo.genero):
         return JsonResponse({"success": False, "message": "Você não tem permissão para concluir o monitoramento deste processo."}, status=403)
 
+    conflito = _verificar_if_match(request, processo)
+    if conflito:
+        return conflito
+
     # REMOVIDO: A verificação se o status é 'PENDENTE' ou 'ATRASADO'.
     # Agora, o botão pode ser clicado independente do status atual do monitoramento.
 
     # Obter a data e hora atuais no fuso horário local configurado no settings.py
     now_local = timezone.localtime(timezone.now())
 
+    diferencas = None
     # Se o processo não tiver data de saída, preenchemos para "finalizá-lo"
     if not processo.data_saida:
         processo.data_saida = now_local.date()
         processo.hora_saida = now_local.time()
         # Registrar no histórico que a data/hora de saída foi marcada
-        ProcessHistory.objects.create(
-            process=processo,
-            field_name='data_saida',
-            old_value=None,
-            new_value=processo.data_saida.strftime('%Y-%m-%d'),
-            changed_by=request.user
-        )
-        ProcessHistory.objects.create(
-            process=processo,
-            field_name='hora_saida',
-            old_value=None,
-            new_value=processo.hora_saida.strftime('%H:%M:%S'),
-            changed_by=request.user
-        )
+        diferencas = _diferencas_saida(processo.data_saida, processo.hora_saida)
 
     # Sempre atualiza o status do monitoramento para CONCLUIDO e zera a próxima data
     processo.status_monitoramento = 'CONCLUIDO'
@@ -645,22 +598,29 @@ def concluir_monitoramento(request, process_id):
     # Desativa o tipo de prazo de monitoramento
     processo.prazo_monitoramento = 'NAO_APLICAVEL'
 
-    # Adiciona um registro no histórico de monitoramento
-    MonitoramentoRecord.objects.create(
-        processo=processo,
-        data_registro=date.today(),
-        observacao=f"Monitoramento concluído manualmente por {request.user.username}.",
-        registrado_por=request.user
-    )
-
-    processo.save()
+    try:
+        with transaction.atomic():
+            processo.save()
+            if diferencas:
+                AlteracaoProcesso.objects.create(
+                    processo=processo, alterado_por=request.user, diferencas=diferencas)
+            # Adiciona um registro no histórico de monitoramento
+            MonitoramentoRecord.objects.create(
+                processo=processo,
+                data_registro=date.today(),
+                observacao=f"Monitoramento concluído manualmente por {request.user.username}.",
+                registrado_por=request.user
+            )
+    except ConflitoVersao:
+        return _resposta_conflito(processo)
 
-    return JsonResponse({
+    return _resposta_gravacao(processo, {
         'success': True,
         'message': 'Monitoramento concluído com sucesso e desativado para este processo.'
     })
 
 
+@leitura_assincrona
 @login_required
 def listar_finalizados(request):
     data_inicial_filtro = request.GET.get('data_inicial', '').strip()
@@ -673,19 +633,11 @@ def listar_finalizados(request):
     genero_filtro = request.GET.get('genero', 'todas')
     status_analise_filtro = request.GET.get('status_analise', 'todas')
 
-    base_query = Processo.objects.exclude(data_saida__isnull=True)
-    processos_query = filter_processes_by_user_level(request.user, base_query)
+    base_query = Processo.objects.filter(data_saida__isnull=False)
+    processos_query = request.permissoes.filtrar_processos(base_query)
 
     if termo_pesquisa:
-        processos_query = processos_query.filter(
-            Q(numero_processo__icontains=termo_pesquisa) |
-            Q(secretaria__icontains=termo_pesquisa) |
-            Q(objeto__icontains=termo_pesquisa) |
-            Q(contratada__icontains=termo_pesquisa) |
-            Q(tecnico__icontains=termo_pesquisa) |
-            Q(valor__icontains=termo_pesquisa) |
-            Q(periodo__icontains=termo_pesquisa)
-        )
+        processos_query = aplicar_busca(processos_query, termo_pesquisa)
 
     if prioridade_filtro != 'todas':
         processos_query = processos_query.filter(prioridade=prioridade_filtro)
@@ -714,29 +666,13 @@ def listar_finalizados(request):
         except ValueError:
             pass
 
-    if termo_pesquisa:
-        processos_query = processos_query.filter(
-            Q(numero_processo__icontains=termo_pesquisa) |
-            Q(secretaria__icontains=termo_pesquisa) |
-            Q(objeto__icontains=termo_pesquisa) |
-            Q(contratada__icontains=termo_pesquisa) |
-            Q(tecnico__icontains=termo_pesquisa) |
-            Q(valor__icontains=termo_pesquisa) |
-            Q(periodo__icontains=termo_pesquisa)
-        )
-
     if status_monitoramento_filtro != 'todas':
         processos_query = processos_query.filter(
             status_monitoramento=status_monitoramento_filtro)
 
     if genero_filtro != 'todas':
-        if request.user.is_superuser or (hasattr(request.user, 'profile') and request.user.profile.level == '3'):
+        if request.permissoes.pode_acessar_genero(genero_filtro):
             processos_query = processos_query.filter(genero=genero_filtro)
-        elif (hasattr(request.user, 'profile') and request.user.profile.level == '1' and genero_filtro == 'LICITACOES_E_CONTRATOS'):
-            processos_query = processos_query.filter(
-                genero='LICITACOES_E_CONTRATOS')
-        elif (hasattr(request.user, 'profile') and request.user.profile.level == '2' and genero_filtro == 'LIQUIDACOES'):
-            processos_query = processos_query.filter(genero='LIQUIDACOES')
         else:
             processos_query = processos_query.none()
 
@@ -747,36 +683,20 @@ def listar_finalizados(request):
         processos_query = processos_query.filter(
             status_analise=status_analise_filtro)
 
-    today = date.today()
-
-    processos_pendentes_atrasados = processos_query.filter(
-        status_monitoramento='PENDENTE',
-        proxima_data_monitoramento__lt=today
-    )
-    for processo in processos_pendentes_atrasados:
-        processo.status_monitoramento = 'ATRASADO'
-        processo.save()
-
-    processos_concluidos_a_reabrir = processos_query.filter(
-        status_monitoramento='CONCLUIDO',
-        proxima_data_monitoramento__isnull=False,
-        proxima_data_monitoramento__lte=today
-    )
-    for processo in processos_concluidos_a_reabrir:
-        processo.status_monitoramento = 'PENDENTE'
-        processo.save()
-
-    processos_query = processos_query.order_by('-data_saida')
+    # As transições de status de monitoramento (PENDENTE -> ATRASADO e
+    # CONCLUIDO -> PENDENTE) são aplicadas pela varredura em lote
+    # (processos_app.monitoramento), mantendo esta listagem somente leitura.
+    por_pagina = obter_por_pagina(request.GET.get('por_pagina'))
+    ordenacao = ['-data_saida', 'id']
+    if termo_pesquisa:
+        ordenacao = ['-relevancia'] + ordenacao
+    pagina = paginar_por_cursor(
+        processos_query, ordenacao,
+        apos=request.GET.get('apos'), antes=request.GET.get('antes'),
+        por_pagina=por_pagina)
 
     processos_data = []
-    for processo in processos_query:
-        prazo_obj = calcular_prazo(processo.data_entrada, processo.prioridade)
-        if prazo_obj:
-            dias_restantes = (prazo_obj - date.today()).days
-            processo.prazo_formatado = f"{dias_restantes} dia(s) {'atrasado' if dias_restantes < 0 else 'restante(s)'}"
-        else:
-            processo.prazo_formatado = "-"
-
+    for processo in pagina:
         p_dict = {
             'id': processo.id,
             'numero_processo': processo.numero_processo,
@@ -809,21 +729,15 @@ def listar_finalizados(request):
         }
         processos_data.append(p_dict)
 
-    all_generos = Processo.objects.values_list(
-        'genero', flat=True).distinct().order_by('genero')
     all_generos = [
-        g for g in all_generos if can_access_genero(request.user, g)]
+        g for g in FacetaProcesso.objects.generos() if request.permissoes.pode_acessar_genero(g)]
 
     all_especies = []
     if genero_filtro != 'todas':
-        if can_access_genero(request.user, genero_filtro):
-            all_especies = Processo.objects.filter(genero=genero_filtro).values_list(
-                'especie', flat=True).distinct().order_by('especie')
+        if request.permissoes.pode_acessar_genero(genero_filtro):
+            all_especies = FacetaProcesso.objects.especies([genero_filtro])
     else:
-        allowed_generos_for_all_species = [g for g in Processo.objects.values_list(
-            'genero', flat=True).distinct() if can_access_genero(request.user, g)]
-        all_especies = Processo.objects.filter(genero__in=allowed_generos_for_all_species).values_list(
-            'especie', flat=True).distinct().order_by('especie')
+        all_especies = FacetaProcesso.objects.especies(all_generos)
 
     # Get all possible status_analise choices for the filter
     all_status_analise = [
@@ -831,19 +745,12 @@ def listar_finalizados(request):
         for choice in Processo.STATUS_ANALISE_CHOICES
     ]
 
-    # Pre-calculate flags for template logic
-    can_edit = request.user.is_superuser or \
-        (hasattr(request.user, 'profile')
-         and request.user.profile.level in ['1', '2', '3'])
-
-    can_delete = request.user.is_superuser
-
-    can_mark_saida = request.user.is_superuser or \
-        (hasattr(request.user, 'profile')
-         and request.user.profile.level in ['0', '3'])
-
+    permissoes = request.permissoes
     return render(request, 'finalizados.html', {
         'processos': processos_data,
+        'pagina': pagina,
+        'por_pagina_opcoes': POR_PAGINA_OPCOES,
+        'por_pagina_padrao': POR_PAGINA_PADRAO,
         'prioridade_filtro': prioridade_filtro,
         'termo_pesquisa': termo_pesquisa,
         'data_inicial_filtro': data_inicial_filtro,
@@ -855,209 +762,285 @@ def listar_finalizados(request):
         'all_generos': all_generos,
         'all_especies': all_especies,
         'all_status_analise': all_status_analise,
-        'is_admin': request.user.is_superuser,
-        'user_level': request.user.profile.level if hasattr(request.user, 'profile') else None,
-        'can_edit': can_edit,
-        'can_delete': can_delete,
-        'can_mark_saida': can_mark_saida,
+        'is_admin': permissoes.superusuario,
+        'user_level': permissoes.nivel,
+        'can_edit': permissoes.pode_editar_finalizados,
+        'can_delete': permissoes.pode_excluir,
+        'can_mark_saida': permissoes.pode_marcar_saida,
     })
 
 
-@login_required
-@user_passes_test(lambda u: u.is_superuser or (hasattr(u, 'profile') and u.profile.level in ['0', '3']))
-def exportar_finalizados_excel(request):
-    data_inicial_str = request.GET.get('data_inicial')
-    data_final_str = request.GET.get('data_final')
-    prioridade = request.GET.get('prioridade')
-    termo_pesquisa = request.GET.get('termo')
-    status_monitoramento = request.GET.get('status_monitoramento', 'todas')
-    especie = request.GET.get('especie', 'todas')
-    genero = request.GET.get('genero', 'todas')
-    status_analise = request.GET.get('status_analise', 'todas')
-
-    if not data_inicial_str or not data_final_str:
-        return HttpResponse('{"success": false, "message": "Por favor, selecione uma Data Inicial e uma Data Final para exportar os processos por período."}',
-                            content_type='application/json', status=400)
+# Parâmetros aceitos pelas exportações de finalizados e seus valores padrão
+PARAMETROS_EXPORTACAO = {
+    'data_inicial': '',
+    'data_final': '',
+    'prioridade': 'todas',
+    'termo': '',
+    'status_monitoramento': 'todas',
+    'especie': 'todas',
+    'genero': 'todas',
+    'status_analise': 'todas',
+}
+
+
+def parametros_exportacao(query_params):
+    return {nome: query_params.get(nome) or padrao
+            for nome, padrao in PARAMETROS_EXPORTACAO.items()}
+
+
+def filtrar_finalizados_exportacao(permissoes, parametros):
+    """
+    Monta o queryset das exportações de processos finalizados visíveis para
+    'permissoes' (ContextoPermissao) a partir dos parâmetros normalizados por
+    parametros_exportacao. Levanta ValueError com
+    a mensagem para o usuário quando o período é inválido.
+    """
+    if not parametros['data_inicial'] or not parametros['data_final']:
+        raise ValueError("Por favor, selecione uma Data Inicial e uma Data Final para exportar os processos por período.")
 
     try:
-        data_inicial = datetime.strptime(data_inicial_str, '%Y-%m-%d').date()
-        data_final = datetime.strptime(data_final_str, '%Y-%m-%d').date()
+        data_inicial = datetime.strptime(parametros['data_inicial'], '%Y-%m-%d').date()
+        data_final = datetime.strptime(parametros['data_final'], '%Y-%m-%d').date()
     except ValueError:
-        return HttpResponse('{"success": false, "message": "Formato de data inválido. Use AAAA-MM-DD."}',
-                            content_type='application/json', status=400)
+        raise ValueError("Formato de data inválido. Use AAAA-MM-DD.")
 
     processes = Processo.objects.filter(
         data_saida__range=[data_inicial, data_final]
     ).order_by('data_saida')
 
-    processes = filter_processes_by_user_level(request.user, processes)
+    processes = permissoes.filtrar_processos(processes)
 
-    if prioridade and prioridade != 'todas':
+    prioridade = parametros['prioridade']
+    if prioridade != 'todas':
         processes = processes.filter(prioridade=prioridade)
-    if termo_pesquisa:
-        processes = processes.filter(
-            Q(numero_processo__icontains=termo_pesquisa) |
-            Q(secretaria__icontains=termo_pesquisa) |
-            Q(destino__icontains=termo_pesquisa) |
-            Q(genero__icontains=termo_pesquisa) |
-            Q(especie__icontains=termo_pesquisa) |
-            Q(objeto__icontains=termo_pesquisa) |
-            Q(contratada__icontains=termo_pesquisa) |
-            Q(tecnico__icontains=termo_pesquisa) |
-            Q(observacao__icontains=termo_pesquisa) |
-            Q(valor__icontains=termo_pesquisa) |
-            Q(periodo__icontains=termo_pesquisa)
-        )
+    if parametros['termo']:
+        processes = aplicar_busca(processes, parametros['termo'])
 
-    if status_monitoramento != 'todas':
-        processes = processes.filter(status_monitoramento=status_monitoramento)
+    if parametros['status_monitoramento'] != 'todas':
+        processes = processes.filter(status_monitoramento=parametros['status_monitoramento'])
 
-    if genero and genero != 'todas':
-        if can_access_genero(request.user, genero):
+    genero = parametros['genero']
+    if genero != 'todas':
+        if permissoes.pode_acessar_genero(genero):
             processes = processes.filter(genero=genero)
         else:
             processes = processes.none()
 
-    if especie and especie != 'todas':
-        processes = processes.filter(especie=especie)
+    if parametros['especie'] != 'todas':
+        processes = processes.filter(especie=parametros['especie'])
 
-    if status_analise != 'todas':
-        processes = processes.filter(status_analise=status_analise)
+    if parametros['status_analise'] != 'todas':
+        processes = processes.filter(status_analise=parametros['status_analise'])
 
-    workbook = openpyxl.Workbook()
-    sheet = workbook.active
-    sheet.title = "Processos Finalizados"
+    return processes
 
-    headers = [
-        "N° Processo", "Volume", "Secretaria", "Data Entrada", "Hora Entrada",
-        "Data Saída", "Hora Saída", "Destino", "Gênero", "Espécie", "Objeto",
-        "Contratada", "Recorrente", "Prioridade", "Técnico", "N° Despacho",
-        "Observação", "Valor"
-    ]
-    sheet.append(headers)
-
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = openpyxl.styles.PatternFill(
-        start_color="4CAF50", end_color="4CAF50", fill_type="solid")
-    thin_border = Border(left=Side(style='thin'),
-                         right=Side(style='thin'),
-                         top=Side(style='thin'),
-                         bottom=Side(style='thin'))
-
-    for col_num, header_title in enumerate(headers, 1):
-        cell = sheet.cell(row=1, column=col_num)
-        cell.value = header_title
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-        cell.border = thin_border
-
-    for process in processes:
-        row_data = [
-            process.numero_processo,
-            process.volume,
-            process.secretaria,
-            process.data_entrada.strftime(
-                '%Y-%m-%d') if process.data_entrada else '',
-            process.hora_entrada.strftime(
-                '%H:%M') if process.hora_entrada else '',
-            process.data_saida.strftime(
-                '%Y-%m-%d') if process.data_saida else '',
-            # Formatacao Excel
-            process.hora_saida.strftime('%H:%M') if process.hora_saida else '',
-            process.destino,
-            process.genero,
-            process.especie,
-            process.objeto,
-            process.contratada,
-            process.recorrente,
-            process.prioridade,
-            process.tecnico,
-            process.numero_despacho,
-            process.observacao,
-            process.valor,
-
-        ]
-        sheet.append(row_data)
-
-    for row in sheet.iter_rows(min_row=2):
-        for cell in row:
-            cell.border = thin_border
-            if cell.column_letter in ['K', 'O', 'P', 'Q', 'R', 'U', 'V', 'W']:
-                cell.alignment = Alignment(wrapText=True, vertical='top')
-
-    for column in sheet.columns:
-        max_length = 0
-        column_letter = column[0].column_letter
-        for cell in column:
-            try:
-                if cell.value is not None:
-                    cell_length = len(str(cell.value))
-                    if cell_length > max_length:
-                        max_length = cell_length
-            except:
-                pass
-
-        adjusted_width = (max_length + 2)
-        if column_letter in ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L', 'M', 'N', 'O', 'P', 'Q', 'R', 'S', 'T', 'U', 'V', 'W']:
-            sheet.column_dimensions[column_letter].width = min(
-                adjusted_width, 100)
-        else:
-            sheet.column_dimensions[column_letter].width = adjusted_width
 
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = f'attachment; filename=processos_finalizados_{data_inicial_str}_a_{data_final_str}.xlsx'
-    workbook.save(response)
+def pode_exportar(user):
+    return permissoes_do_usuario(user).pode_exportar
+
+
+def _status_exportacao_json(job):
+    dados = {
+        'success': job.status != 'ERRO',
+        'id': str(job.id),
+        'status': job.status,
+        'progresso': job.progresso,
+        'total': job.total,
+        'percentual': job.percentual,
+        'status_url': reverse('status_exportacao', args=[job.id]),
+        'download_url': None,
+    }
+    if job.status == 'CONCLUIDO':
+        dados['download_url'] = reverse('baixar_exportacao', args=[job.id])
+    if job.status == 'ERRO':
+        dados['message'] = job.mensagem or "Erro ao gerar a exportação."
+    return dados
+
+
+@login_required
+@user_passes_test(pode_exportar)
+def exportar_finalizados_excel(request):
+    """
+    Registra a exportação como um job processado por 'manage.py processar_exportacoes'
+    e devolve a URL de acompanhamento. Pedidos com os mesmos filtros, do mesmo
+    escopo de visibilidade e sobre a mesma versão dos dados reaproveitam o
+    arquivo já gerado (ou o job ainda em andamento).
+    """
+    parametros = parametros_exportacao(request.GET)
+    try:
+        filtrar_finalizados_exportacao(request.permissoes, parametros)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+
+    escopo = request.permissoes.escopo
+    chave = hashlib.sha256(json.dumps(
+        {'escopo': escopo, 'parametros': parametros}, sort_keys=True).encode()).hexdigest()
+    versao_dados = ContadorVersao.objects.obter('processos')
+
+    existentes = ExportacaoJob.objects.filter(chave=chave).order_by('-criado_em')
+    # Um job em PROCESSANDO além do prazo foi abandonado pelo worker e não
+    # é reaproveitado
+    job = existentes.filter(
+        Q(status='PENDENTE') | Q(status='CONCLUIDO', versao_dados=versao_dados) |
+        Q(status='PROCESSANDO', versao_dados=versao_dados, iniciado_em__gte=inicio_limite_exportacao())
+    ).first()
+    if job and job.status == 'CONCLUIDO' and not job.arquivo.storage.exists(job.arquivo.name):
+        job = None
+
+    if job is None:
+        job = ExportacaoJob.objects.create(
+            usuario=request.user,
+            escopo=escopo,
+            parametros=parametros,
+            chave=chave,
+            versao_dados=versao_dados,
+            nome_arquivo=f"processos_finalizados_{parametros['data_inicial']}_a_{parametros['data_final']}.xlsx",
+        )
 
+    return JsonResponse(_status_exportacao_json(job), status=200 if job.status == 'CONCLUIDO' else 202)
+
+
+@login_required
+@user_passes_test(pode_exportar)
+def exportar_finalizados_streaming(request, formato):
+    """
+    Mesma seleção de exportar_finalizados_excel em CSV ou JSON lines, enviada
+    linha a linha enquanto é lida do banco. 'gzip=1' compacta o fluxo.
+    """
+    parametros = parametros_exportacao(request.GET)
+    try:
+        processes = filtrar_finalizados_exportacao(request.permissoes, parametros)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+
+    compactar = request.GET.get('gzip') in ('1', 'true', 'sim')
+    nome_arquivo = f"processos_finalizados_{parametros['data_inicial']}_a_{parametros['data_final']}.{formato}"
+    content_type = FORMATOS_STREAMING[formato][1]
+    if compactar:
+        nome_arquivo += '.gz'
+        content_type = 'application/gzip'
+
+    blocos = blocos_exportacao(processes, formato, compactar)
+    if em_asgi(request):
+        blocos = iterar_em_thread(blocos)
+    response = StreamingHttpResponse(blocos, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{nome_arquivo}"'
     return response
 
 
+@login_required
+@user_passes_test(pode_exportar)
+def status_exportacao(request, job_id):
+    job = get_object_or_404(ExportacaoJob, pk=job_id, escopo=request.permissoes.escopo)
+    return JsonResponse(_status_exportacao_json(job))
+
+
+@login_required
+@user_passes_test(pode_exportar)
+def baixar_exportacao(request, job_id):
+    job = get_object_or_404(ExportacaoJob, pk=job_id, escopo=request.permissoes.escopo,
+                            status='CONCLUIDO')
+    try:
+        arquivo = job.arquivo.open('rb')
+    except (ValueError, FileNotFoundError):
+        raise Http404("Arquivo da exportação não está mais disponível.")
+    return FileResponse(
+        arquivo, as_attachment=True, filename=job.nome_arquivo,
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+
+
+def _dados_processo(processo):
+    return {
+        'id': processo.id,
+        'versao': processo.versao,
+        'numero_processo': processo.numero_processo,
+        'volume': processo.volume,
+        'secretaria': processo.secretaria,
+        'data_entrada': processo.data_entrada.strftime('%Y-%m-%d') if processo.data_entrada else None,
+        'hora_entrada': processo.hora_entrada.strftime('%H:%M') if processo.hora_entrada else None,
+        'data_saida': processo.data_saida.strftime('%Y-%m-%d') if processo.data_saida else None,
+        # Format Time object for JSON
+        'hora_saida': processo.hora_saida.strftime('%H:%M') if processo.hora_saida else None,
+        'destino': processo.destino,
+        'genero': processo.genero,
+        'especie': processo.especie,
+        'objeto': processo.objeto,
+        'contratada': processo.contratada,
+        'recorrente': processo.recorrente,
+        'prioridade': processo.prioridade,
+        'tecnico': processo.tecnico,
+        'data_analise': processo.data_analise.strftime('%Y-%m-%d') if processo.data_analise else None,
+        'numero_despacho': processo.numero_despacho,
+        'observacao': processo.observacao,
+        'prazo_monitoramento': processo.prazo_monitoramento,
+        'proxima_data_monitoramento': processo.proxima_data_monitoramento.strftime('%Y-%m-%d') if processo.proxima_data_monitoramento else None,
+        'status_monitoramento': processo.status_monitoramento,
+        'valor': processo.valor,
+        'periodo': processo.periodo,
+        'status_analise': processo.status_analise,
+    }
+
+
+def ultimo_processo_por_numero(numero_processo):
+    """
+    Devolve (genero, etag, dados) do processo mais recente com o número
+    informado, comparado sem pontuação ("123/2025" == "123.2025"), ou None.
+    A consulta é atendida pelo índice (numero_normalizado, data e hora de
+    entrada decrescentes), sem ordenação.
+    """
+    numero_normalizado = normalizar_numero_processo(numero_processo)
+    if not numero_normalizado:
+        return None
+    processo = Processo.objects.filter(numero_normalizado=numero_normalizado).order_by(
+        '-data_entrada', '-hora_entrada').first()
+    if processo is None:
+        return None
+    return processo.genero, processo.etag, _dados_processo(processo)
+
+
+@leitura_assincrona
 @login_required
 def get_process_by_number(request, numero_processo):
     try:
-        processo = Processo.objects.filter(numero_processo=numero_processo).order_by(
-            '-data_entrada', '-hora_entrada').first()
+        encontrado = ultimo_processo_por_numero(numero_processo)
 
-        if not processo:
+        if not encontrado:
             return JsonResponse({'message': 'Processo não encontrado'}, status=404)
 
-        if not can_access_genero(request.user, processo.genero):
+        genero, etag, data = encontrado
+        if not request.permissoes.pode_acessar_genero(genero):
             return JsonResponse({"message": "Você não tem permissão para visualizar detalhes deste processo."}, status=403)
 
-        data = {
-            'numero_processo': processo.numero_processo,
-            'volume': processo.volume,
-            'secretaria': processo.secretaria,
-            'data_entrada': processo.data_entrada.strftime('%Y-%m-%d') if processo.data_entrada else None,
-            'hora_entrada': processo.hora_entrada.strftime('%H:%M') if processo.hora_entrada else None,
-            'data_saida': processo.data_saida.strftime('%Y-%m-%d') if processo.data_saida else None,
-            # Format Time object for JSON
-            'hora_saida': processo.hora_saida.strftime('%H:%M') if processo.hora_saida else None,
-            'destino': processo.destino,
-            'genero': processo.genero,
-            'especie': processo.especie,
-            'objeto': processo.objeto,
-            'contratada': processo.contratada,
-            'recorrente': processo.recorrente,
-            'prioridade': processo.prioridade,
-            'tecnico': processo.tecnico,
-            'data_analise': processo.data_analise.strftime('%Y-%m-%d') if processo.data_analise else None,
-            'numero_despacho': processo.numero_despacho,
-            'observacao': processo.observacao,
-            'prazo_monitoramento': processo.prazo_monitoramento,
-            'proxima_data_monitoramento': processo.proxima_data_monitoramento.strftime('%Y-%m-%d') if processo.proxima_data_monitoramento else None,
-            'status_monitoramento': processo.status_monitoramento,
-            'valor': processo.valor,
-            'periodo': processo.periodo,
-            'status_analise': processo.status_analise,
-        }
-        return JsonResponse(data)
+        if etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponse(status=304)
+            response['ETag'] = etag
+            return response
+
+        response = JsonResponse(data)
+        response['ETag'] = etag
+        return response
     except Exception as e:
         print(f"Erro inesperado em get_process_by_number: {e}")
         return JsonResponse({'message': 'Erro interno do servidor'}, status=500)
 
 
+@leitura_assincrona
+@login_required
+def sugerir_processos(request):
+    campo = request.GET.get('campo', 'numero_processo')
+    if campo not in CAMPOS_SUGESTAO:
+        return JsonResponse({"success": False, "message": "Campo de sugestão inválido."}, status=400)
+    try:
+        limite = int(request.GET.get('limite', LIMITE_SUGESTOES_PADRAO))
+    except ValueError:
+        limite = LIMITE_SUGESTOES_PADRAO
+    limite = max(1, min(limite, LIMITE_SUGESTOES_MAXIMO))
+
+    queryset = request.permissoes.filtrar_processos(Processo.objects.all())
+    sugestoes = sugerir(queryset, campo, request.GET.get('q', ''), limite)
+    return JsonResponse({"success": True, "sugestoes": sugestoes})
+
+
 @csrf_exempt
 @login_required
 def marcar_saida_processo(request, process_id):
@@ -1065,35 +1048,33 @@ def marcar_saida_processo(request, process_id):
         try:
             processo = get_object_or_404(Processo, id=process_id)
 
-            if not (request.user.is_superuser or (hasattr(request.user, 'profile') and request.user.profile.level in ['0', '3'])):
+            if not request.permissoes.pode_marcar_saida:
                 return JsonResponse({"success": False, "message": "Você não tem permissão para marcar a saída deste processo."}, status=403)
 
             if processo.data_saida:
                 return JsonResponse({"success": False, "message": "A data de saída já está preenchida para este processo."}, status=400)
 
+            conflito = _verificar_if_match(request, processo)
+            if conflito:
+                return conflito
+
             now_local = timezone.localtime(timezone.now())
 
             processo.data_saida = now_local.date()
             processo.hora_saida = now_local.time()
 
-            ProcessHistory.objects.create(
-                process=processo,
-                field_name='data_saida',
-                old_value=None,
-                new_value=now_local.date().strftime('%Y-%m-%d'),
-                changed_by=request.user
-            )
-            ProcessHistory.objects.create(
-                process=processo,
-                field_name='hora_saida',
-                old_value=None,
-                new_value=now_local.time().strftime('%H:%M:%S'),
-                changed_by=request.user
-            )
-
-            processo.save()
-
-            return JsonResponse({
+            try:
+                with transaction.atomic():
+                    processo.save()
+                    AlteracaoProcesso.objects.create(
+                        processo=processo,
+                        alterado_por=request.user,
+                        diferencas=_diferencas_saida(processo.data_saida, processo.hora_saida),
+                    )
+            except ConflitoVersao:
+                return _resposta_conflito(processo)
+
+            return _resposta_gravacao(processo, {
                 "success": True,
                 "message": "Data e hora de saída marcadas com sucesso!",
                 "data_saida": now_local.strftime('%Y-%m-%d'),
@@ -1108,6 +1089,140 @@ def marcar_saida_processo(request, process_id):
     return JsonResponse({"success": False, "message": "Método não permitido."}, status=405)
 
 
+@csrf_exempt
+@login_required
+def marcar_saida_lote(request):
+    """
+    Marca a saída de vários processos com um único UPDATE e um bulk_create do
+    histórico, na mesma transação. Processos já finalizados ou fora do alcance
+    do usuário são ignorados; se algum foi alterado desde que a lista foi
+    carregada, nada é gravado (409).
+    """
+    if request.method != 'POST':
+        return JsonResponse({"success": False, "message": "Método não permitido."}, status=405)
+
+    if not request.permissoes.pode_marcar_saida:
+        return JsonResponse({"success": False, "message": "Você não tem permissão para marcar a saída de processos."}, status=403)
+
+    try:
+        versoes = _ler_lote_processos(request)
+    except ValueError as e:
+        return JsonResponse({"success": False, "message": str(e)}, status=400)
+
+    now_local = timezone.localtime(timezone.now())
+    data_saida = now_local.date()
+    hora_saida = now_local.time()
+
+    with transaction.atomic():
+        candidatos = list(request.permissoes.filtrar_processos(
+            Processo.objects.select_for_update().filter(id__in=versoes, data_saida__isnull=True)
+        ).values('id', 'versao', 'genero', 'especie', 'data_saida'))
+
+        conflitos = _conflitos_lote(versoes, candidatos)
+        if conflitos:
+            return _resposta_conflito_lote(conflitos)
+
+        ids = [processo['id'] for processo in candidatos]
+        if ids:
+            atualizados = Processo.objects.filter(id__in=ids, data_saida__isnull=True).update(
+                data_saida=data_saida, hora_saida=hora_saida, versao=F('versao') + 1)
+            if atualizados != len(ids):
+                transaction.set_rollback(True)
+                return _resposta_conflito_lote(ids)
+
+            diferencas = _diferencas_saida(data_saida, hora_saida)
+            AlteracaoProcesso.objects.bulk_create([
+                AlteracaoProcesso(processo_id=process_id, alterado_por=request.user, diferencas=diferencas)
+                for process_id in ids
+            ])
+            _ajustar_facetas_saida(candidatos)
+            ContadorVersao.objects.incrementar_ao_confirmar('processos')
+
+    ignorados = sorted(set(versoes) - set(ids))
+    return JsonResponse({
+        "success": True,
+        "message": f"Saída marcada em {len(ids)} processo(s)."
+                   + (f" {len(ignorados)} ignorado(s) (já finalizados ou sem permissão)." if ignorados else ""),
+        "atualizados": ids,
+        "ignorados": ignorados,
+        "data_saida": now_local.strftime('%Y-%m-%d'),
+        "hora_saida": now_local.strftime('%H:%M'),
+    })
+
+
+@csrf_exempt
+@login_required
+def concluir_monitoramento_lote(request):
+    """
+    Conclui o monitoramento de vários processos (finalizando os que ainda não
+    têm saída) com um único UPDATE e bulk_create do histórico e dos registros
+    de monitoramento, na mesma transação.
+    """
+    if request.method != 'POST':
+        return JsonResponse({"success": False, "message": "Método não permitido."}, status=405)
+
+    if not request.permissoes.pode_concluir_monitoramento:
+        return JsonResponse({"success": False, "message": "Você não tem permissão para concluir o monitoramento de processos."}, status=403)
+
+    try:
+        versoes = _ler_lote_processos(request)
+    except ValueError as e:
+        return JsonResponse({"success": False, "message": str(e)}, status=400)
+
+    now_local = timezone.localtime(timezone.now())
+    hoje = now_local.date()
+    agora = now_local.time()
+
+    with transaction.atomic():
+        candidatos = list(request.permissoes.filtrar_processos(
+            Processo.objects.select_for_update().filter(id__in=versoes)
+        ).values('id', 'versao', 'genero', 'especie', 'data_saida'))
+
+        conflitos = _conflitos_lote(versoes, candidatos)
+        if conflitos:
+            return _resposta_conflito_lote(conflitos)
+
+        ids = [processo['id'] for processo in candidatos]
+        if ids:
+            # As expressões do UPDATE enxergam os valores anteriores da linha: só
+            # os processos ainda abertos recebem data e hora de saída
+            atualizados = Processo.objects.filter(id__in=ids).update(
+                data_saida=Coalesce(F('data_saida'), Value(hoje)),
+                hora_saida=Case(When(data_saida__isnull=True, then=Value(agora)),
+                                default=F('hora_saida')),
+                status_monitoramento='CONCLUIDO',
+                proxima_data_monitoramento=None,
+                prazo_monitoramento='NAO_APLICAVEL',
+                versao=F('versao') + 1,
+            )
+            if atualizados != len(ids):
+                transaction.set_rollback(True)
+                return _resposta_conflito_lote(ids)
+
+            diferencas = _diferencas_saida(hoje, agora)
+            AlteracaoProcesso.objects.bulk_create([
+                AlteracaoProcesso(processo_id=processo['id'], alterado_por=request.user, diferencas=diferencas)
+                for processo in candidatos if processo['data_saida'] is None
+            ])
+            observacao = f"Monitoramento concluído manualmente por {request.user.username}."
+            MonitoramentoRecord.objects.bulk_create([
+                MonitoramentoRecord(processo_id=process_id, data_registro=date.today(),
+                                    observacao=observacao, registrado_por=request.user)
+                for process_id in ids
+            ])
+            _ajustar_facetas_saida(candidatos)
+            ContadorVersao.objects.incrementar_ao_confirmar('processos')
+
+    ignorados = sorted(set(versoes) - set(ids))
+    return JsonResponse({
+        "success": True,
+        "message": f"Monitoramento concluído em {len(ids)} processo(s)."
+                   + (f" {len(ignorados)} ignorado(s) (sem permissão ou inexistentes)." if ignorados else ""),
+        "atualizados": ids,
+        "ignorados": ignorados,
+    })
+
+
 def user_login(request):
     if request.method == 'POST':
         form = AuthenticationForm(request, data=request.POST)
@@ -1181,20 +1296,33 @@ def delete_user(request, user_id):
     return redirect('manage_users')
 
 
-@login_required
-def get_especies_by_genero(request):
-    genero = request.GET.get('genero')
-    if genero and can_access_genero(request.user, genero):
-        especies = Processo.objects.filter(genero=genero).values_list(
-            'especie', flat=True).distinct().order_by('especie')
-        return JsonResponse({'especies': list(especies)})
-    return JsonResponse({'especies': []})
+# Mapa gênero -> espécies das facetas com processos. A chave é o contador
+# 'taxonomia', que só muda quando um par gênero/espécie aparece ou some; uma
+# versão nova substitui a anterior no cache.
+@lru_cache(maxsize=1)
+def _taxonomia(versao_taxonomia):
+    return FacetaProcesso.objects.taxonomia()
 
 
+@leitura_assincrona
 @login_required
-def get_all_especies(request):
-    allowed_generos = [g for g in Processo.objects.values_list(
-        'genero', flat=True).distinct() if can_access_genero(request.user, g)]
-    especies = Processo.objects.filter(genero__in=allowed_generos).values_list(
-        'especie', flat=True).distinct().order_by('especie')
-    return JsonResponse({'especies': list(especies)})
+def taxonomia_processos(request):
+    """
+    Gêneros e espécies visíveis para o usuário: {"generos": {genero: [especies]}}.
+    O ETag combina a versão da taxonomia com o escopo do usuário e o navegador
+    revalida a cada uso (no-cache), recebendo 304 enquanto nada mudar.
+    """
+    permissoes = request.permissoes
+    versao = ContadorVersao.objects.obter('taxonomia')
+    etag = f'"taxonomia-{versao}-{permissoes.escopo}"'
+
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponse(status=304)
+    else:
+        generos = {genero: especies for genero, especies in _taxonomia(versao).items()
+                   if permissoes.pode_acessar_genero(genero)}
+        response = JsonResponse({'generos': generos})
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Cookie'])
+    return response
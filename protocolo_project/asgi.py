@@ -6,6 +6,8 @@ from django.core.asgi import get_asgi_application
 
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'protocolo_project.settings')
+# Ativa as views de leitura assíncronas (ver settings.SERVIDOR_ASGI)
+os.environ.setdefault('SERVIDOR_MODO', 'asgi')
 
 
-application = get_asgi_application()
\ No newline at end of file
+application = get_asgi_application()
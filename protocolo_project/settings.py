@@ -61,6 +61,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'processos_app.permissoes.ContextoPermissaoMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -103,6 +104,14 @@ if not (os.environ.get('POSTGRES_DB') and os.environ.get('POSTGRES_USER')):
         'NAME': os.path.join(BASE_DIR, 'processos_app', 'database', 'protocolos.db'),
     }
 
+# Carrega o Profile junto com o usuário da sessão (ver processos_app.permissoes).
+# O ModelBackend continua listado para que as sessões abertas antes da troca,
+# gravadas com ele, não sejam encerradas; novos logins usam o primeiro da lista.
+AUTHENTICATION_BACKENDS = [
+    'processos_app.permissoes.BackendComPerfil',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator', },
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator', },
@@ -132,5 +141,27 @@ if DEBUG:
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Exportações em segundo plano ('manage.py processar_exportacoes'): dias que os
+# arquivos gerados ficam disponíveis para download antes de serem removidos.
+EXPORTACAO_RETENCAO_DIAS = int(os.environ.get('EXPORTACAO_RETENCAO_DIAS', '7'))
+# Minutos após os quais uma exportação ainda em PROCESSANDO é considerada
+# abandonada (worker encerrado no meio do trabalho) e marcada como ERRO.
+EXPORTACAO_TIMEOUT_MINUTOS = int(os.environ.get('EXPORTACAO_TIMEOUT_MINUTOS', '30'))
+
+# Horas em que a resposta de uma requisição com cabeçalho Idempotency-Key é
+# guardada para ser repetida caso o navegador reenvie a mesma requisição.
+IDEMPOTENCIA_VALIDADE_HORAS = int(os.environ.get('IDEMPOTENCIA_VALIDADE_HORAS', '24'))
+
+# Registros de histórico (alterações e monitoramento) mais antigos que este
+# número de dias são movidos para arquivos compactados por 'manage.py arquivar_historico'.
+HISTORICO_ARQUIVAMENTO_DIAS = int(os.environ.get('HISTORICO_ARQUIVAMENTO_DIAS', '730'))
+
+# Modo do servidor de aplicação: 'wsgi' (gunicorn síncrono) ou 'asgi' (gunicorn
+# com workers uvicorn; definido por protocolo_project/asgi.py). Sob ASGI, as
+# views de leitura passam a ser assíncronas e rodam em ASGI_THREADS_LEITURA
+# threads por processo, cada uma com a sua conexão com o banco.
+SERVIDOR_ASGI = os.environ.get('SERVIDOR_MODO', 'wsgi') == 'asgi'
+ASGI_THREADS_LEITURA = int(os.environ.get('ASGI_THREADS_LEITURA', '8'))
+
 LOGIN_REDIRECT_URL = '/listar/'
 LOGOUT_REDIRECT_URL = '/login/'